@@ -0,0 +1,266 @@
+"""
+PARTIE : Balayage de scénarios
+
+Balayage d'une grille de scénarios (sens physique) : tonnage de biomasse x humidité x technologie d'électrolyseur
+x pression de compression x année du mix électrique, réparti sur plusieurs processus.
+
+La grille n'est jamais développée en entier : chaque scénario est repéré par son indice dans la grille (ordre
+lexicographique des dimensions), et chaque lot ("shard") de taille_shard indices consécutifs est décodé puis évalué
+d'un seul coup par le moteur vectorisé de batch.py. Les shards sont répartis sur un ProcessPoolExecutor :
+- l'affectation est déterministe : le shard s contient toujours les scénarios s*taille_shard à (s+1)*taille_shard - 1,
+  quel que soit le nombre de processus ;
+- si des lois d'incertitude sont données (cf. monte_carlo.distributions_defaut), chaque shard tire ses paramètres avec
+  son propre générateur aléatoire, dérivé de la graine et du numéro de shard : les résultats ne dépendent ni du
+  nombre de processus ni de l'ordre d'exécution ;
+- chaque shard terminé est enregistré dans un fichier .npz du dossier de sortie : un balayage interrompu reprend
+  au premier shard non enregistré. Un manifeste (manifeste.json) décrit le balayage qui a produit les shards (grille,
+  taille des shards, graine, lois d'incertitude, méthode de compression) : les shards d'un balayage différent ne sont
+  jamais réutilisés (ValueError).
+Les technologies d'électrolyseur sont celles du registre de _4_electrolyseur (alcalin, PEM et technologies
+enregistrées par l'utilisateur) : leurs noms sont résolus en entrées du registre avant l'envoi aux processus.
+
+Contient :
+- grille_defaut : grille de balayage par défaut
+- taille_grille, decoder_indices : taille de la grille et décodage d'indices de scénarios en valeurs des dimensions
+- calcul_shard : évaluation d'un shard
+- balayage : balayage complet (parallèle, avec reprise) et fusion des résultats
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import batch
+import monte_carlo
+from etapes import _4_electrolyseur as elec
+from etapes import _6_energie as energie
+
+
+###############################################################
+# Grille de balayage par défaut                               #
+###############################################################
+
+# Dimensions de la grille, dans l'ordre de parcours (la dernière varie le plus vite)
+grille_defaut = {
+    "masse": np.linspace(100000, 1000000, 10),      # masse de biomasse humide de type bois vert (t)
+    "humidite": np.linspace(0, 0.6, 7),             # taux d'humidité (fraction)
+    "electrolyseur": ["alcalin", "PEM"],            # technologie d'électrolyseur (nom dans _4_electrolyseur.technologies)
+    "P2_bar": np.array([10, 20, 30, 50]),           # pression de sortie des compressions d'O2 et de CO2 (bar)
+    "annee_mix": np.array([2023, 2030, 2040, 2050]),# année du mix électrique
+}
+
+
+##############################################################
+# Décodage de la grille
+##############################################################
+
+def taille_grille(grille):
+    """Renvoie le nombre total de scénarios de la grille."""
+    return int(np.prod([len(valeurs) for valeurs in grille.values()]))
+
+
+def decoder_indices(grille, indices):
+    """
+    Décode des indices de scénarios en valeurs de chaque dimension de la grille.
+
+    Arguments
+    ----------
+        grille : dictionnaire {dimension : liste des valeurs}
+        indices : tableau d'indices de scénarios (entre 0 et taille_grille(grille) - 1)
+
+    Returns
+    -------
+        colonnes : dictionnaire {dimension : tableau des indices de valeur de chaque scénario dans la dimension}
+    """
+    positions = np.unravel_index(indices, tuple(len(valeurs) for valeurs in grille.values()))
+    return dict(zip(grille.keys(), positions))
+
+
+def _technologies(valeurs):
+    """Résout les technologies d'électrolyseur de la grille (noms ou entrées du registre) en entrées du registre."""
+    return [valeur if isinstance(valeur, elec.TechnologieElectrolyseur) else elec.technologie(valeur)
+            for valeur in valeurs]
+
+
+def _parametres_electrolyseur(technologies, positions):
+    """Renvoie les paramètres d'électrolyseur (tableaux, un élément par scénario) des technologies choisies."""
+    technologies = _technologies(technologies)
+    return {
+        "efficacite_electrolyseur": np.array([t.efficacite_electrolyseur for t in technologies])[positions],
+        "consommation_electricite_stack": np.array([t.consommation_electricite_stack for t in technologies])[positions],
+    }
+
+
+##############################################################
+# Calcul d'un shard
+##############################################################
+
+def calcul_shard(grille, numero_shard, taille_shard, graine=0, distributions=None, dossier=None,
+                 methode_compression="table"):
+    """
+    Évalue un shard de la grille : les scénarios numero_shard*taille_shard à (numero_shard+1)*taille_shard - 1.
+
+    Arguments
+    ----------
+        grille : dictionnaire {dimension : liste des valeurs} (cf. grille_defaut)
+        numero_shard : numéro du shard
+        taille_shard : nombre de scénarios par shard
+        graine : graine du balayage ; le générateur du shard est dérivé de (graine, numero_shard)
+        distributions : lois des paramètres incertains tirés pour chaque scénario (cf. monte_carlo), optionnel
+        dossier : dossier où enregistrer le shard (shard_XXXXXX.npz), optionnel
+        methode_compression : "table" (par défaut), "iterative" ou "newton"
+
+    Returns
+    -------
+        resultats : dictionnaire {grandeur : tableau}, avec "indice" (indice des scénarios dans la grille),
+                    les positions dans chaque dimension et les colonnes de résultats de batch.py
+    """
+    debut = numero_shard * taille_shard
+    indices = np.arange(debut, min(debut + taille_shard, taille_grille(grille)))
+    positions = decoder_indices(grille, indices)
+    n = len(indices)
+
+    params = batch.parametres_defaut()
+    if distributions is not None:
+        rng = np.random.default_rng(np.random.SeedSequence(graine, spawn_key=(numero_shard,)))
+        params = monte_carlo.parametres_tires(rng, n, distributions, params)
+    else:
+        params = dict(params)
+
+    # Dimensions de la grille -> paramètres (tableaux, un élément par scénario)
+    params["param_electrolyseur"] = _parametres_electrolyseur(grille["electrolyseur"], positions["electrolyseur"])
+    P2_bar = np.asarray(grille["P2_bar"], dtype=float)[positions["P2_bar"]]
+    params["param_compression"] = {
+        **params["param_compression"],
+        "O2": {**params["param_compression"]["O2"], "P2_bar": P2_bar},
+        "CO2": {**params["param_compression"]["CO2"], "P2_bar": P2_bar},
+    }
+    masses = np.asarray(grille["masse"], dtype=float)[positions["masse"]]
+    humidites = np.asarray(grille["humidite"], dtype=float)[positions["humidite"]]
+    annees = np.asarray(grille["annee_mix"], dtype=float)[positions["annee_mix"]]
+
+    resultats = batch.calcul_sens_physique_batch(masses, humidites, params, methode_compression)
+
+    # Émissions de l'électricité selon l'année du mix (gCO2e), totales et par MJ de e-bio-SAF
+    intensite = energie.intensite_carbone_annee(annees, params["facteur_emission"], params["param_mix_2050"],
+                                                params["facteur_emission_2023"])
+    resultats["emissions_annee"] = resultats["conso_elec_totale"] * intensite
+    resultats["emissions_MJ_annee"] = resultats["emissions_annee"] / (resultats["masse_kerosene"]
+                                                                      * params["param_FT"]["PCI_kerosene"] * 1000)
+
+    resultats = {"indice": indices, **{f"position_{dim}": pos for dim, pos in positions.items()}, **resultats}
+
+    if dossier is not None:
+        chemin = _chemin_shard(dossier, numero_shard)
+        np.savez(chemin + ".tmp.npz", **resultats)
+        os.replace(chemin + ".tmp.npz", chemin) # écriture atomique : un shard présent est un shard complet
+    return resultats
+
+
+def _chemin_shard(dossier, numero_shard):
+    return os.path.join(dossier, f"shard_{numero_shard:06d}.npz")
+
+
+def _manifeste(grille, taille_shard, graine, distributions, methode_compression):
+    """Description du balayage (grille aux technologies résolues, taille des shards, graine, lois d'incertitude,
+    méthode de compression), sous la forme relue depuis manifeste.json."""
+    def valeur_json(valeur): # tableaux et nombres NumPy
+        return valeur.tolist() if hasattr(valeur, "tolist") else str(valeur)
+
+    manifeste = {
+        "grille": {dimension: list(valeurs) for dimension, valeurs in grille.items()}, # technologies : tous leurs champs
+        "taille_shard": taille_shard,
+        "graine": graine,
+        "distributions": None if distributions is None else [[list(chemin), list(loi)]
+                                                              for chemin, loi in distributions.items()],
+        "methode_compression": methode_compression,
+    }
+    return json.loads(json.dumps(manifeste, default=valeur_json))
+
+
+def _verifier_manifeste(dossier, manifeste):
+    """Écrit le manifeste du balayage dans un dossier de sortie neuf, ou vérifie que les shards déjà présents ont été
+    produits par le même balayage."""
+    chemin = os.path.join(dossier, "manifeste.json")
+    if os.path.exists(chemin):
+        with open(chemin, encoding="utf-8") as fichier:
+            if json.load(fichier) != manifeste:
+                raise ValueError(f"Le dossier {dossier} contient les shards d'un autre balayage (grille, taille des "
+                                 f"shards, graine, lois ou méthode différentes) : choisir un autre dossier ou le vider")
+        return
+    if any(nom.startswith("shard_") for nom in os.listdir(dossier)):
+        raise ValueError(f"Le dossier {dossier} contient des shards sans manifeste : choisir un autre dossier ou le vider")
+    with open(chemin + ".tmp", "w", encoding="utf-8") as fichier:
+        json.dump(manifeste, fichier, ensure_ascii=False, indent=1)
+    os.replace(chemin + ".tmp", chemin)
+
+
+##############################################################
+# Balayage complet
+##############################################################
+
+def balayage(grille=grille_defaut, taille_shard=50000, n_processus=None, graine=0, distributions=None, dossier=None,
+             methode_compression="table"):
+    """
+    Balayage de toute la grille de scénarios, réparti sur un ProcessPoolExecutor, et fusion des résultats.
+    Avec un dossier de sortie, les shards déjà enregistrés (balayage précédent interrompu) ne sont pas recalculés ;
+    une ValueError est levée si le dossier contient les shards d'un balayage différent (cf. manifeste.json).
+
+    Arguments
+    ----------
+        grille : dictionnaire {dimension : liste des valeurs} (cf. grille_defaut)
+        taille_shard : nombre de scénarios par shard
+        n_processus : nombre de processus (par défaut le nombre de cœurs) ; 1 pour un calcul sans processus fils
+        graine : graine du balayage (utilisée seulement avec des lois d'incertitude)
+        distributions : lois des paramètres incertains (cf. monte_carlo), optionnel
+        dossier : dossier de sortie des shards, optionnel (nécessaire pour la reprise)
+        methode_compression : "table" (par défaut), "iterative" ou "newton"
+
+    Returns
+    -------
+        resultats : dictionnaire {grandeur : tableau (taille_grille(grille),)} dans l'ordre des indices de la grille,
+                    complété par "valeurs_grille" (les valeurs de chaque dimension)
+    """
+    if taille_shard <= 0:
+        raise ValueError("La taille des shards doit être strictement positive")
+
+    n_shards = max(1, -(-taille_grille(grille) // taille_shard)) # un shard vide pour une grille vide
+    # technologies résolues dans le processus principal : les technologies enregistrées par l'utilisateur sont
+    # transmises aux processus fils avec la grille
+    grille_calcul = {**grille, "electrolyseur": _technologies(grille["electrolyseur"])}
+    if dossier is not None:
+        os.makedirs(dossier, exist_ok=True)
+        _verifier_manifeste(dossier, _manifeste(grille_calcul, taille_shard, graine, distributions, methode_compression))
+        a_calculer = [s for s in range(n_shards) if not os.path.exists(_chemin_shard(dossier, s))]
+    else:
+        a_calculer = list(range(n_shards))
+
+    arguments = (taille_shard, graine, distributions, dossier, methode_compression)
+    shards = {}
+    if n_processus == 1:
+        for s in a_calculer:
+            shards[s] = calcul_shard(grille_calcul, s, *arguments)
+    else:
+        with ProcessPoolExecutor(max_workers=n_processus) as executeur:
+            futurs = {s: executeur.submit(calcul_shard, grille_calcul, s, *arguments) for s in a_calculer}
+            for s, futur in futurs.items():
+                shards[s] = futur.result()
+
+    # Fusion, dans l'ordre des shards (les shards déjà enregistrés sont relus)
+    for s in range(n_shards):
+        if s not in shards:
+            with np.load(_chemin_shard(dossier, s)) as donnees:
+                shards[s] = dict(donnees)
+    resultats = {cle: np.concatenate([shards[s][cle] for s in range(n_shards)]) for cle in shards[0]}
+    resultats["valeurs_grille"] = grille
+    return resultats
+
+
+if __name__ == "__main__":
+    import time
+
+    debut = time.time()
+    resultats = balayage()
+    print(f"{len(resultats['indice'])} scénarios calculés en {time.time() - debut:.1f} s")
@@ -0,0 +1,210 @@
+"""
+PARTIE : Calcul par lots (batch)
+
+Moteur de calcul vectorisé du processus e-bio-SAF : au lieu d'un seul scénario piloté par les variables globales
+de main.py, on calcule en un seul appel des milliers de configurations, rangées dans des tableaux NumPy.
+Les fonctions de chaque étape sont appelées une seule fois sur des tableaux (un élément par scénario),
+sans boucle Python sur les scénarios et sans affichage.
+
+Contient :
+- parametres_defaut : renvoie les dictionnaires de paramètres sourcés utilisés par défaut
+- calcul_sens_physique_batch : biomasse -> carburant pour un tableau de biomasses (masses et humidités)
+- calcul_sens_inverse_batch : carburant -> biomasse pour un tableau de masses de kérosène visées (de forme quelconque,
+  ex : trajectoires de demande par année et par aéroport)
+
+Les résultats sont renvoyés sous forme de colonnes : un dictionnaire {nom de la grandeur : tableau NumPy},
+chaque tableau ayant un élément par scénario.
+"""
+
+import numpy as np
+
+import cache_etapes
+from etapes import _1_biomasse as biomasse
+from etapes import _2_gazeification as gaz
+from etapes import _3_FT as ft
+from etapes import _4_electrolyseur as elec
+from etapes import _5_compression as comp
+from etapes import _6_energie as energie
+
+
+def parametres_defaut():
+    """
+    Renvoie les dictionnaires de paramètres sourcés utilisés par défaut par le calcul par lots.
+    Les dictionnaires ne sont pas copiés : ce sont ceux des modules étapes.
+
+    Returns
+    -------
+        params : dictionnaire {nom du jeu de paramètres : dictionnaire de paramètres}
+    """
+    return {
+        "param_biomasse": biomasse.param_biomasse,
+        "gaz_params": gaz.gaz_params,
+        "caract_syngas": gaz.caract_syngas,
+        "param_FT": ft.param_FT,
+        "param_electrolyseur": elec.param_electrolyseur_PEM,
+        "param_compression": comp.param_compression,
+        "facteur_emission": energie.facteur_emission,
+        "param_mix_2050": energie.param_mix_2050,
+        "facteur_emission_2023": energie.facteur_emission_2023,
+    }
+
+
+def _etape(cache, fonction, *arguments):
+    """Calcule une étape, ou relit son résultat dans le cache s'il est fourni (cf. cache_etapes)."""
+    if cache is None:
+        return fonction(*arguments)
+    return cache_etapes.resultat_etape(cache, fonction, *arguments)
+
+
+def _resultats_energie(resultats, params):
+    """
+    Complète les résultats avec la consommation électrique totale et les émissions associées (gCO2e),
+    totales et par MJ de e-bio-SAF produit.
+    """
+    consos_energies = [resultats["conso_elec_gazeification"], resultats["conso_elec_FT"],
+                       resultats["conso_elec_electrolyseur"], resultats["conso_elec_compression"]]
+    emissions_2050, emissions_2023 = energie.emissions_energie_totale(consos_energies, params["facteur_emission"],
+                                                                      params["param_mix_2050"],
+                                                                      params["facteur_emission_2023"]) # en gCO2e
+
+    # Émissions rapportées au kérosène produit par chaque scénario (emissions_MJ_produit_*) : main.py les rapporte à
+    # la production nominale param_FT["production_BioTJet"], d'où des valeurs différentes (ex : environ 10 % en sens
+    # inverse pour 97 209 t de kérosène)
+    energie_kerosene = resultats["masse_kerosene"] * params["param_FT"]["PCI_kerosene"] * 1000
+
+    resultats["conso_elec_totale"] = sum(consos_energies)
+    resultats["emissions_2050"] = emissions_2050[-1] # le total est le dernier élément de la liste retournée
+    resultats["emissions_2023"] = emissions_2023[-1]
+    resultats["emissions_MJ_produit_2050"] = emissions_2050[-1] / energie_kerosene
+    resultats["emissions_MJ_produit_2023"] = emissions_2023[-1] / energie_kerosene
+    return resultats
+
+
+def calcul_sens_physique_batch(masses, humidites, params=None, methode_compression="iterative", cache=None):
+    """
+    Calcul du processus complet dans le sens physique (biomasse -> carburant) pour un lot de scénarios.
+
+    Arguments
+    ----------
+        masses : masses de biomasse humide de type bois vert (t), tableau de forme (n,) ou (n, k)
+                 avec n scénarios et k biomasses d'entrée par scénario
+        humidites : taux d'humidité (fractions) correspondants, de même forme (ou diffusable)
+        params : dictionnaire de jeux de paramètres (voir parametres_defaut), par défaut ceux des modules étapes
+        methode_compression : "iterative", "newton" ou "table" (cf. _5_compression.conso_compression_procede)
+        cache : cache des résultats d'étapes (cf. cache_etapes.creer_cache), optionnel : les étapes dont les entrées
+                et les paramètres n'ont pas changé depuis un appel précédent ne sont pas recalculées
+
+    Returns
+    -------
+        resultats : dictionnaire {grandeur : tableau (n,)} avec les masses (t), consommations (kWh ou MJ)
+                    et émissions (tCO2e pour la biomasse, gCO2e pour l'énergie) de chaque étape
+    """
+    if params is None:
+        params = parametres_defaut()
+
+    masses, humidites = np.broadcast_arrays(np.asarray(masses, dtype=float), np.asarray(humidites, dtype=float))
+    if masses.ndim == 1:
+        masses, humidites = masses[:, None], humidites[:, None]
+
+    # Une "biomasse d'entrée" par colonne : chaque valeur est un tableau sur les scénarios
+    biomasse_entree = [{"type": "bois_vert", "masse": masses[:, j], "humidité": humidites[:, j]}
+                       for j in range(masses.shape[1])]
+
+    # Étape 1 : Biomasse
+    res_biomasse = _etape(cache, biomasse.bilan_biomasse, params["param_biomasse"], biomasse_entree, True)
+    masse_seche = res_biomasse["masse_seche_biomasse"]
+    # Étape 2 : Gazéification
+    res_gaz = _etape(cache, gaz.bilan_gazeification_compile, masse_seche, params["gaz_params"], params["caract_syngas"])
+    masse_CO, besoin_H2 = res_gaz["masseCO_sortie"], res_gaz["masseH2_necessaire"]
+    masse_CO2, besoin_O2 = res_gaz["masseCO2_sortie"], res_gaz["masseO2_necessaire"]
+    conso_elec_gaz = _etape(cache, gaz.conso_elec_gazeification, masse_CO2, besoin_H2, masse_seche,
+                            params["gaz_params"], params["param_biomasse"])
+    # Étape 3 : Fischer-Tropsch
+    res_FT = _etape(cache, ft.bilan_Fischer_Tropsch, params["param_FT"], masse_CO)
+    # Étape 4 : Électrolyseur
+    conso_elec_elec = _etape(cache, elec.consommation_electrolyseur, params["param_electrolyseur"], besoin_O2, besoin_H2)
+    # Étape 5 : Compression
+    conso_elec_compression = _etape(cache, comp.conso_compression_procede, masse_CO, besoin_H2, masse_CO2, besoin_O2,
+                                    params["param_compression"], methode_compression)
+
+    resultats = {
+        "masse_humide_biomasse": masses.sum(axis=1),
+        "masse_seche_biomasse": masse_seche,
+        "conso_chaleur_biomasse": res_biomasse["conso_chaleur"],
+        "emissions_biomasse": res_biomasse["emissions_totales"],
+        "masse_CO": masse_CO,
+        "masse_CO2": masse_CO2,
+        "besoin_H2": besoin_H2,
+        "besoin_O2": besoin_O2,
+        "masse_dechets": res_gaz["masse_dechets"],
+        "masse_kerosene": res_FT["masse_kerosene_produite"],
+        "conso_elec_gazeification": conso_elec_gaz,
+        "conso_elec_FT": res_FT["consommation_totale_FT"],
+        "conso_elec_electrolyseur": conso_elec_elec,
+        "conso_elec_compression": conso_elec_compression,
+    }
+    # Étape 6 : Émissions liées à l'énergie
+    return _resultats_energie(resultats, params)
+
+
+def calcul_sens_inverse_batch(kerosene_produit, params=None, methode_compression="iterative", cache=None):
+    """
+    Calcul du processus complet dans le sens inverse (carburant -> biomasse) pour un lot de scénarios.
+    Toutes les étapes sont évaluées sur le tableau entier des masses visées, quelle que soit sa forme : une courbe de
+    demande (années x aéroports, par exemple) est inversée en un seul appel, sans boucle sur ses éléments.
+
+    Arguments
+    ----------
+        kerosene_produit : masses de e-bio-SAF à produire (t), tableau de forme quelconque, ex : (n,) ou
+                           (années, aéroports)
+        params : dictionnaire de jeux de paramètres (voir parametres_defaut), par défaut ceux des modules étapes
+        methode_compression : "iterative", "newton" ou "table" (cf. _5_compression.conso_compression_procede)
+        cache : cache des résultats d'étapes (cf. cache_etapes.creer_cache), optionnel : les étapes dont les entrées
+                et les paramètres n'ont pas changé depuis un appel précédent ne sont pas recalculées
+
+    Returns
+    -------
+        resultats : dictionnaire {grandeur : tableau de même forme que kerosene_produit}, mêmes grandeurs que
+                    calcul_sens_physique_batch ; la masse de biomasse humide est celle de bois vert à 25 % d'humidité
+                    (hypothèse de bilan_biomasse en sens inverse)
+    """
+    if params is None:
+        params = parametres_defaut()
+
+    kerosene_produit = np.asarray(kerosene_produit, dtype=float)
+
+    # Étape 1 : Fischer-Tropsch
+    res_FT = _etape(cache, ft.bilan_Inv_Fischer_Tropsch, params["param_FT"], kerosene_produit)
+    masse_CO = res_FT["CO_necessaire"]
+    # Étape 2 : Gazéification
+    res_gaz = _etape(cache, gaz.bilan_Inv_gazeification_compile, masse_CO, params["gaz_params"], params["caract_syngas"])
+    masse_seche, besoin_H2 = res_gaz["biomasse_entree"], res_gaz["masseH2_necessaire"]
+    besoin_O2, masse_CO2 = res_gaz["masseO2_necessaire"], res_gaz["masseCO2_sortie"]
+    conso_elec_gaz = _etape(cache, gaz.conso_elec_gazeification, masse_CO2, besoin_H2, masse_seche,
+                            params["gaz_params"], params["param_biomasse"])
+    # Étape 3 : Électrolyseur
+    conso_elec_elec = _etape(cache, elec.consommation_electrolyseur, params["param_electrolyseur"], besoin_O2, besoin_H2)
+    # Étape 4 : Biomasse (hypothèse bois vert à 25% d'humidité, cf. bilan_biomasse)
+    res_biomasse = _etape(cache, biomasse.bilan_biomasse, params["param_biomasse"], masse_seche, False)
+    # Étape 5 : Compression
+    conso_elec_compression = _etape(cache, comp.conso_compression_procede, masse_CO, besoin_H2, masse_CO2, besoin_O2,
+                                    params["param_compression"], methode_compression)
+
+    resultats = {
+        "masse_humide_biomasse": biomasse.masse_humide_sortie(masse_seche, verbose=False),
+        "masse_seche_biomasse": masse_seche,
+        "conso_chaleur_biomasse": res_biomasse["conso_chaleur"],
+        "emissions_biomasse": res_biomasse["emissions_totales"],
+        "masse_CO": masse_CO,
+        "masse_CO2": masse_CO2,
+        "besoin_H2": besoin_H2,
+        "besoin_O2": besoin_O2,
+        "masse_dechets": res_gaz["masse_dechets"],
+        "masse_kerosene": kerosene_produit,
+        "conso_elec_gazeification": conso_elec_gaz,
+        "conso_elec_FT": res_FT["consommation_totale_FT"],
+        "conso_elec_electrolyseur": conso_elec_elec,
+        "conso_elec_compression": conso_elec_compression,
+    }
+    # Étape 6 : Émissions liées à l'énergie
+    return _resultats_energie(resultats, params)
@@ -0,0 +1,148 @@
+"""
+PARTIE : Cache des résultats d'étapes
+
+Mémorisation des résultats de chaque étape du processus (biomasse, gazéification, FT, électrolyseur, compression),
+indexés par le contenu de leurs entrées : une empreinte (hash blake2b, cf. etapes.empreintes) est calculée à partir
+de la fonction de l'étape (nom et version de son code), des tableaux d'entrée et d'une forme canonique des
+dictionnaires de paramètres utilisés. Une modification du code d'une étape invalide donc ses résultats mémorisés.
+Lorsqu'un balayage ne modifie que des paramètres en aval (par exemple le mix électrique de _6_energie), les entrées
+des étapes en amont sont inchangées : leurs résultats sont relus dans le cache au lieu d'être recalculés.
+
+Le cache est un dictionnaire (cf. creer_cache) avec :
+- un niveau en mémoire, limité à taille_max résultats, avec éviction du résultat le moins récemment utilisé (LRU) ;
+- un niveau sur disque optionnel (un fichier .pkl par résultat dans un dossier), conservé d'une session à l'autre.
+
+Les tableaux des résultats mémorisés sont en lecture seule (cf. _figer) : ils sont partagés par tous les appels de
+même empreinte, et une modification en place (ex : r["masse_CO"] *= 2) fausserait les appels suivants ainsi que
+l'empreinte de provenance des tableaux ; elle lève donc une erreur. Copier un tableau pour le modifier.
+
+Les tableaux produits par une étape passée par le cache sont repérés par leur provenance (empreinte de l'étape et
+position dans son résultat) : lorsqu'ils sont passés à l'étape suivante, leur empreinte est calculée à partir de
+cette provenance, sans relire leur contenu. Seuls les tableaux d'entrée du processus sont donc hachés en entier.
+
+Contient :
+- empreinte : empreinte canonique d'objets Python (cf. etapes.empreintes)
+- creer_cache : création d'un cache vide
+- resultat_etape : résultat d'une étape, relu dans le cache ou calculé puis mémorisé
+- vider_cache : suppression des résultats en mémoire (et sur disque si demandé)
+"""
+
+import os
+import pickle
+from collections import OrderedDict
+
+import numpy as np
+
+from etapes import dual
+from etapes.empreintes import empreinte, enregistrer_provenance, identifiants_tableaux
+
+
+##############################################################
+# Cache
+##############################################################
+
+def creer_cache(taille_max=128, dossier=None):
+    """
+    Crée un cache de résultats d'étapes vide.
+
+    Arguments
+    ----------
+        taille_max : nombre maximal de résultats gardés en mémoire
+        dossier : dossier du niveau sur disque, optionnel
+
+    Returns
+    -------
+        cache : dictionnaire avec les résultats en mémoire ("memoire", du moins au plus récemment utilisé),
+                la configuration et les compteurs "succes_memoire", "succes_disque" et "calculs"
+    """
+    if dossier is not None:
+        os.makedirs(dossier, exist_ok=True)
+    return {"memoire": OrderedDict(), "taille_max": taille_max, "dossier": dossier,
+            "succes_memoire": 0, "succes_disque": 0, "calculs": 0}
+
+
+def _memoriser(cache, cle, resultat):
+    """Ajoute un résultat au niveau en mémoire, en évinçant le moins récemment utilisé si besoin."""
+    cache["memoire"][cle] = resultat
+    cache["memoire"].move_to_end(cle)
+    while len(cache["memoire"]) > cache["taille_max"]:
+        cache["memoire"].popitem(last=False)
+
+
+def _figer(objet, exclus=frozenset()):
+    """
+    Renvoie le résultat d'une étape avec des tableaux NumPy en lecture seule (dictionnaires, listes, tuples et nombres
+    duaux parcourus). Les tableaux produits par l'étape sont figés en place ; les tableaux exclus (entrées de l'étape
+    renvoyées telles quelles) sont copiés, pour ne pas figer les tableaux de l'appelant.
+    """
+    if isinstance(objet, np.ndarray):
+        if id(objet) in exclus:
+            objet = objet.copy()
+        objet.flags.writeable = False
+        return objet
+    if isinstance(objet, dual.Dual):
+        return dual.Dual(_figer(objet.valeur, exclus), _figer(objet.derivees, exclus))
+    if isinstance(objet, dict):
+        return {cle: _figer(valeur, exclus) for cle, valeur in objet.items()}
+    if isinstance(objet, (list, tuple)):
+        return type(objet)(_figer(valeur, exclus) for valeur in objet)
+    return objet
+
+
+def resultat_etape(cache, fonction, *arguments):
+    """
+    Renvoie le résultat de fonction(*arguments) : relu dans le cache (mémoire, puis disque) si une étape de même
+    empreinte a déjà été calculée, sinon calculé puis mémorisé.
+
+    Arguments
+    ----------
+        cache : cache créé par creer_cache
+        fonction : fonction de l'étape (ex : _2_gazeification.bilan_gazeificationV2)
+        arguments : arguments de la fonction (tableaux d'entrée et dictionnaires de paramètres)
+
+    Returns
+    -------
+        resultat : résultat de l'étape, dont les tableaux sont en lecture seule (cf. _figer)
+    """
+    cle = empreinte(fonction, arguments)
+
+    if cle in cache["memoire"]:
+        cache["succes_memoire"] += 1
+        cache["memoire"].move_to_end(cle)
+        return cache["memoire"][cle]
+
+    chemin = os.path.join(cache["dossier"], f"{cle}.pkl") if cache["dossier"] is not None else None
+    if chemin is not None and os.path.exists(chemin):
+        with open(chemin, "rb") as fichier:
+            resultat = _figer(pickle.load(fichier))
+        cache["succes_disque"] += 1
+        enregistrer_provenance(resultat, cle)
+        _memoriser(cache, cle, resultat)
+        return resultat
+
+    entrees = identifiants_tableaux(arguments)
+    resultat = _figer(fonction(*arguments), entrees)
+    cache["calculs"] += 1
+    enregistrer_provenance(resultat, cle, entrees)
+    _memoriser(cache, cle, resultat)
+    if chemin is not None:
+        with open(chemin + ".tmp", "wb") as fichier:
+            pickle.dump(resultat, fichier, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(chemin + ".tmp", chemin) # écriture atomique
+    return resultat
+
+
+def vider_cache(cache, disque=False):
+    """
+    Supprime les résultats en mémoire du cache, et ceux du dossier sur disque si disque=True.
+
+    Arguments
+    ----------
+        cache : cache créé par creer_cache
+        disque : si True, supprime aussi les fichiers du niveau sur disque
+    """
+    cache["memoire"].clear()
+    if disque and cache["dossier"] is not None:
+        for nom in os.listdir(cache["dossier"]):
+            if nom.endswith(".pkl"):
+                os.remove(os.path.join(cache["dossier"], nom))
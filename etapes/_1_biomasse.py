@@ -3,12 +3,16 @@ PARTIE : Biomasse
 
 Contient : 
  - param_biomasse : les paramètres liés à la biomasse
+ - LotsBiomasse : lots de biomasse rangés en colonnes (type codé, masse, humidité), alternative compacte à la liste
+   de dictionnaires pour des millions de lots ; lots_biomasse les construit à partir des noms de types
  - Les fonctions de calcul des émissions et consommations liées à la biomasse :
     - masse_seche_sortie : calcule la masse de biomasse sèche selon taux d'humidité initial
-    - masse_humide_sortie : calcule les masses équivalentes de biomasses humides pour obtenir une masse sèche donnée
+    - masses_humides_equivalentes : calcule les masses équivalentes de biomasses humides pour obtenir une masse sèche donnée
+    - masse_humide_sortie : calcule (et print) les masses humides équivalentes, renvoie celle à 25% d'humidité
     - culture_biomasse : calcule les émissions liées à la culture de la biomasse 
     - transport_biomasse : calcule les émissions liées au transport de la biomasse
     - traitement_biomasse : calcule les consommations énergétiques liées à la torréfaction
+    - bilan_biomasse : calcule, sans affichage, les émissions totales et consommations énergétiques liées à la biomasse
     - Biomasse : calcule et print les émissions totales et consommations énergétiques liées à la biomasse
 
 
@@ -20,6 +24,13 @@ Pistes d'amélioration / évolutions futures :
 
 """
 
+from typing import NamedTuple
+
+import numpy as np
+
+from etapes import instrumentation
+from etapes import rapport
+
 ###############################################################
 # Stockage des paramètres avec les hypothèses sourcées        #
 ###############################################################
@@ -49,6 +60,126 @@ param_biomasse = {
 }   
 
 
+##############################################################
+# Lots de biomasse en colonnes                               #
+##############################################################
+
+# Types de biomasse connus : le code d'un type est sa position dans param_biomasse["sources_biomasse"]
+types_biomasse = tuple(nom for nom in param_biomasse["sources_biomasse"] if isinstance(nom, str))
+
+
+class LotsBiomasse(NamedTuple):
+    """
+    Lots de biomasse rangés en colonnes (un élément par lot), acceptés par toutes les fonctions de calcul à la place
+    de la liste de dictionnaires {'type', 'masse', 'humidité'} : environ 17 octets par lot au lieu de plusieurs
+    centaines pour un dictionnaire, et des calculs vectorisés. Les résultats sont les totaux sur tous les lots.
+    """
+    code_type: np.ndarray  # position du type dans types_biomasse (int8)
+    masse: np.ndarray      # t (float64)
+    humidite: np.ndarray   # fraction (float64)
+
+
+def codes_types_biomasse(noms):
+    """Renvoie les codes (int8, position dans types_biomasse) des noms de types de biomasse donnés.
+
+    Arguments
+    ----------
+        noms : liste des noms de types de biomasse
+
+    Returns
+    -------
+        codes : tableau des codes des types
+    """
+    inconnus = [str(nom) for nom in noms if nom not in types_biomasse]
+    if inconnus:
+        raise ValueError(f"Type(s) de biomasse inconnu(s) : {', '.join(inconnus)} (types connus : {', '.join(types_biomasse)})")
+    return np.array([types_biomasse.index(nom) for nom in noms], dtype=np.int8)
+
+
+def lots_biomasse(types, masses, humidites):
+    """Construit des LotsBiomasse à partir des noms des types (un nom par lot, ou un seul nom pour tous les lots),
+    des masses (t) et des humidités (fraction) des lots.
+
+    Arguments
+    ----------
+        types : nom(s) de type de biomasse (cf. types_biomasse)
+        masses : masses des lots (t)
+        humidites : humidités des lots (fraction)
+
+    Returns
+    -------
+        lots : LotsBiomasse
+    """
+    masses = np.asarray(masses, dtype=np.float64).reshape(-1)
+    humidites = np.broadcast_to(np.asarray(humidites, dtype=np.float64), masses.shape)
+    noms, indices = np.unique(np.broadcast_to(np.asarray(types, dtype=str), masses.shape), return_inverse=True)
+    return LotsBiomasse(codes_types_biomasse(noms)[indices.reshape(-1)], masses, humidites)
+
+
+def _sommes_biomasse(biomasse):
+    """
+    Masses totales de la biomasse d'entrée (liste de dictionnaires ou LotsBiomasse), calculées en un passage sur
+    les lots : masse entrante, masse sèche et masse de bois vert (t).
+    Toutes les grandeurs de la partie biomasse se déduisent de ces trois masses.
+    """
+    if isinstance(biomasse, LotsBiomasse):
+        masse_par_type = np.bincount(biomasse.code_type, biomasse.masse, minlength=len(types_biomasse))
+        masse = masse_par_type.sum()
+        return masse, masse - np.dot(biomasse.masse, biomasse.humidite), masse_par_type[types_biomasse.index("bois_vert")]
+
+    masse, biomasse_seche, masse_bois_vert = 0, 0, 0 # initialisation
+    for b in biomasse: # on parcourt chaque type de biomasse
+        masse += b['masse']
+        biomasse_seche += b['masse'] * (1 - b['humidité'])
+        if b['type'] == "bois_vert":
+            masse_bois_vert += b['masse']
+    return masse, biomasse_seche, masse_bois_vert
+
+
+def _emissions_culture(masse_bois_vert):
+    """Émissions liées à la culture (tCO2e) à partir de la masse de bois vert (t), cf. culture_biomasse."""
+    # Calcul des émissions dues au carbone relâché lors de la coupe/récolte, net à horizon 20 ans
+    # masse/2 la masse de carbone (C) dans le bois (en tonnes)
+    # * (44/12) le stock de CO2 émis à l'abbattage
+    # * (1 + 0.5) qui prend en compte déstockage sol
+    # * (1 - 0.25*(20-1)/(2*20)) moyenne pondérée sur l'horizon, hypothèse taux de substitution de 25% sur 20 ans 
+    # (correspond à un mélange de bois d'abattage feuillus et résineux)
+    emissions_recolte_bois_vert = masse_bois_vert / 2 * (44/12) * (1 + 0.5) * (1 - 0.25*(20-1)/(2*20))  # en tCO2e
+
+    # à terme, y ajouter émissions pour d'autres types de biomasse (agricole, résiduelle, etc.)
+    return emissions_recolte_bois_vert
+
+
+def _emissions_transport(param_biomasse, masse, biomasse_seche):
+    """Émissions liées au transport (tCO2e) à partir des masses entrante et sèche (t), cf. transport_biomasse."""
+    emissions_transport_biomasse = param_biomasse["emissions_transport_biomasse"]/1000  # tCO2e/t.km
+    distance_biomasse_torrefaction = param_biomasse["distance_biomasse-torrefaction"]  # km
+    distance_torrefaction_gazeification = param_biomasse["distance_torrefaction-gazeification"]  # km
+
+    emissions_totales_transport = 0  # initialisation
+    # 1. Calcul des émissions totales liées au transport de la biomasse jusqu'au lieu de torréfaction (en tCO2e)
+    emissions_totales_transport += emissions_transport_biomasse * distance_biomasse_torrefaction * 2 * masse
+    # 2. On ajoute les émissions liées au transport de la biomasse torréfiée jusqu'au site de gazéification
+    emissions_totales_transport += emissions_transport_biomasse * distance_torrefaction_gazeification * 2 * biomasse_seche
+
+    return emissions_totales_transport
+
+
+def _energie_torrefaction(param_biomasse, masse, biomasse_seche):
+    """Énergie thermique de torréfaction (MJ) à partir des masses entrante et sèche (t), cf. traitement_biomasse."""
+    # on récupère la capacité calorifique dans le dictionnaire des paramètres dans une variable plus lisible
+    capacite_calorifique = param_biomasse["capacite_calorifique_biomasse"]  # kJ/kg.K
+
+    # 1. Hypothèse : on chauffe à 200°C depuis 25°C
+    energie_chauffage = masse * capacite_calorifique * (200 - 25) / 1000  # MJ
+
+    # 2. Energie nécessaire pour vaporiser l'eau de la biomasse (masse d'eau = masse - masse sèche)
+    energie_vaporisation = (masse - biomasse_seche) * 2.26476  # en MJ (on utilise la chaleur latente de vaporisation de l'eau)
+
+    # énergie totale nécessaire au procédé de torréfaction
+    return energie_vaporisation + energie_chauffage
+
+
 ##############################################################
 # Fonctions de calcul des émissions                          #
 ##############################################################
@@ -60,20 +191,29 @@ def masse_seche_sortie(biomasse):
     
     Arguments
     ----------
-        biomasse : liste de dictionnaires avec 'type', 'masse' (t) et 'humidité' (fraction) pour chaque élément de biomasse
+        biomasse : liste de dictionnaires avec 'type', 'masse' (t) et 'humidité' (fraction) pour chaque élément de biomasse,
+                   ou LotsBiomasse
         
     Returns
     -------
         biomasse_seche : masse totale de biomasse sèche (t)
     """
+    return _sommes_biomasse(biomasse)[1]
 
-    biomasse_seche = 0 # initialisation
-    for b in biomasse: # on parcourt chaque type de biomasse
-        masse = b['masse']
-        humidite = b['humidité']
-        biomasse_seche += masse * (1 - humidite)
-    
-    return biomasse_seche
+
+def masses_humides_equivalentes(biomasse_seche, humidites=[0.25, 0.40, 0.50, 0.60]):
+    """Calcule les masses de biomasse humide équivalentes à une masse sèche donnée, pour chaque taux d'humidité.
+
+    Arguments
+    ----------
+        biomasse_seche : masse de biomasse sèche à fournir (t)
+        humidites : liste des taux d'humidité (fractions) des biomasses simulées, par défaut [0.25, 0.40, 0.50, 0.60]
+
+    Returns
+    -------
+        masse_eq_bois_vert : liste des masses humides nécessaires pour chaque taux d'humidité (t)
+    """
+    return [biomasse_seche / (1 - h) for h in humidites]
 
 
 def masse_humide_sortie(biomasse_seche, humidites=[0.25, 0.40, 0.50, 0.60], verbose=True):
@@ -92,14 +232,8 @@ def masse_humide_sortie(biomasse_seche, humidites=[0.25, 0.40, 0.50, 0.60], verb
     
     """
 
-    masse_eq_bois_vert = [] #initialisation
-    for h in humidites: #on parcourt humidites
-        masse_eq_bois_vert.append(biomasse_seche / (1 - h))
-
     if verbose: # si verbose, on print les résultats
-        print(f"Pour obtenir {biomasse_seche:,.0f} t de biomasse sèche, il faut :".replace(",", " "))
-        for i, h in enumerate(humidites):
-            print(f" - {masse_eq_bois_vert[i]:,.0f} t de biomasse de type bois vert à {h*100:.0f}% d'humidité".replace(",", " "))
+        rapport.afficher_masses_humides(biomasse_seche, humidites, masses_humides_equivalentes(biomasse_seche, humidites))
     masse_humide = biomasse_seche/(1-0.25)
     return masse_humide # on renvoie la masse humide pour un taux d'humidité de 25% (hypothèse par défaut)
 
@@ -114,27 +248,14 @@ def culture_biomasse(param_biomasse, biomasse):
     Arguments
     ----------
         param_biomasse : dictionnaire des paramètres liés à la biomasse
-        biomasse : liste de dictionnaires avec 'type', 'masse' (t) et 'humidité' (fraction)
+        biomasse : liste de dictionnaires avec 'type', 'masse' (t) et 'humidité' (fraction), ou LotsBiomasse
     
     Returns
     -------
         emissions_totales_culture : émissions totales liées à la culture de la biomasse (tCO2e)
 
     """
-    # Calcul des émissions dues au carbone relâché lors de la coupe/récolte, net à horizon 20 ans
-    # masse/2 la masse de carbone (C) dans le bois (en tonnes)
-    # * (44/12) le stock de CO2 émis à l'abbattage
-    # * (1 + 0.5) qui prend en compte déstockage sol
-    # * (1 - 0.25*(20-1)/(2*20)) moyenne pondérée sur l'horizon, hypothèse taux de substitution de 25% sur 20 ans 
-    # (correspond à un mélange de bois d'abattage feuillus et résineux)
-    masse_bois_vert = sum(biom['masse'] for biom in biomasse if biom['type'] == "bois_vert")  # en tonnes
-    emissions_recolte_bois_vert = masse_bois_vert / 2 * (44/12) * (1 + 0.5) * (1 - 0.25*(20-1)/(2*20))  # en tCO2e
-
-
-    # à terme, y ajouter émissions pour d'autres types de biomasse (agricole, résiduelle, etc.)
-    emissions_totales_culture = emissions_recolte_bois_vert 
-
-    return emissions_totales_culture
+    return _emissions_culture(_sommes_biomasse(biomasse)[2])
 
 
 def transport_biomasse(param_biomasse, biomasse):
@@ -145,24 +266,13 @@ def transport_biomasse(param_biomasse, biomasse):
     Arguments
     ----------
         param_biomasse : dictionnaire des paramètres liés à la biomasse
-        biomasse : liste de dictionnaires avec 'type', 'masse' (t) et 'humidité' (fraction)
+        biomasse : liste de dictionnaires avec 'type', 'masse' (t) et 'humidité' (fraction), ou LotsBiomasse
     Sorties
     -------
         emissions_totales_transport : émissions totales liées au transport de la biomasse (tCO2e)
     """
-
-    biomasse_seche = masse_seche_sortie(biomasse)  # t
-    emissions_transport_biomasse = param_biomasse["emissions_transport_biomasse"]/1000  # tCO2e/t.km
-    distance_biomasse_torrefaction = param_biomasse["distance_biomasse-torrefaction"]  # km
-    distance_torrefaction_gazeification = param_biomasse["distance_torrefaction-gazeification"]  # km
-    
-    emissions_totales_transport = 0  # initialisation
-    # 1. Calcul des émissions totales liées au transport de la biomasse jusqu'au lieu de torréfaction (en tCO2e)
-    emissions_totales_transport += emissions_transport_biomasse * distance_biomasse_torrefaction * 2 * sum(biom['masse'] for biom in biomasse)
-    # 2. On ajoute les émissions liées au transport de la biomasse torréfiée jusqu'au site de gazéification
-    emissions_totales_transport += emissions_transport_biomasse * distance_torrefaction_gazeification * 2 * biomasse_seche
-    
-    return emissions_totales_transport
+    masse, biomasse_seche, _ = _sommes_biomasse(biomasse)  # t
+    return _emissions_transport(param_biomasse, masse, biomasse_seche)
 
 
 def traitement_biomasse(param_biomasse, biomasse_entree):
@@ -172,7 +282,7 @@ def traitement_biomasse(param_biomasse, biomasse_entree):
     Arguments
     ----------
         param_biomasse : dictionnaire des paramètres liés à la biomasse
-        biomasse_entree : liste de dictionnaires avec 'type', 'masse' (t) et 'humidité' (fraction)
+        biomasse_entree : liste de dictionnaires avec 'type', 'masse' (t) et 'humidité' (fraction), ou LotsBiomasse
     
     Returns
     -------
@@ -180,40 +290,76 @@ def traitement_biomasse(param_biomasse, biomasse_entree):
         masse_seche_sortie : masse totale de biomasse sèche après torréfaction (t)
 
     """
-    # on récupère la capacité calorifique dans le dictionnaire des paramètres dans une variable plus lisible
-    capacite_calorifique = param_biomasse["capacite_calorifique_biomasse"]  # kJ/kg.K
+    masse, biomasse_seche, _ = _sommes_biomasse(biomasse_entree)
 
-    # initialisation
-    energie_chauffage = 0  # énergie pour chauffer la biomasse (MJ)
-    energie_vaporisation = 0  # énergie pour vaporiser l'eau de la biom
+    # On renvoie l'énergie thermique consommée (torrefaction, en MJ), et la masse de biomasse sèche sortie (t)
+    return _energie_torrefaction(param_biomasse, masse, biomasse_seche), biomasse_seche
 
-    # Calcul de l'énergie thermique nécessaire pour la torréfaction
-    for entree in biomasse_entree: # on parcourt chaque biomasse d'entrée
-        masse = entree["masse"]
-        humidité = entree["humidité"]
 
-        # 1. Hypothèse : on chauffe à 200°C depuis 25°C
-        energie_chauffage += masse * capacite_calorifique * (200 - 25) / 1000  # MJ 
+@instrumentation.etape("biomasse")
+def bilan_biomasse(param_biomasse, biomasse, sens_physique=True):
+    """Calcule les émissions totales liées à la biomasse, ainsi que les consommations énergétiques.
+    Ne fait aucun affichage : les résultats sont renvoyés dans un dictionnaire (cf. rapport.afficher_biomasse).
+    Les masses peuvent être des tableaux NumPy (un élément par scénario) : le calcul est alors fait en une fois.
+    
+    Arguments
+    ----------
+        param_biomasse : dictionnaire des paramètres liés à la biomasse
+        biomasse : liste de dictionnaires avec 'type', 'masse' (t) et 'humidité' (fraction) ou LotsBiomasse,
+                   ou masse sèche (t) selon valeur de sens_physique
+        sens_physique : booléen pour indiquer le sens du calcul effectué : biomasse -> carburant (True) ou inverse (False)
+        
+    Returns
+    -------
+        resultats : dictionnaire avec
+            - sens_physique : sens du calcul effectué
+            - masse_seche_biomasse : masse totale de biomasse sèche après torréfaction (t)
+            - emissions_culture : émissions liées à la culture de la biomasse (tCO2e)
+            - emissions_transport : émissions liées au transport de la biomasse (tCO2e)
+            - conso_chaleur : consommation thermique liée à la biomasse (MJ)
+            - emissions_totales : émissions totales liées à la biomasse (tCO2e)
+            - en sens inverse seulement : masse_seche_demandee (t), humidites et masses_humides (t) équivalentes
+    """
+    resultats = {"sens_physique": sens_physique}
 
-        # 2. Energie nécessaire pour vaporiser l'eau de la biomasse
-        energie_vaporisation += masse * humidité * 2.26476  # en MJ (on utilise la chaleur latente de vaporisation de l'eau)
+    if not sens_physique:
+        # où biomasse est la masse sèche souhaitée
+        resultats["masse_seche_demandee"] = biomasse
+        resultats["humidites"] = [0.25, 0.40, 0.50, 0.60]
+        resultats["masses_humides"] = masses_humides_equivalentes(biomasse, resultats["humidites"])
+        masse_humide = masse_humide_sortie(biomasse, verbose=False)
 
-    # énergie totale nécessaire au procédé de torréfaction
-    energie_torrefaction = energie_vaporisation + energie_chauffage
+        # On suppose une biomasse humide de type bois vert à 25% d'humidité, et on reprend les calculs
+        # d'émissions dans le sens physique avec cette biomasse humide supposée.
+        biomasse = [{"type": "bois_vert", "masse": masse_humide, "humidité": 0.25}]
 
-    # On renvoie l'énergie thermique consommée (torrefaction, en MJ), et la masse de biomasse sèche sortie (t)
-    return energie_torrefaction, masse_seche_sortie(biomasse_entree)
+    # Un seul passage sur la biomasse d'entrée : toutes les grandeurs se déduisent des masses totales
+    masse, masse_seche_biomasse, masse_bois_vert = _sommes_biomasse(biomasse)
+    emissions_culture = _emissions_culture(masse_bois_vert)
+    emissions_transport = _emissions_transport(param_biomasse, masse, masse_seche_biomasse)
+    conso_chaleur = _energie_torrefaction(param_biomasse, masse, masse_seche_biomasse)
+
+    resultats["masse_seche_biomasse"] = masse_seche_biomasse
+    resultats["emissions_culture"] = emissions_culture
+    resultats["emissions_transport"] = emissions_transport
+    resultats["conso_chaleur"] = conso_chaleur
+    resultats["emissions_totales"] = emissions_culture + emissions_transport
 
+    return resultats
 
-def Biomasse(param_biomasse, biomasse, sens_physique=True):
+
+def Biomasse(param_biomasse, biomasse, sens_physique=True, verbose=True):
     """Calcule les émissions totales liées à la biomasse, ainsi que les consommations énergétiques.
     Affiche les émissions et consommations plus en détail.
+    Les masses peuvent être des tableaux NumPy (un élément par scénario) : le calcul est alors fait en une fois.
     
     Arguments
     ----------
         param_biomasse : dictionnaire des paramètres liés à la biomasse
-        biomasse : liste de dictionnaires avec 'type', 'masse' (t) et 'humidité' (fraction) ou masse sèche (t) selon valeur de sens_physique
+        biomasse : liste de dictionnaires avec 'type', 'masse' (t) et 'humidité' (fraction) ou LotsBiomasse,
+                   ou masse sèche (t) selon valeur de sens_physique
         sens_physique : booléen pour indiquer le sens du calcul effectué : biomasse -> carburant (True) ou inverse (False)
+        verbose : booléen pour print ou non les résultats, par défaut True
         
     Returns
     -------
@@ -221,34 +367,9 @@ def Biomasse(param_biomasse, biomasse, sens_physique=True):
         total_emissions : émissions totales liées à la biomasse (tCO2e)
         masse_seche_biomasse : masse totale de biomasse sèche après torréfaction (t)
     """
-    if sens_physique:
-        print("Calcul des émissions et consommations liées à la biomasse en entrée du processus e-bio-SAF.")
-        emissions_culture = culture_biomasse(param_biomasse, biomasse)
-        emissions_transport = transport_biomasse(param_biomasse, biomasse)
-        conso_chaleur, masse_seche_biomasse = traitement_biomasse(param_biomasse, biomasse)
-        total_emissions_biomasse = emissions_culture + emissions_transport
-    
-    else:
-        print("Calcul des émissions et consommations liées à la biomasse en sortie du processus e-bio-SAF.\n")
-        masse_humide = masse_humide_sortie(biomasse) # où biomasse est la masse sèche souhaitée
-        
-        print("\nOn suppose une biomasse humide de type bois vert à 25% d'humidité")
-        biomasse_humide = [{"type": "bois_vert", "masse": masse_humide, "humidité": 0.25}]
-        
-        # On reprend les calculs d'émissions dans le sens physique avec la biomasse humide supposée.
-        emissions_culture = culture_biomasse(param_biomasse, biomasse_humide)
-        emissions_transport = transport_biomasse(param_biomasse, biomasse_humide)
-        conso_chaleur, masse_seche_biomasse = traitement_biomasse(param_biomasse, biomasse_humide)
-        total_emissions_biomasse = emissions_culture + emissions_transport
-
-    print(f" - Masse de biomasse sèche : \t\t\t\t{masse_seche_biomasse:,.2f} t".replace(",", " "))
-    print(f" - Émissions liées à la culture de la biomasse : \t{emissions_culture:,.2f} tCO2e".replace(",", " "))
-    print(f" - Émissions liées au transport de la biomasse : \t{emissions_transport:,.2f} tCO2e".replace(",", " "))
-    print(f" - Consommation thermique pour la torréfaction : \t{conso_chaleur:,.2f} MJ".replace(",", " "))
-    print(f" - Émissions totales liées à la biomasse : \t\t{total_emissions_biomasse:,.2f} tCO2e\n".replace(",", " "))
-
-    return conso_chaleur, total_emissions_biomasse, masse_seche_biomasse
-
-
+    resultats = bilan_biomasse(param_biomasse, biomasse, sens_physique)
 
+    if verbose:
+        rapport.afficher_biomasse(resultats)
 
+    return resultats["conso_chaleur"], resultats["emissions_totales"], resultats["masse_seche_biomasse"]
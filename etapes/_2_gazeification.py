@@ -8,14 +8,29 @@ Contient :
 - fonctions de conversion utiles pour la gazéification
 - fonctions de bilan de masse pour la gazéification :
     - gazeificationV1 : première version simplifiée de la gazéification
-    - gazeificationV2 : version complète avec bilans atomiques C, H, O
+    - bilan_gazeificationV2 : version complète avec bilans atomiques C, H, O, sans affichage (renvoie un dictionnaire)
+    - gazeificationV2 : version complète avec bilans atomiques C, H, O (affichage optionnel)
+    - compiler_syngas : réduction d'une composition de syngas à ses coefficients par tonne de biomasse sèche
+    - bilan_gazeification_compile : même bilan que bilan_gazeificationV2, évalué à partir des coefficients compilés
 - fonction de calcul de la consommation électrique de la gazéification
 - fonction d'inversion de la gazéification pour retrouver la biomasse nécessaire à une quantité de syngas donnée
+  (bilan_Inv_gazeificationV1 sans affichage, Inv_gazeificationV1 avec affichage optionnel)
+- compiler_syngas_inverse, bilan_Inv_gazeification_compile : même inversion, évaluée à partir de coefficients compilés
+  par tonne de CO
 Paramètres et hypothèses sourcées pour la gazeification, puis fonctions de calcul des émissions.
 """
 
+from collections import OrderedDict
+from types import MappingProxyType
+
+import numpy as np
+
 from etapes import _1_biomasse as biomasse
 from etapes import _5_compression as comp
+from etapes import dual
+from etapes import empreintes
+from etapes import instrumentation
+from etapes import rapport
 
 
 ###############################################################
@@ -157,10 +172,13 @@ def gazeificationV1(biomasseEntree,masseEntree_O2, masseEntree_H2, gaz_params):
 
 
 
-def gazeificationV2(biomasseEntree, gaz_params, caract_syngas):
+@instrumentation.etape("gazeification")
+def bilan_gazeificationV2(biomasseEntree, gaz_params, caract_syngas):
     """
     Deuxième version de la gazéification (plus complète) :
     Bilan complet de masse et de moles pour la gazeification avec bilans atomiques C, H, O.
+    Ne fait aucun affichage (cf. rapport.afficher_gazeification).
+    biomasseEntree peut être un tableau NumPy (un élément par scénario), toutes les sorties sont alors des tableaux.
 
     Arguments
     -----------
@@ -170,11 +188,15 @@ def gazeificationV2(biomasseEntree, gaz_params, caract_syngas):
 
     Returns
     -----------
-        masseCO_sortie :      Masse de CO en sortie de gazeification (tonnes)
-        masseH2_necessaire :  Masse de H2 nécessaire à injecter dans la gazéification (tonnes)
-        masseCO2_sortie :     Masse de CO2 en sortie de gazeification (tonnes)
-        masseO2_necessaire :  Masse d'O2 nécessaire à injecter dans la gazéification (tonnes)
-        masse_dechets :       Masse des autres composés en sortie de la gazéification (tonnes)
+        resultats : dictionnaire avec
+            - biomasse_entree :     Masse de biomasse sèche en entrée (tonnes)
+            - masse_C :             Masse de carbone dans la biomasse (tonnes)
+            - masseCO_sortie :      Masse de CO en sortie de gazeification (tonnes)
+            - masseCO2_sortie :     Masse de CO2 en sortie de gazeification (tonnes)
+            - masseH2_syngaz :      Masse de H2 contenue dans le syngaz (tonnes)
+            - masseH2_necessaire :  Masse de H2 nécessaire à injecter dans la gazéification (tonnes)
+            - masseO2_necessaire :  Masse d'O2 nécessaire à injecter dans la gazéification (tonnes)
+            - masse_dechets :       Masse des autres composés en sortie de la gazéification (tonnes)
     """
 
     # --------------------
@@ -196,7 +218,7 @@ def gazeificationV2(biomasseEntree, gaz_params, caract_syngas):
     }
 
     # Vérification de la condition CO + H2 > 80 %vol (fraction volumique)
-    if caract_syngas_normalized["CO"]["fraction"] + caract_syngas_normalized["H2"]["fraction"] < 0.80:
+    if np.any(caract_syngas_normalized["CO"]["fraction"] + caract_syngas_normalized["H2"]["fraction"] < 0.80):
         raise ValueError("Syngas non conforme : fraction volumique CO + H2 < 80 %")
 
     # ---------------------------------------------
@@ -293,7 +315,7 @@ def gazeificationV2(biomasseEntree, gaz_params, caract_syngas):
     # Calcul de l'O nécessaire à ajouter en entrée de la gazéification pour la combustion
     masseO_necessaire = masseO_dans_syngaz - masseO_biomasse
 
-    masseO2_necessaire = max(0, masseO_necessaire) * 2
+    masseO2_necessaire = np.maximum(0, masseO_necessaire) * 2
 
 
     # ------------------------------
@@ -308,24 +330,136 @@ def gazeificationV2(biomasseEntree, gaz_params, caract_syngas):
 
     masse_dechets = masses_totales_composes.get("CH4", 0) + masses_totales_composes.get("C2H2", 0) + masses_totales_composes.get("C3H6", 0) + masses_totales_composes.get("C20", 0)
     
-    print("\n========== RÉSULTATS GAZÉIFICATION V2 ==========")
-    print(f"Biomasse sèche en entrée      : {biomasseEntree:,.2f} t".replace(",", " "))
-    print(f"Carbone dans la biomasse      : {masse_C:,.2f} t".replace(",", " "))
-    print("------------------------------------------------")
-    print(f"CO produit                    : {masseCO_sortie:,.2f} t".replace(",", " "))
-    print(f"CO₂ produit                   : {masseCO2_sortie:,.2f} t".replace(",", " "))
-    print(f"H₂ dans syngaz                : {masseH2_syngaz:,.2f} t".replace(",", " "))
-    print(f"H₂ à ajouter                  : {masseH2_necessaire:,.2f} t".replace(",", " "))
-    print(f"O₂ nécessaire                 : {masseO2_necessaire:,.2f} t".replace(",", " "))
-    print(f"Masse déchets estimée         : {masse_dechets:,.2f} t".replace(",", " "))
-    print("================================================\n")
+    return {
+        "biomasse_entree": biomasseEntree,
+        "masse_C": masse_C,
+        "masseCO_sortie": masseCO_sortie,
+        "masseCO2_sortie": masseCO2_sortie,
+        "masseH2_syngaz": masseH2_syngaz,
+        "masseH2_necessaire": masseH2_necessaire,
+        "masseO2_necessaire": masseO2_necessaire,
+        "masse_dechets": masse_dechets,
+    }
+
+
+def gazeificationV2(biomasseEntree, gaz_params, caract_syngas, verbose=True):
+    """
+    Deuxième version de la gazéification (plus complète) :
+    Bilan complet de masse et de moles pour la gazeification avec bilans atomiques C, H, O (cf. bilan_gazeificationV2).
+    biomasseEntree peut être un tableau NumPy (un élément par scénario), toutes les sorties sont alors des tableaux.
+
+    Arguments
+    -----------
+        biomasseEntree :  Masse de biomasse sèche en entrée (tonnes)
+        gaz_params :      Paramètres de la gazéification
+        caract_syngas :   Caractéristiques du syngas produit (fractions massiques, nombres d'atomes, masses molaires)
+        verbose :         booléen pour print ou non les résultats, par défaut True
 
-    return masseCO_sortie, masseH2_necessaire, masseCO2_sortie, masseO2_necessaire, masse_dechets
+    Returns
+    -----------
+        masseCO_sortie :      Masse de CO en sortie de gazeification (tonnes)
+        masseH2_necessaire :  Masse de H2 nécessaire à injecter dans la gazéification (tonnes)
+        masseCO2_sortie :     Masse de CO2 en sortie de gazeification (tonnes)
+        masseO2_necessaire :  Masse d'O2 nécessaire à injecter dans la gazéification (tonnes)
+        masse_dechets :       Masse des autres composés en sortie de la gazéification (tonnes)
+    """
+    resultats = bilan_gazeificationV2(biomasseEntree, gaz_params, caract_syngas)
+
+    if verbose:
+        rapport.afficher_gazeification(resultats)
 
+    return resultats["masseCO_sortie"], resultats["masseH2_necessaire"], resultats["masseCO2_sortie"], \
+        resultats["masseO2_necessaire"], resultats["masse_dechets"]
 
 
 
-def conso_elec_gazeification(masse_CO2 : float, masse_H2 : float, masse_seche_biomasse : float, gaz_params : dict) -> float:
+###############################################################
+# Noyau compilé de la gazéification
+###############################################################
+
+# Le bilan de bilan_gazeificationV2 est linéaire en la masse de biomasse sèche : toutes les masses de sortie sont
+# proportionnelles à biomasseEntree, y compris l'O2 nécessaire car max(0, a*m) = m*max(0, a) pour m >= 0.
+# Une composition de syngas (gaz_params, caract_syngas) se réduit donc à un coefficient par tonne de biomasse sèche
+# pour chaque sortie : c'est le noyau compilé, mémorisé pour les appels suivants.
+
+taille_max_noyaux = 32        # nombre de noyaux compilés gardés en mémoire
+_noyaux_syngas = OrderedDict() # empreinte de (gaz_params, caract_syngas) -> noyau compilé
+
+
+def _figer(noyau):
+    """
+    Renvoie une vue en lecture seule d'un noyau compilé (MappingProxyType, tableaux copiés et non modifiables) :
+    le noyau mémorisé est partagé par tous les appels de mêmes paramètres et ne doit pas pouvoir être modifié.
+    """
+    def figer(valeur):
+        if isinstance(valeur, dual.Dual):
+            return dual.Dual(figer(valeur.valeur), figer(valeur.derivees))
+        if isinstance(valeur, np.ndarray):
+            valeur = valeur.copy()
+            valeur.flags.writeable = False
+        return valeur
+    return MappingProxyType({sortie: figer(valeur) for sortie, valeur in noyau.items()})
+
+
+def compiler_syngas(gaz_params, caract_syngas):
+    """
+    Réduit une composition de syngas à ses coefficients par tonne de biomasse sèche (normalisation des fractions,
+    conversion en fractions massiques et bilans atomiques faits une seule fois). Le noyau est mémorisé : un nouvel
+    appel avec des paramètres de même contenu le renvoie sans recalcul.
+    Les paramètres peuvent contenir des tableaux NumPy (un élément par scénario), les coefficients sont alors des tableaux.
+
+    Arguments
+    -----------
+        gaz_params :      Paramètres de la gazéification
+        caract_syngas :   Caractéristiques du syngas produit (fractions massiques, nombres d'atomes, masses molaires)
+
+    Returns
+    -----------
+        noyau : dictionnaire en lecture seule {sortie de bilan_gazeificationV2 : masse par tonne de biomasse sèche
+                (t/t)} avec masse_C, masseCO_sortie, masseCO2_sortie, masseH2_syngaz, masseH2_necessaire,
+                masseO2_necessaire et masse_dechets (cf. _figer)
+    """
+    cle = empreintes.empreinte(gaz_params, caract_syngas)
+    if cle in _noyaux_syngas:
+        _noyaux_syngas.move_to_end(cle)
+        return _noyaux_syngas[cle]
+
+    resultats = bilan_gazeificationV2(1.0, gaz_params, caract_syngas) # bilan pour 1 t de biomasse sèche
+    noyau = _figer({sortie: masse for sortie, masse in resultats.items() if sortie != "biomasse_entree"})
+
+    _noyaux_syngas[cle] = noyau
+    while len(_noyaux_syngas) > taille_max_noyaux:
+        _noyaux_syngas.popitem(last=False)
+    return noyau
+
+
+@instrumentation.etape("gazeification")
+def bilan_gazeification_compile(biomasseEntree, gaz_params, caract_syngas):
+    """
+    Bilan de la gazéification (mêmes sorties que bilan_gazeificationV2) évalué à partir du noyau compilé de la
+    composition de syngas (cf. compiler_syngas) : une multiplication par sortie, quelle que soit la taille du lot.
+    biomasseEntree peut être un tableau NumPy (un élément par scénario), toutes les sorties sont alors des tableaux.
+
+    Arguments
+    -----------
+        biomasseEntree :  Masse de biomasse sèche en entrée (tonnes), positive
+        gaz_params :      Paramètres de la gazéification
+        caract_syngas :   Caractéristiques du syngas produit (fractions massiques, nombres d'atomes, masses molaires)
+
+    Returns
+    -----------
+        resultats : dictionnaire (cf. bilan_gazeificationV2)
+    """
+    noyau = compiler_syngas(gaz_params, caract_syngas)
+    return {"biomasse_entree": biomasseEntree,
+            **{sortie: coefficient * biomasseEntree for sortie, coefficient in noyau.items()}}
+
+
+
+
+@instrumentation.etape("gazeification")
+def conso_elec_gazeification(masse_CO2 : float, masse_H2 : float, masse_seche_biomasse : float, gaz_params : dict,
+                             param_biomasse : dict = biomasse.param_biomasse) -> float:
     """
     Calcul de la consommation électrique de gazéification : 
         - consommation liée aux entrants de la gazéification : biomasse et H2.
@@ -337,6 +471,7 @@ def conso_elec_gazeification(masse_CO2 : float, masse_H2 : float, masse_seche_bi
         masse_H2 :              Masse de H2 utilisée par la gazéification (tonnes)
         masse_seche_biomasse :  Masse de biomasse sèche utilisée par la gazéification (tonnes)
         gaz_params :            Paramètres de la gazéification
+        param_biomasse :        Paramètres de la biomasse (PCI), par défaut ceux du module biomasse
     
     Returns
     -------
@@ -344,7 +479,7 @@ def conso_elec_gazeification(masse_CO2 : float, masse_H2 : float, masse_seche_bi
         prendre en compte la compression du syngaz (cf étape 7 compression) (kWh)
     """
     energie_entrants_H2 = masse_H2 * comp.carac_physico_chimiques["H2"]["PCI"] * 1000/3.6                         # en kWh
-    energie_entrants_bois = masse_seche_biomasse * biomasse.param_biomasse['PCI_biomasse']                    # en kWh
+    energie_entrants_bois = masse_seche_biomasse * param_biomasse['PCI_biomasse']                             # en kWh
     energie_entrants = (energie_entrants_H2 + energie_entrants_bois)*gaz_params['fonctionnement_interne']/100 # en kWh
     energie_desorption_filtres_amines = masse_CO2 * gaz_params["filtres_amine"] * 1000/3.6                        # en kWh
     energie_gazeification = energie_desorption_filtres_amines + energie_entrants                              # en kWh
@@ -355,8 +490,11 @@ def conso_elec_gazeification(masse_CO2 : float, masse_H2 : float, masse_seche_bi
 #Inversion du code pour retrouver la biomasse nécessaire à une quantité de syngas donnée
 ################################################################
 
-def Inv_gazeificationV1(masseCO_sortie, gaz_params, caract_syngas):
+@instrumentation.etape("gazeification")
+def bilan_Inv_gazeificationV1(masseCO_sortie, gaz_params, caract_syngas):
     """Fonction d'inversion de la gazéification pour retrouver la biomasse nécessaire à une quantité de syngas donnée.
+    Ne fait aucun affichage (cf. rapport.afficher_gazeification_inverse).
+    masseCO_sortie peut être un tableau NumPy (un élément par scénario), toutes les sorties sont alors des tableaux.
     
     Arguments
     -----------
@@ -366,10 +504,14 @@ def Inv_gazeificationV1(masseCO_sortie, gaz_params, caract_syngas):
         
     Returns
     -----------
-        biomasse_entree :     Masse de biomasse sèche en entrée (tonnes)
-        masseH2_necessaire :  Masse de H2 nécessaire à injecter dans la gazéification (tonnes)
-        masseO2_necessaire :  Masse d'O2 nécessaire à injecter dans la gazéification (tonnes)
-        masseCO2_sortie :     Masse de CO2 en sortie de gazeification (tonnes)
+        resultats : dictionnaire avec
+            - masseCO_sortie :      Masse de CO en sortie de gazeification (tonnes)
+            - biomasse_entree :     Masse de biomasse sèche en entrée (tonnes)
+            - masseH2_syngaz :      Masse de H2 contenue dans le syngaz (tonnes)
+            - masseH2_necessaire :  Masse de H2 nécessaire à injecter dans la gazéification (tonnes)
+            - masseO2_necessaire :  Masse d'O2 nécessaire à injecter dans la gazéification (tonnes)
+            - masseCO2_sortie :     Masse de CO2 en sortie de gazeification (tonnes)
+            - masse_dechets :       Masse estimée des autres composés (tonnes)
     """
 
     # Normalisation des fractions 
@@ -383,7 +525,7 @@ def Inv_gazeificationV1(masseCO_sortie, gaz_params, caract_syngas):
     }
 
     # Vérification de la condition CO + H2 > 80 % (fraction volumique)
-    if caract_syngas_normalized["CO"]["fraction"] + caract_syngas_normalized["H2"]["fraction"] < 0.80:
+    if np.any(caract_syngas_normalized["CO"]["fraction"] + caract_syngas_normalized["H2"]["fraction"] < 0.80):
         raise ValueError("Syngas non conforme : fraction volumique CO + H2 < 80 %")
 
     # ------------------------------
@@ -453,7 +595,7 @@ def Inv_gazeificationV1(masseCO_sortie, gaz_params, caract_syngas):
     # Calcul de l'O nécessaire à ajouter en entrée de la gazéification pour la combustion
     masseO_necessaire = masseO_dans_syngaz - masseO_biomasse
 
-    masseO2_necessaire = max(0, masseO_necessaire) * 2
+    masseO2_necessaire = np.maximum(0, masseO_necessaire) * 2
 
     # ------------------------------
     # Calcul H2 à injecter et nécessaire        
@@ -474,16 +616,97 @@ def Inv_gazeificationV1(masseCO_sortie, gaz_params, caract_syngas):
     #Estimation masse déchets (méthane, autres hydrocarbures)
     masse_dechets = masses_totales_composes.get("CH4", 0) + masses_totales_composes.get("C2H2", 0) + masses_totales_composes.get("C3H6", 0) + masses_totales_composes.get("C20", 0)
 
-    print("\n========== RÉSULTATS GAZÉIFICATION INVERSE V1 ==========")
-    print(f"CO FT                         : {masseCO_sortie:,.2f} t".replace(",", " "))
-    print("------------------------------------------------")
-    print(f"CO₂ émis                      : {masseCO2_sortie:,.2f} t".replace(",", " "))
-    print(f"Biomasse sèche en entrée      : {biomasse_entree:,.2f} t".replace(",", " "))
-    print(f"O₂ nécessaire                 : {masseO2_necessaire:,.2f} t".replace(",", " "))
-    print(f"H₂ dans syngaz                : {masseH2_syngaz:,.2f} t".replace(",", " "))
-    print(f"H₂ à ajouter                  : {masseH2_necessaire:,.2f} t".replace(",", " "))
-    print(f"Masse estimée déchets         : {masse_dechets:,.2f} t".replace(",", " "))
-    print("------------------------------------------------")
+    return {
+        "masseCO_sortie": masseCO_sortie,
+        "biomasse_entree": biomasse_entree,
+        "masseH2_syngaz": masseH2_syngaz,
+        "masseH2_necessaire": masseH2_necessaire,
+        "masseO2_necessaire": masseO2_necessaire,
+        "masseCO2_sortie": masseCO2_sortie,
+        "masse_dechets": masse_dechets,
+    }
+
+
+def Inv_gazeificationV1(masseCO_sortie, gaz_params, caract_syngas, verbose=True):
+    """Fonction d'inversion de la gazéification pour retrouver la biomasse nécessaire à une quantité de syngas donnée
+    (cf. bilan_Inv_gazeificationV1).
+    masseCO_sortie peut être un tableau NumPy (un élément par scénario), toutes les sorties sont alors des tableaux.
+    
+    Arguments
+    -----------
+        masseCO_sortie :  Masse de CO en sortie de gazeification (tonnes)
+        gaz_params :      Paramètres de la gazéification
+        caract_syngas :   Caractéristiques du syngas produit (fractions massiques, nombres d'atomes, masses molaires)
+        verbose :         booléen pour print ou non les résultats, par défaut True
+        
+    Returns
+    -----------
+        biomasse_entree :     Masse de biomasse sèche en entrée (tonnes)
+        masseH2_necessaire :  Masse de H2 nécessaire à injecter dans la gazéification (tonnes)
+        masseO2_necessaire :  Masse d'O2 nécessaire à injecter dans la gazéification (tonnes)
+        masseCO2_sortie :     Masse de CO2 en sortie de gazeification (tonnes)
+    """
+    resultats = bilan_Inv_gazeificationV1(masseCO_sortie, gaz_params, caract_syngas)
+
+    if verbose:
+        rapport.afficher_gazeification_inverse(resultats)
+
+    return resultats["biomasse_entree"], resultats["masseH2_necessaire"], resultats["masseO2_necessaire"], \
+        resultats["masseCO2_sortie"]
 
-    return biomasse_entree, masseH2_necessaire, masseO2_necessaire, masseCO2_sortie
 
+
+###############################################################
+# Noyau compilé de l'inversion de la gazéification
+###############################################################
+
+# Le bilan de bilan_Inv_gazeificationV1 est de même linéaire en la masse de CO en sortie : une composition de syngas
+# se réduit à un coefficient par tonne de CO pour chaque sortie (noyau mémorisé avec ceux de compiler_syngas).
+
+def compiler_syngas_inverse(gaz_params, caract_syngas):
+    """
+    Réduit une composition de syngas à ses coefficients par tonne de CO en sortie de gazéification, pour l'inversion
+    (cf. bilan_Inv_gazeificationV1). Le noyau est mémorisé comme celui de compiler_syngas.
+
+    Arguments
+    -----------
+        gaz_params :      Paramètres de la gazéification
+        caract_syngas :   Caractéristiques du syngas produit (fractions massiques, nombres d'atomes, masses molaires)
+
+    Returns
+    -----------
+        noyau : dictionnaire en lecture seule {sortie de bilan_Inv_gazeificationV1 : masse par tonne de CO (t/t)}
+    """
+    cle = empreintes.empreinte("inverse", gaz_params, caract_syngas)
+    if cle in _noyaux_syngas:
+        _noyaux_syngas.move_to_end(cle)
+        return _noyaux_syngas[cle]
+
+    resultats = bilan_Inv_gazeificationV1(1.0, gaz_params, caract_syngas) # bilan pour 1 t de CO
+    noyau = _figer({sortie: masse for sortie, masse in resultats.items() if sortie != "masseCO_sortie"})
+
+    _noyaux_syngas[cle] = noyau
+    while len(_noyaux_syngas) > taille_max_noyaux:
+        _noyaux_syngas.popitem(last=False)
+    return noyau
+
+
+@instrumentation.etape("gazeification")
+def bilan_Inv_gazeification_compile(masseCO_sortie, gaz_params, caract_syngas):
+    """
+    Inversion de la gazéification (mêmes sorties que bilan_Inv_gazeificationV1) évaluée à partir du noyau compilé
+    (cf. compiler_syngas_inverse) : une multiplication par sortie, quelle que soit la forme du tableau de masses.
+
+    Arguments
+    -----------
+        masseCO_sortie :  Masse de CO en sortie de gazeification (tonnes), positive ; nombre ou tableau NumPy
+        gaz_params :      Paramètres de la gazéification
+        caract_syngas :   Caractéristiques du syngas produit (fractions massiques, nombres d'atomes, masses molaires)
+
+    Returns
+    -----------
+        resultats : dictionnaire (cf. bilan_Inv_gazeificationV1)
+    """
+    noyau = compiler_syngas_inverse(gaz_params, caract_syngas)
+    return {"masseCO_sortie": masseCO_sortie,
+            **{sortie: coefficient * masseCO_sortie for sortie, coefficient in noyau.items()}}
@@ -7,9 +7,13 @@ Contient :
    - Fischer_Tropsch : calcule la consommation électrique totale et les émissions de CO2 liées à l'étape FT
    - Inv_Fischer_Tropsch : calcule la masse de CO nécessaire pour obtenir une certaine masse de kérosène produite, 
      ainsi que les émissions et consommation électrique associées.
+   - bilan_Fischer_Tropsch et bilan_Inv_Fischer_Tropsch : mêmes calculs, sans affichage (renvoient un dictionnaire)
 
 """
 
+from etapes import instrumentation
+from etapes import rapport
+
 
 ###############################################################
 # Stockage des paramètres avec les hypothèses sourcées        #
@@ -50,22 +54,26 @@ param_FT = {
 # Fonctions de calcul des émissions
 ##############################################################
 
-def Fischer_Tropsch(param_FT, CO_gazif): # Utilise la masse de CO issue de la gazéification
+@instrumentation.etape("FT")
+def bilan_Fischer_Tropsch(param_FT, CO_gazif): # Utilise la masse de CO issue de la gazéification
    """
    Cette fonction calcule la consommation électrique totale et les émissions de CO2 liées à l'étape FT.
    L'étape FT n'est pas modélisée, c'est une extrapolation à partir du tableau ADEME.
    On calcule d'abord un premier ratio qu'on obtient à partir des données prévisionnelles de Elyse
    puis on se sert d'une règle de trois pour obtenir les résultats pour notre cas.
+   Ne fait aucun affichage (cf. rapport.afficher_FT).
 
    Arguments :
    -----------
        - param_FT : dictionnaire des paramètres de l'étape FT
-       - CO_gazif : masse de CO issue de la gazéification (t)
+       - CO_gazif : masse de CO issue de la gazéification (t), scalaire ou tableau NumPy (un élément par scénario)
 
    Returns :
    ----------
-       - consommation_totale_FT : consommation électrique totale de l'étape FT (kWh/an)
-       - masse_kerosene_produite : masse de kérosène produite (t)
+       - resultats : dictionnaire avec
+           - CO_gazif : masse de CO issue de la gazéification (t)
+           - consommation_totale_FT : consommation électrique totale de l'étape FT (kWh/an)
+           - masse_kerosene_produite : masse de kérosène produite (t)
    """
 
 
@@ -90,36 +98,80 @@ def Fischer_Tropsch(param_FT, CO_gazif): # Utilise la masse de CO issue de la ga
    # emissions_rendement_carbone = emissions_rendement_carbone * (CO_gazif / param_FT['MasseCO_gazif_Elyse']) # en tCO2e, non utilisé
    masse_kerosene_produite = param_FT['production_BioTJet'] * (CO_gazif / param_FT['MasseCO_gazif_Elyse'])  # en t
 
+   return {
+      "CO_gazif": CO_gazif,
+      "consommation_totale_FT": consommation_totale_FT,
+      "masse_kerosene_produite": masse_kerosene_produite,
+   }
+
+
+def Fischer_Tropsch(param_FT, CO_gazif, verbose=True): # Utilise la masse de CO issue de la gazéification
+   """
+   Cette fonction calcule la consommation électrique totale et les émissions de CO2 liées à l'étape FT
+   (cf. bilan_Fischer_Tropsch), et affiche les résultats si demandé.
+
+   Arguments :
+   -----------
+       - param_FT : dictionnaire des paramètres de l'étape FT
+       - CO_gazif : masse de CO issue de la gazéification (t), scalaire ou tableau NumPy (un élément par scénario)
+       - verbose : booléen pour print ou non les résultats, par défaut True
+
+   Returns :
+   ----------
+       - consommation_totale_FT : consommation électrique totale de l'étape FT (kWh/an)
+       - masse_kerosene_produite : masse de kérosène produite (t)
+   """
+   resultats = bilan_Fischer_Tropsch(param_FT, CO_gazif)
+
    # affichage des résultats
-   print("\n================ Résultats Fischer-Tropsch ================")
-   print(f"Consommation électrique totale FT : {consommation_totale_FT:,.2f} kWh".replace(",", " "))
-   print(f"Masse de kérosène produite : {masse_kerosene_produite:,.2f} t".replace(",", " "))
-   print("===========================================================\n")
+   if verbose:
+      rapport.afficher_FT(resultats)
 
-   return consommation_totale_FT, masse_kerosene_produite
+   return resultats["consommation_totale_FT"], resultats["masse_kerosene_produite"]
 
 
 ##############################################################
 # Inversion de la fonction FT pour obtenir la masse de CO nécessaire
 ##############################################################
-def Inv_Fischer_Tropsch(param_FT, masse_kerosene_voulue):
+@instrumentation.etape("FT")
+def bilan_Inv_Fischer_Tropsch(param_FT, masse_kerosene_voulue):
    """
    Cette fonction calcule les émissions et la consommation électrique associée à une masse de kérosène voulue,
-   ainsi que la masse de CO nécessaire à la production de kerosene voulue.
+   ainsi que la masse de CO nécessaire à la production de kerosene voulue. Ne fait aucun affichage.
 
     Arguments :
-       - masse de kérosène à produire (t)
+       - masse de kérosène à produire (t), scalaire ou tableau NumPy (un élément par scénario)
     
     Sorties :
-       - consommation électrique totale de l'étape FT (kWh)
-       - masse de CO nécessaire (t)
+       - dictionnaire des résultats de bilan_Fischer_Tropsch, complété par CO_necessaire : masse de CO nécessaire (t)
    """
    # on se sert d'une règle de trois pour obtenir la masse de CO nécessaire
    CO_necessaire = (masse_kerosene_voulue / param_FT['production_BioTJet']) * param_FT['MasseCO_gazif_Elyse']
 
-   # on calcule les émissions et la consommation électrique associée grace à la fonction Fischer_Tropsch()
-   consommation_totale_FT, _ = Fischer_Tropsch(param_FT, CO_necessaire)
+   # on calcule les émissions et la consommation électrique associée grace à la fonction bilan_Fischer_Tropsch()
+   resultats = bilan_Fischer_Tropsch(param_FT, CO_necessaire)
+   resultats["CO_necessaire"] = CO_necessaire
+
+   return resultats
+
+
+def Inv_Fischer_Tropsch(param_FT, masse_kerosene_voulue, verbose=True):
+   """
+   Cette fonction calcule les émissions et la consommation électrique associée à une masse de kérosène voulue,
+   ainsi que la masse de CO nécessaire à la production de kerosene voulue (cf. bilan_Inv_Fischer_Tropsch).
 
+    Arguments :
+       - masse de kérosène à produire (t), scalaire ou tableau NumPy (un élément par scénario)
+       - verbose : booléen pour print ou non les résultats, par défaut True
     
-   return consommation_totale_FT, CO_necessaire
+    Sorties :
+       - consommation électrique totale de l'étape FT (kWh)
+       - masse de CO nécessaire (t)
+   """
+   resultats = bilan_Inv_Fischer_Tropsch(param_FT, masse_kerosene_voulue)
+
+   if verbose:
+      rapport.afficher_FT(resultats)
+
+   return resultats["consommation_totale_FT"], resultats["CO_necessaire"]
 
@@ -7,6 +7,7 @@ Contient :
     - param_electrolyseur_PEM : paramètres pour l'électrolyseur PEM
  - Fonctions de calcul :
     - consom_elec_stack : calcule la consommation électrique stackée pour une technologie cible à partir de la technologie de référence
+    - enregistrer_technologie, technologie, parametres_technologie : registre des technologies d'électrolyseur
     - coherence_electrolyse : vérifie la cohérence entre la production d'H2 et d'O2
     - consommation_electrolyseur : calcule la consommation électrique totale de l'électrolyseur
 
@@ -16,9 +17,15 @@ La méthode appliquée permet de calculer les performances d'un électrolyseur A
 avec des  technologies de 2020 et supposées être disponibles en 2030. 
 
 Deux autres méthodes d'électrolyse sont en cours d'étude (SOEC = Solide Oxide Electrolysis Cell
-et AEM = Anion Exchange Membrane) mais ne sont pas encore intégrées dans ce modèle.
+et AEM = Anion Exchange Membrane) mais ne sont pas encore intégrées dans ce modèle : elles pourront être ajoutées au
+registre des technologies (cf. enregistrer_technologie) lorsque leurs paramètres seront sourcés.
 """
 
+import threading
+from typing import NamedTuple
+
+from etapes import instrumentation
+
 ### Coordination sur les unités utilisées :
 # Energie (électricité) en kWh
 # Masse en t
@@ -64,7 +71,8 @@ param_electrolyseur_PEM = {
 
 # Pour ajouter une nouvelle technologie d'électrolyseur, il suffit de créer un nouveau dictionnaire
 # avec les paramètres correspondants (faire une copie des précédents, changer les valeurs et adapter 
-# le nom) et de l'utiliser dans les fonctions ci-dessous.
+# le nom) et de l'utiliser dans les fonctions ci-dessous, ou de l'enregistrer dans le registre des
+# technologies (cf. enregistrer_technologie).
 
 
 
@@ -83,6 +91,7 @@ def consom_elec_stack(param_electrolyseur_ref, param_electrolyseur_cible):
     """
     Calcul de la consommation électrique stackée de l'électrolyseur cible (PEM ou autre) à partir de la 
     référence (Alcalin) en ajustant (normalisation) avec les rendements respectifs.
+    Ne modifie pas les dictionnaires de paramètres (les calculs concurrents ne dépendent pas de l'ordre d'exécution).
 
     Arguments
     -----------
@@ -100,14 +109,88 @@ def consom_elec_stack(param_electrolyseur_ref, param_electrolyseur_cible):
     
     # Calcul de la consommation électrique stackée pour la technologie cible
     consommation_stack_cible = consommation_stack_ref * (rendement_ref / rendement_cible)
-    
-    # Mise à jour du dictionnaire de paramètres de l'électrolyseur cible
-    param_electrolyseur_cible["consommation_electricite_stack"] = consommation_stack_cible
 
     return consommation_stack_cible
 
 
 
+##############################################################
+# Registre des technologies d'électrolyseur
+##############################################################
+
+"""
+Chaque technologie est enregistrée une fois, sous un nom, dans un registre : sa consommation électrique stackée est
+calculée à l'enregistrement (cf. consom_elec_stack) si elle n'est pas connue. Les entrées du registre sont des
+tuples nommés immuables, transmissibles aux processus d'un balayage (picklables), et la recherche par nom est directe.
+Le registre n'est jamais modifié en place : un enregistrement remplace le dictionnaire par une copie complétée,
+ce qui permet de le lire depuis plusieurs fils d'exécution sans verrou.
+"""
+
+class TechnologieElectrolyseur(NamedTuple):
+    """Paramètres figés d'une technologie d'électrolyseur (mêmes clés que param_electrolyseur_alcalin)."""
+    nom: str
+    efficacite_electrolyseur: float
+    consommation_electricite_stack: float  # kWh/tonnes H2
+    pertes: float
+
+    def parametres(self):
+        """Renvoie les paramètres sous forme de dictionnaire (cf. consommation_electrolyseur)."""
+        return {cle: valeur for cle, valeur in self._asdict().items() if cle != "nom"}
+
+
+technologies = {} # nom : TechnologieElectrolyseur
+_verrou_registre = threading.Lock()
+
+
+def enregistrer_technologie(nom, efficacite_electrolyseur, consommation_electricite_stack=None, pertes=0.979,
+                            reference=param_electrolyseur_alcalin):
+    """
+    Enregistre (ou remplace) une technologie d'électrolyseur dans le registre.
+
+    Arguments
+    ----------
+        nom : nom de la technologie (ex : "PEM")
+        efficacite_electrolyseur : efficacité de l'électrolyseur
+        consommation_electricite_stack : consommation d'électricité stackée (kWh/tonnes H2) ; si None, elle est
+                                         calculée à partir de la technologie de référence (cf. consom_elec_stack)
+        pertes : pertes en ligne sur le réseau de distribution
+        reference : paramètres de la technologie de référence, par défaut l'électrolyse alcaline
+
+    Returns
+    ----------
+        technologie : TechnologieElectrolyseur enregistrée
+    """
+    global technologies
+
+    if consommation_electricite_stack is None:
+        consommation_electricite_stack = consom_elec_stack(reference,
+                                                           {"efficacite_electrolyseur": efficacite_electrolyseur})
+    entree = TechnologieElectrolyseur(nom, efficacite_electrolyseur, consommation_electricite_stack, pertes)
+
+    with _verrou_registre:
+        technologies = {**technologies, nom: entree}
+    return entree
+
+
+def technologie(nom):
+    """Renvoie la technologie d'électrolyseur enregistrée sous ce nom (TechnologieElectrolyseur)."""
+    try:
+        return technologies[nom]
+    except KeyError:
+        raise ValueError(f"Technologie d'électrolyseur inconnue : {nom} (disponibles : {', '.join(technologies)})")
+
+
+def parametres_technologie(nom):
+    """Renvoie les paramètres (nouveau dictionnaire) de la technologie d'électrolyseur enregistrée sous ce nom."""
+    return technologie(nom).parametres()
+
+
+enregistrer_technologie("alcalin", **{cle: param_electrolyseur_alcalin[cle] for cle in
+                                      ("efficacite_electrolyseur", "consommation_electricite_stack", "pertes")})
+enregistrer_technologie("PEM", **param_electrolyseur_PEM)
+
+
+
 ##############################################################
 # Vérification de la cohérence de la production de H2 et 02
 ##############################################################
@@ -155,6 +238,7 @@ def coherence_electrolyse(besoin_H2, besoin_O2):
 
 
 
+@instrumentation.etape("electrolyseur")
 def consommation_electrolyseur(param_electrolyseur, besoin_O2_gazif, besoin_H2_gazif):
     """
     Arguments
@@ -2,13 +2,19 @@
 PARTIE : Compression des gaz
 
 Contient :
-    - carac_physico_chimiques : Paramètres physico-chimiques des gaz
+    - carac_physico_chimiques : Paramètres physico-chimiques des gaz (définis dans proprietes_thermo)
+    - param_compression : Hypothèses de compression (rendement, pressions, température) des flux du procédé
     - Fonctions de calcul de la consommation électrique de compression des gaz :
-        - param_temp_variable : Obtention des paramètres physico-chimiques en fonction de la température
+        - param_temp_variable : Obtention des paramètres physico-chimiques en fonction de la température (cf. proprietes_thermo)
         - calcul_echauffement_isenthropique : Calcul de l'échauffement isenthropique
         - compression_isentropique : Calcul de la température après compression isentropique
         - conso_compression : Calcul de la consommation électrique de compression d'un gaz unique
         - conso_compression_syngaz : Calcul de la consommation électrique de compression du syngas (CO2, H2, CO)
+        - conso_compression_procede : Calcul de la consommation électrique de toutes les compressions du procédé (O2, CO2, syngas)
+    - Tables de compression précalculées (interpolation dans une grille T0 x rapport de pression) :
+        - construire_table_compression, charger_tables_compression : construction / chargement (fichier cache) des tables
+        - compression_isentropique_table, conso_compression_table, conso_compression_syngaz_table : équivalents 
+          vectorisés de compression_isentropique, conso_compression et conso_compression_syngaz
 
 Description :
 Calcul des émissions liées à la compression les différents gaz impliqués dans le procédé E-CHO.
@@ -22,94 +28,44 @@ Hypothèses :
     - Utilisation du référentielle SHE/Turbomeca pour l'02
 """
 
+import os
+from functools import partial
+
+import numpy as np
+
+from etapes import dual
+from etapes import instrumentation
+from etapes import proprietes_thermo as thermo
+
 ###############################################################
 # Zone de données : Paramètres physico-chimiques des gaz      #
 ###############################################################
 
-carac_physico_chimiques = {
-    "CH4" : {
-        "T" : 298.15,               # Température (K)
-        "P" : 1,                    # Pression (bar) à T=298.15 K
-        "masse_molaire" : 16.0425,  # Masse molaire (g/mol)
-        "Cp" : 2.2316,              # Capacité calorifique à pression contante (kJ/kg.K) à 288.15 K
-        "Cv" : 1.7133,              # Capacité calorifique à volume constant (kJ/kg.K) à 288.15 K
-    },
-
-    "H2" : {
-        "T" : 298.15,               # Température (K)
-        "P" : 1,                    # Pression (bar) à T=298.15 K
-        "PCI" : 120.39,             # Pouvoir Calorifique Inférieur (MJ/kg) à T=298.15 K
-        "PCS" : 141.77,             # Pouvoir Calorifique Supérieur (MJ/kg) à T=298.15 K
-        "densite" : 0.0852,         # Densité (kg/m3) à 288.15 K et 1 bar 
-        "masse_molaire" : 2.01588,  # Masse molaire (g/mol)
-        "Cp" : 14.2666,             # Capacité calorifique à pression contante (kJ/kg.K) à 288.15 K
-        "Cv" : 10.1415,             # Capacité calorifique à volume constant (kJ/kg.K) à 288.15 K
-    },
-
-    "CO2" : {
-        "densite" : 1.8714,         # Densité (kg/m3) à 288.15 K et 1 bar 
-        "masse_molaire" : 44.0095,  # Masse molaire (g/mol)
-        "Cp" : 0.8652,              # Capacité calorifique à pression contante (kJ/kg.K) à 288.15 K
-        "Cv" : 0.6763,              # Capacité calorifique à volume constant (kJ/kg.K) à 288.15 K
-    },
-
-    "CO" : {
-    "densite" : 1.1450,             # Densité (kg/m3) à 298.15 K et 1 bar 
-    "masse_molaire" : 28.01,        # Masse molaire (g/mol)
-    "Cp" : 1.0373,                  # Capacité calorifique à pression contante (kJ/kg.K) à 288.15 K
-    "Cv" : 0.7404,                  # Capacité calorifique à volume constant (kJ/kg.K) à 288.15 K
-    },
-
-    "O2" : {
-    "densite" : 1.3540,             # Densité (kg/m3) à 288.15 K et 1 bar 
-    "masse_molaire" : 31.9988,      # Masse molaire (g/mol)
-    "Cp" : 0.9165,                  # Capacité calorifique à pression contante (kJ/kg.K) à 288.15 K
-    "Cv" : 0.6567,                  # Capacité calorifique à volume constant (kJ/kg.K) à 288.15 K
-    "Cp1" : 0.972,                  # Capacité calorifique à pression contante (kJ/kg.K) à 500 K
-    "Cp2" : 0.956,                  # Capacité calorifique à pression contante (kJ/kg.K) à 450 K
-    "T1" : 500,                     # Température (K)
-    "T2" : 450,                     # Température (K)
-    },
-
-    "vapeur_d_eau" : {
-    "chaleur_latente" : 2257,       # (kJ/kg) à 373.15 K 
-    "masse_molaire" : 18.015,       # Masse molaire (g/mol)
-    "Cp" : 2.0100,                  # Capacité calorifique à pression contante (kJ/kg.K) à 373.15 K
-    "Cv" : 1.5777,                  # Capacité calorifique à volume constant (kJ/kg.K) à 373.15 K
-    "T" : 373.15,                   # Température (K)
-    },
-
-    "N2" : {
-    "densite" : 1.1848,             # Densité (kg/m3) à 288.15 K et 1 bar 
-    "masse_molaire" : 28.013,       # Masse molaire (g/mol)
-    "Cp" : 1.0414,                  # Capacité calorifique à pression contante (kJ/kg.K) à 288.15 K
-    "Cv" : 0.7432,                  # Capacité calorifique à volume constant (kJ/kg.K) à 288.15 K
-    },
-
-    "air" : {
-    "densite" : 1.2263,             # Densité (kg/m3) à 288.15 K et 1 bar
-    "masse_molaire" : 28.976,       # Masse molaire (g/mol)
-    "Cp" : 1.0051,                  # Capacité calorifique à pression contante (kJ/kg.K) à 288.15 K
-    "Cv" : 0.7181,                  # Capacité calorifique à volume constant (kJ/kg.K) à 288.15 K 
-    },
-
-    "eau_liquide" : {
-    "Cp_moy" : 4.196,               # Capacité calorifique à pression contante (kJ/kg.K)
-    },
-    
+# Les paramètres physico-chimiques et les corrélations Cp(T) sont stockés dans proprietes_thermo
+carac_physico_chimiques = thermo.carac_physico_chimiques
+
+# Hypothèses de compression des flux du procédé (rendement, pressions en bar, température initiale en K)
+param_compression = {
+    # O2 comprimé entre l'électrolyseur et FT
+    "O2" : {"rendement" : 0.8, "P1_bar" : 1, "P2_bar" : 20, "T0_K" : 288.15},
+    # CO2 capté en sortie du réacteur BioTJet et amené à EM-Lacq
+    "CO2" : {"rendement" : 0.8, "P1_bar" : 1, "P2_bar" : 20, "T0_K" : 288.15},
+    # Syngas entre la gazéification et FT (hypothèse flux total de gaz à ventiler)
+    "syngaz" : {"rendement" : 0.85, "P1_bar" : 1, "P2_bar" : 1.12, "T0_K" : 323.15},
 }
 
 ##############################################################
 # Fonctions de calcul des émissions : Calcul conso énergétique du processus
 ##############################################################
 
-def param_temp_variable(T: float, gaz: str) -> tuple:
+def param_temp_variable(T, gaz) -> tuple:
     """Renvoie les paramètres physico-chimiques, Cp et gamma en fonction de la température T (K).
+    T et gaz peuvent être des tableaux NumPy (cf. proprietes_thermo.proprietes).
     
     Arguments
     ----------
         T : Température (K).
-        gaz : Gaz comprimé (ex: "CO2", "H2", "O2", etc.) 
+        gaz : Gaz comprimé (ex: "CO2", "H2", "O2", etc.), indice ou tableau d'indices de gaz (cf. proprietes_thermo)
 
     Returns
     ----------
@@ -117,29 +73,7 @@ def param_temp_variable(T: float, gaz: str) -> tuple:
         gamma : Coefficient adiabatique du gaz.
         Rs : Constante spécifique des gaz parfaits (kJ/kg.K).
     """
-    R = 8.314 # Constante des gaz parfaits en J/mol.K
-
-    if gaz == "CH4":
-        Cp_mol = 34.942-0.039957*T+0.00019184*T**2-0.00000015303*T**3+3.9321e-11*T**4 # en J/mol.K
-    elif gaz == "H2":
-        Cp_mol = 33.066178-11.363417*(T/1000)+11.432816*(T/1000)**2-2.772874*(T/1000)**3-0.1585581*(T/1000)**(-2) # équation de shomate en J/mol.K /1000
-    elif gaz == "CO2":
-        Cp_mol =27.437+0.042315*T-0.000019555*T**2+0.0000000039968*T**3-2.9872e-12*T**4 # en J/mol.K
-    elif gaz == "CO":
-        Cp_mol =29.556-0.0065807*T+0.00002013*T**2-0.000000012227*T**3+2.2617e-12*T**4 # en J/mol.K
-    elif gaz == "air":
-        Cp_g = 1.93271e-13*T**4-7.9999e-10*T**3+1.1407e-6*T**2-4.489e-4*T+1.0575 # en kJ/kg.K
-    elif gaz == "O2":
-        Cp_g = (carac_physico_chimiques[gaz]["Cp2"] - carac_physico_chimiques[gaz]["Cp1"])/(carac_physico_chimiques[gaz]["T2"] \
-                - carac_physico_chimiques[gaz]["T1"])*(T - carac_physico_chimiques[gaz]["T1"]) \
-                + carac_physico_chimiques[gaz]["Cp1"] # en kJ/kg.K 
-    if gaz != "air" and gaz != "O2":
-        Cp_g = Cp_mol / carac_physico_chimiques[gaz]["masse_molaire"] # conversion en kJ/kg.K
-    
-    Rs = R / (carac_physico_chimiques[gaz]["masse_molaire"]) # constante spécifique des gaz parfait en kJ/kg.K
-    gamma = Cp_g / (Cp_g - Rs) # calcul de gamma
-    
-    return Cp_g, gamma, Rs
+    return thermo.proprietes(T, gaz)
 
 
 def calcul_echauffement_isenthropique(T0 : float, P0 : float, P1 : float, gamma : float) -> float:
@@ -160,52 +94,178 @@ def calcul_echauffement_isenthropique(T0 : float, P0 : float, P1 : float, gamma
     return T1
 
 
-def compression_isentropique(gaz : str, P1_bar : float, P2_bar : float, T0_K : float) -> float:
+@instrumentation.etape("compression")
+def compression_isentropique(gaz, P1_bar, P2_bar, T0_K, methode: str = "iterative", tol: float = None,
+                             max_iter: int = None, retour_iterations: bool = False):
     """Renvoie la temperature de la compression isentropique pour passer 
     de la pression P1 (en bar) à la pression P2 (en bar).
+    Les arguments peuvent être des tableaux NumPy (diffusables entre eux) : l'itération est menée 
+    simultanément sur tous les éléments, chacun s'arrêtant dès qu'il a convergé.
+
+    La température moyenne de compression Tmoy est solution de Tmoy = (T0 + T1(Tmoy)) / 2, où T1(Tmoy) est
+    l'échauffement isentropique calculé avec gamma(Tmoy). Deux méthodes de résolution :
+        - "iterative" : itérations de point fixe Tmoy <- (T0 + T1(Tmoy)) / 2 jusqu'à |Tmoy - (T0 + T1) / 2| <= tol 
+          (tol = 0.01 K par défaut, calcul historique, sans limite d'itérations par défaut)
+        - "newton" : méthode de Newton avec la dérivée analytique de gamma (cf. proprietes_thermo.dgamma_dT), 
+          sécurisée par un encadrement de la solution (pas de dichotomie si le pas de Newton sort de l'encadrement),
+          jusqu'à un pas inférieur à tol (tol = 1e-6 K par défaut) ; valable pour une compression (P2 >= P1) comme
+          pour une détente (P2 < P1)
+    P1_bar, P2_bar et T0_K peuvent être des nombres duaux (cf. etapes.dual) : la résolution est menée sur les valeurs
+    et les dérivées de la température sont obtenues par le théorème des fonctions implicites.
     
     Arguments
     ----------
-        gaz :       Gaz comprimé(ex: "CO2", "H2", "O2", etc.)
+        gaz :       Gaz comprimé(ex: "CO2", "H2", "O2", etc.), indice ou tableau d'indices de gaz (cf. proprietes_thermo)
         P1_bar :    Pression initiale (bar).
         P2_bar :    Pression finale (bar).
         T0_K :      Température initiale (K).
+        methode :   "iterative" (par défaut) ou "newton".
+        tol :       Tolérance de convergence (K), par défaut selon la méthode.
+        max_iter :  Nombre maximal d'itérations, au-delà duquel une ValueError est levée ; par défaut sans limite
+                    pour "iterative" (comportement historique) et 50 pour "newton".
+        retour_iterations : si True, renvoie aussi le nombre d'itérations de chaque élément.
     
     Returns
     -------
         T1_K :      température après compression isentropique (K)
+        iterations : nombre d'itérations effectuées par élément (seulement si retour_iterations)
     """
+    if dual.est_dual(P1_bar, P2_bar, T0_K):
+        return _compression_isentropique_dual(gaz, P1_bar, P2_bar, T0_K, methode, tol, max_iter, retour_iterations)
+
+    gaz = thermo.indice_gaz(gaz)
+    T0_K, P1_bar, P2_bar, gaz = np.broadcast_arrays(np.asarray(T0_K, dtype=float), P1_bar, P2_bar, gaz)
+
+    if methode == "iterative":
+        T1_K, iterations = _resolution_point_fixe(gaz, P1_bar, P2_bar, T0_K, 0.01 if tol is None else tol, max_iter)
+    elif methode == "newton":
+        T1_K, iterations = _resolution_newton(gaz, P1_bar, P2_bar, T0_K, 1e-6 if tol is None else tol,
+                                              50 if max_iter is None else max_iter)
+    else:
+        raise ValueError(f"Méthode de résolution de la compression isentropique inconnue : {methode}")
+    instrumentation.compter(f"compression_isentropique.{methode}.iterations", iterations)
+    instrumentation.compter(f"compression_isentropique.{methode}.elements", iterations.size)
 
+    if retour_iterations:
+        return T1_K[()], iterations[()]
+    return T1_K[()] # scalaire si les arguments sont scalaires
+
+
+def _compression_isentropique_dual(gaz, P1_bar, P2_bar, T0_K, methode, tol, max_iter, retour_iterations):
+    """Compression isentropique pour des arguments duaux (cf. compression_isentropique). La température est résolue
+    sur les valeurs, sans dériver les itérations ; en la solution, F(Tmoy, P1, P2, T0) = Tmoy - (T0 + T1(Tmoy)) / 2
+    est nulle, donc (théorème des fonctions implicites) dTmoy = (d(T0 + T1) à Tmoy fixé) / (2 dF/dTmoy),
+    puis dT1 = 2 dTmoy - dT0."""
+    T1_K, iterations = compression_isentropique(gaz, dual.valeur(P1_bar), dual.valeur(P2_bar), dual.valeur(T0_K),
+                                                methode, tol, max_iter, retour_iterations=True)
+    T0_valeur = dual.valeur(T0_K)
+    Tmoy = (T0_valeur + T1_K) / 2
+    gamma = thermo.gamma(Tmoy, gaz)
+    dF_dTmoy = 1 - T1_K * np.log(dual.valeur(P2_bar) / dual.valeur(P1_bar)) * thermo.dgamma_dT(Tmoy, gaz) / gamma**2 / 2
+
+    somme = T0_K + calcul_echauffement_isenthropique(T0_K, P1_bar, P2_bar, gamma) # T0 + T1, à gamma(Tmoy) fixé
+    k = somme.derivees.shape[-1]
+    derivees_Tmoy = somme.derivees / np.expand_dims(2 * dF_dTmoy, -1)
+    T1_K = dual.Dual(T1_K, 2 * derivees_Tmoy - dual.derivees(T0_K, k))
+
+    if retour_iterations:
+        return T1_K, iterations
+    return T1_K
+
+
+def _resolution_point_fixe(gaz, P1_bar, P2_bar, T0_K, tol, max_iter):
+    """Résolution de Tmoy = (T0 + T1(Tmoy)) / 2 par itérations de point fixe (cf. compression_isentropique)."""
     # Calcul de l'échauffement à l'état initial
-    gamma = param_temp_variable(T0_K, gaz)[1]
+    gamma = thermo.gamma(T0_K, gaz)
     T1_K = calcul_echauffement_isenthropique(T0_K, P1_bar, P2_bar, gamma)
     Tmoy = T0_K
+    iterations = np.zeros(T0_K.shape, dtype=int)
 
-    # calcul isenthropique de la température par itération jusqu'à convergence
-    while abs(Tmoy - (T0_K + T1_K) / 2) > 0.01: 
-        Tmoy = (T0_K + T1_K) / 2
-        T1_K = calcul_echauffement_isenthropique(T0_K, P1_bar, P2_bar, param_temp_variable(Tmoy, gaz)[1])
+    # calcul isenthropique de la température par itération jusqu'à convergence (éléments non convergés seulement)
+    actifs = np.abs(Tmoy - (T0_K + T1_K) / 2) > tol
+    while np.any(actifs):
+        if max_iter is not None and np.max(iterations) >= max_iter:
+            raise ValueError(f"Compression isentropique : {np.count_nonzero(actifs)} élément(s) non convergé(s) "
+                             f"après {max_iter} itérations (méthode du point fixe)")
+        Tmoy = np.where(actifs, (T0_K + T1_K) / 2, Tmoy)
+        T1_K = np.where(actifs, calcul_echauffement_isenthropique(T0_K, P1_bar, P2_bar, thermo.gamma(Tmoy, gaz)), T1_K)
+        iterations += actifs
+        actifs &= np.abs(Tmoy - (T0_K + T1_K) / 2) > tol
 
-    return T1_K
+    return T1_K, iterations
 
-def conso_compression(masse_gaz_kg: float, gaz: str, rendement: float, P1_bar: float, P2_bar: float, T0_K: float) -> float:
+
+def _resolution_newton(gaz, P1_bar, P2_bar, T0_K, tol, max_iter):
+    """Résolution de F(Tmoy) = Tmoy - (T0 + T1(Tmoy)) / 2 = 0 par la méthode de Newton sécurisée
+    (cf. compression_isentropique)."""
+    log_ratio = np.log(np.asarray(P2_bar, dtype=float) / P1_bar)
+
+    def residu(Tmoy):
+        gamma = thermo.gamma(Tmoy, gaz)
+        T1_K = T0_K * np.exp(log_ratio * (gamma - 1) / gamma)
+        dT1_dTmoy = T1_K * log_ratio * thermo.dgamma_dT(Tmoy, gaz) / gamma**2
+        return Tmoy - (T0_K + T1_K) / 2, 1 - dT1_dTmoy / 2, T1_K
+
+    # Encadrement de la solution : T0 est une borne, F(T0) <= 0 pour une compression (P2 >= P1) et F(T0) > 0 pour
+    # une détente. L'autre borne part de la première itération de point fixe et est élargie tant que F garde le signe
+    # de F(T0) : vers le haut pour une compression, vers le bas (en restant positive) pour une détente.
+    signe = np.sign(residu(T0_K)[0])
+    borne = (T0_K + calcul_echauffement_isenthropique(T0_K, P1_bar, P2_bar, thermo.gamma(T0_K, gaz))) / 2
+    for _ in range(max_iter):
+        a_elargir = np.sign(residu(borne)[0]) == signe
+        a_elargir &= signe != 0
+        if not np.any(a_elargir):
+            break
+        borne = np.where(a_elargir, np.where(signe < 0, 2 * borne - T0_K, borne / 2), borne)
+    else:
+        raise ValueError(f"Compression isentropique : solution non encadrée pour {np.count_nonzero(a_elargir)} "
+                         f"élément(s) après {max_iter} élargissements (méthode de Newton)")
+    bas, haut = np.minimum(T0_K, borne), np.maximum(T0_K, borne)
+
+    Tmoy = borne
+    iterations = np.zeros(T0_K.shape, dtype=int)
+    actifs = np.ones(T0_K.shape, dtype=bool)
+    while np.any(actifs):
+        if np.max(iterations) >= max_iter:
+            raise ValueError(f"Compression isentropique : {np.count_nonzero(actifs)} élément(s) non convergé(s) "
+                             f"après {max_iter} itérations (méthode de Newton)")
+        F, dF, _ = residu(Tmoy)
+        bas = np.where(F < 0, Tmoy, bas)
+        haut = np.where(F > 0, Tmoy, haut)
+
+        # Pas de Newton, remplacé par la dichotomie s'il sort de l'encadrement
+        with np.errstate(divide="ignore", invalid="ignore"):
+            T_suivant = Tmoy - F / dF
+        dans_encadrement = (T_suivant > bas) & (T_suivant < haut)
+        T_suivant = np.where(dans_encadrement | (F == 0), T_suivant, (bas + haut) / 2)
+
+        iterations += actifs
+        converges = np.abs(T_suivant - Tmoy) <= tol
+        Tmoy = np.where(actifs, T_suivant, Tmoy)
+        actifs &= ~converges
+
+    return residu(Tmoy)[2], iterations
+
+def conso_compression(masse_gaz_kg, gaz, rendement, P1_bar, P2_bar, T0_K, resolution: str = "iterative"):
     """Renvoie la consommation électrique (en kWh) pour comprimer une masse de gaz (en kg) 
     de la pression P1 (en bar) à la pression P2 (en bar) à la température initiale T0_K.
+    Les arguments peuvent être des tableaux NumPy (diffusables entre eux).
     
     Arguments
     ----------
         masse_gaz_kg :  Masse de gaz à comprimer (kg).
-        gaz :           Gaz comprimé (ex: "CO2", "H2", "O2", etc.)
+        gaz :           Gaz comprimé (ex: "CO2", "H2", "O2", etc.), indice ou tableau d'indices de gaz
         rendement :     Rendement de la compression (entre 0 et 1).
         P1_bar :        Pression initiale (bar).
         P2_bar :        Pression finale (bar).
         T0_K :          Température initiale (K).    
+        resolution :    Méthode de résolution de compression_isentropique ("iterative" ou "newton").
     Returns
     -------
         conso_elec_kWh : Consommation électrique de la compression du gaz (kWh).
     """
 
-    T1_K = compression_isentropique(gaz, P1_bar, P2_bar, T0_K)
+    T1_K = compression_isentropique(gaz, P1_bar, P2_bar, T0_K, resolution)
     Tmoy = (T0_K + T1_K) / 2
     
     Cpmoy = param_temp_variable(Tmoy, gaz)[0] # en kJ/(kg.K)
@@ -214,7 +274,8 @@ def conso_compression(masse_gaz_kg: float, gaz: str, rendement: float, P1_bar: f
     
     return conso_elec_kWh
 
-def conso_compression_syngaz(masse_C02_kg: float, masse_H2_kg: float, masse_C0_kg: float, rendement: float, P1_bar: float, P2_bar: float, T0_K: float) -> float:
+def conso_compression_syngaz(masse_C02_kg: float, masse_H2_kg: float, masse_C0_kg: float, rendement: float, P1_bar: float, P2_bar: float, T0_K: float,
+                             resolution: str = "iterative") -> float:
     """Renvoie la consommation électrique (en kWh) pour comprimer le syngas (en kg), calcul spécifique 
     car il prend en compte les trois gaz. 
     procédure de calcul de l'échauffement du mélange : calcul de l'échauffement de chacun des gaz, 
@@ -229,6 +290,7 @@ def conso_compression_syngaz(masse_C02_kg: float, masse_H2_kg: float, masse_C0_k
         P1_bar :        Pression initiale (bar).
         P2_bar :        Pression finale (bar).
         T0_K :          Température initiale (K).
+        resolution :    Méthode de résolution de compression_isentropique ("iterative" ou "newton").
     
     Returns
     -------
@@ -236,9 +298,9 @@ def conso_compression_syngaz(masse_C02_kg: float, masse_H2_kg: float, masse_C0_k
     """
 
     # Calcul de l'échauffement isentropique de chaque gaz
-    T1_K_CO2 = compression_isentropique("CO2", P1_bar, P2_bar, T0_K)
-    T1_K_H2 = compression_isentropique("H2", P1_bar, P2_bar, T0_K)
-    T1_K_CO = compression_isentropique("CO", P1_bar, P2_bar, T0_K)
+    T1_K_CO2 = compression_isentropique("CO2", P1_bar, P2_bar, T0_K, resolution)
+    T1_K_H2 = compression_isentropique("H2", P1_bar, P2_bar, T0_K, resolution)
+    T1_K_CO = compression_isentropique("CO", P1_bar, P2_bar, T0_K, resolution)
 
     #Calcul de l'échauffement réel pondéré par la masse de chaque gaz
     Cpmoy = (param_temp_variable((T0_K + T1_K_CO2)/2, "CO2")[0] * masse_C02_kg + 
@@ -252,3 +314,268 @@ def conso_compression_syngaz(masse_C02_kg: float, masse_H2_kg: float, masse_C0_k
     conso_elec_kWh = echauffement_reel * Cpmoy * (masse_C02_kg + masse_H2_kg + masse_C0_kg) / 3600 # en kWh
     
     return conso_elec_kWh
+
+@instrumentation.etape("compression")
+def conso_compression_procede(masse_CO: float, masse_H2: float, masse_CO2: float, masse_O2: float, param_compression: dict,
+                              methode: str = "iterative") -> float:
+    """Renvoie la consommation électrique (en kWh) de l'ensemble des compressions du procédé : O2 entre 
+    l'électrolyseur et FT, CO2 capté amené à EM-Lacq et syngas entre la gazéification et FT.
+    Les masses peuvent être des tableaux NumPy (un élément par scénario).
+    
+    Arguments
+    ----------
+        masse_CO :          Masse de CO dans le syngas (t).
+        masse_H2 :          Masse de H2 injectée dans le syngas (t).
+        masse_CO2 :         Masse de CO2 capté (t).
+        masse_O2 :          Masse d'O2 injectée dans la gazéification (t).
+        param_compression : Hypothèses de compression de chaque flux (cf. param_compression).
+        methode :           "iterative" (calcul par itération de point fixe, par défaut), "newton" (résolution 
+                            par la méthode de Newton, cf. compression_isentropique) ou "table" (interpolation dans les 
+                            tables précalculées, cf. tables_compression).
+    
+    Returns
+    -------
+        conso_elec_kWh : Consommation électrique totale de compression (kWh).
+    """
+    masse_CO_kg = masse_CO * 1000    # Conversion en kg
+    masse_H2_kg = masse_H2 * 1000    # Conversion en kg
+    masse_CO2_kg = masse_CO2 * 1000  # Conversion en kg
+    masse_O2_kg = masse_O2 * 1000    # Conversion en kg
+
+    if methode == "table":
+        fonction_gaz, fonction_syngaz = conso_compression_table, conso_compression_syngaz_table
+    elif methode in ("iterative", "newton"):
+        fonction_gaz = partial(conso_compression, resolution=methode)
+        fonction_syngaz = partial(conso_compression_syngaz, resolution=methode)
+    else:
+        raise ValueError(f"Méthode de calcul de compression inconnue : {methode}")
+
+    conso_compression_O2 = fonction_gaz(masse_O2_kg, "O2", **param_compression["O2"])
+    conso_compression_CO2 = fonction_gaz(masse_CO2_kg, "CO2", **param_compression["CO2"])
+    conso_compression_syngas = fonction_syngaz(masse_CO2_kg, masse_H2_kg, masse_CO_kg, **param_compression["syngaz"])
+
+    return conso_compression_O2 + conso_compression_CO2 + conso_compression_syngas
+
+
+##############################################################
+# Tables de compression précalculées
+##############################################################
+
+"""
+Le calcul itératif de compression_isentropique est refait à chaque appel, alors que la température de sortie
+et le Cp moyen ne dépendent que du gaz, de la température initiale T0 et du rapport de pression P2/P1.
+On précalcule donc une fois pour toutes, pour chaque gaz, une grille (T0, rapport de pression) de la 
+température de sortie T1 et du Cp moyen (Cp à (T0+T1)/2). Les requêtes sont ensuite des interpolations 
+bilinéaires vectorisées (en T0 et en log du rapport de pression, où T1 varie régulièrement).
+
+L'erreur d'interpolation est mesurée à la construction, par comparaison au calcul itératif, en 4 x 4 points de
+contrôle de chaque maille de la grille (milieux des arêtes, centre et points intérieurs), puis majorée d'une marge de
+sécurité de 50 % : c'est une borne de l'erreur de toute requête sur la grille (sur 200 000 requêtes aléatoires,
+l'erreur reste inférieure aux deux tiers de la borne). Elle est conservée dans la table ("erreur_max_T1_K",
+"erreur_max_Cp").
+Les tables peuvent être enregistrées dans un fichier cache (.npz) pour ne pas être recalculées au démarrage.
+"""
+
+# Grille par défaut : T0 de 250 à 400 K, rapport de pression de 1 à 100
+grille_compression = {
+    "T0_K" : np.linspace(250, 400, 31),         # Températures initiales (K)
+    "ratio" : np.geomspace(1, 100, 61),         # Rapports de pression P2/P1
+    "gaz" : ("O2", "CO2", "H2", "CO"),          # Gaz tabulés
+}
+
+tables_compression = {} # tables construites ou chargées, par gaz
+
+points_controle = 4     # points de contrôle de l'erreur par maille et par direction (positions 0, 1/4, 1/2, 3/4)
+marge_erreur = 1.5      # marge de sécurité appliquée à l'erreur mesurée aux points de contrôle
+
+
+def construire_table_compression(gaz: str, T0_grille: np.ndarray, ratio_grille: np.ndarray) -> dict:
+    """Construit la table de compression isentropique d'un gaz sur une grille (T0, rapport de pression).
+    
+    Arguments
+    ----------
+        gaz :           Gaz comprimé (ex: "CO2", "H2", "O2", etc.)
+        T0_grille :     Températures initiales de la grille, croissantes (K).
+        ratio_grille :  Rapports de pression P2/P1 de la grille, croissants (>= 1).
+    
+    Returns
+    -------
+        table : dictionnaire avec les grilles "T0_K" et "ratio", les tableaux "T1_K" et "Cp_moy" de forme
+                (len(T0_grille), len(ratio_grille)) et les erreurs d'interpolation maximales "erreur_max_T1_K" (K)
+                et "erreur_max_Cp" (kJ/kg.K), mesurées aux points de contrôle et majorées de marge_erreur.
+    """
+    T0_grille = np.asarray(T0_grille, dtype=float)
+    ratio_grille = np.asarray(ratio_grille, dtype=float)
+
+    def valeurs_exactes(T0_K, ratio):
+        T1_K = compression_isentropique(gaz, 1, ratio, T0_K)
+        return T1_K, param_temp_variable((T0_K + T1_K) / 2, gaz)[0]
+
+    # Calcul sur toute la grille en un seul appel
+    T1_K, Cp_moy = valeurs_exactes(T0_grille[:, None], ratio_grille[None, :])
+
+    table = {"gaz": gaz, "T0_K": T0_grille, "ratio": ratio_grille, "T1_K": T1_K, "Cp_moy": Cp_moy}
+
+    # Mesure de l'erreur d'interpolation en points_controle x points_controle points de chaque maille (milieux des
+    # arêtes, centre et points intérieurs), majorée de la marge de sécurité
+    positions = np.arange(points_controle) / points_controle
+    T0_controle = (T0_grille[:-1, None] + positions[None, :] * np.diff(T0_grille)[:, None]).ravel()[:, None]
+    log_ratio = np.log(ratio_grille)
+    ratio_controle = np.exp(log_ratio[:-1, None] + positions[None, :] * np.diff(log_ratio)[:, None]).ravel()[None, :]
+    T1_exact, Cp_exact = valeurs_exactes(T0_controle, ratio_controle)
+    for grandeur, exact in (("T1_K", T1_exact), ("Cp_moy", Cp_exact)):
+        erreur = np.abs(_interpolation_table(table, grandeur, T0_controle, ratio_controle) - exact)
+        table["erreur_max_T1_K" if grandeur == "T1_K" else "erreur_max_Cp"] = float(marge_erreur * np.max(erreur))
+
+    return table
+
+
+def _interpolation_table(table: dict, grandeur: str, T0_K, ratio) -> np.ndarray:
+    """Interpolation bilinéaire vectorisée de la grandeur ("T1_K" ou "Cp_moy") d'une table,
+    en T0 et en log du rapport de pression."""
+    T0_K = np.asarray(T0_K, dtype=float)
+    log_ratio = np.log(np.asarray(ratio, dtype=float))
+    grille_T0 = table["T0_K"]
+    grille_log_ratio = np.log(table["ratio"])
+
+    if np.any((T0_K < grille_T0[0]) | (T0_K > grille_T0[-1])):
+        raise ValueError(f"Température initiale hors de la table de compression de {table['gaz']} "
+                         f"({grille_T0[0]} - {grille_T0[-1]} K)")
+    if np.any((log_ratio < grille_log_ratio[0] - 1e-12) | (log_ratio > grille_log_ratio[-1] + 1e-12)):
+        raise ValueError(f"Rapport de pression hors de la table de compression de {table['gaz']} "
+                         f"({table['ratio'][0]} - {table['ratio'][-1]})")
+
+    # indices des mailles et coordonnées relatives dans chaque maille
+    i = np.clip(np.searchsorted(grille_T0, T0_K) - 1, 0, len(grille_T0) - 2)
+    j = np.clip(np.searchsorted(grille_log_ratio, log_ratio) - 1, 0, len(grille_log_ratio) - 2)
+    tx = (T0_K - grille_T0[i]) / (grille_T0[i + 1] - grille_T0[i])
+    ty = (log_ratio - grille_log_ratio[j]) / (grille_log_ratio[j + 1] - grille_log_ratio[j])
+
+    Z = table[grandeur]
+    return (1 - tx) * (1 - ty) * Z[i, j] + tx * (1 - ty) * Z[i + 1, j] \
+        + (1 - tx) * ty * Z[i, j + 1] + tx * ty * Z[i + 1, j + 1]
+
+
+def charger_tables_compression(chemin_cache: str = None, grille: dict = grille_compression) -> dict:
+    """Construit (ou charge depuis le fichier cache) les tables de compression de tous les gaz de la grille.
+    Si le fichier cache n'existe pas ou a été construit sur une autre grille, les tables sont recalculées puis
+    enregistrées dans ce fichier.
+    
+    Arguments
+    ----------
+        chemin_cache :  Chemin du fichier cache (.npz), optionnel. Sans fichier, les tables restent en mémoire.
+        grille :        Grille de calcul (cf. grille_compression).
+    
+    Returns
+    -------
+        tables_compression : dictionnaire {gaz : table}
+    """
+    tables = {}
+    if chemin_cache is not None and os.path.exists(chemin_cache):
+        with np.load(chemin_cache) as donnees:
+            for gaz in grille["gaz"]:
+                if f"{gaz}__T1_K" not in donnees:
+                    continue
+                table = {"gaz": gaz, **{cle: donnees[f"{gaz}__{cle}"] for cle in ("T0_K", "ratio", "T1_K", "Cp_moy")}}
+                controle = donnees.get(f"{gaz}__controle_erreur") # tables d'une version mesurant l'erreur autrement
+                if np.array_equal(table["T0_K"], grille["T0_K"]) and np.array_equal(table["ratio"], grille["ratio"]) \
+                        and controle is not None and np.array_equal(controle, [points_controle, marge_erreur]):
+                    table["erreur_max_T1_K"] = float(donnees[f"{gaz}__erreur_max_T1_K"])
+                    table["erreur_max_Cp"] = float(donnees[f"{gaz}__erreur_max_Cp"])
+                    tables[gaz] = table
+
+    a_calculer = [gaz for gaz in grille["gaz"] if gaz not in tables]
+    for gaz in a_calculer:
+        tables[gaz] = construire_table_compression(gaz, grille["T0_K"], grille["ratio"])
+
+    if chemin_cache is not None and a_calculer:
+        np.savez(chemin_cache, **{f"{gaz}__{cle}": table[cle] for gaz, table in tables.items()
+                                  for cle in ("T0_K", "ratio", "T1_K", "Cp_moy", "erreur_max_T1_K", "erreur_max_Cp")},
+                 **{f"{gaz}__controle_erreur": np.array([points_controle, marge_erreur]) for gaz in tables})
+
+    tables_compression.update(tables)
+    return tables_compression
+
+
+def _table(gaz: str) -> dict:
+    """Renvoie la table de compression du gaz, construite à la première utilisation."""
+    if gaz not in tables_compression:
+        tables_compression[gaz] = construire_table_compression(gaz, grille_compression["T0_K"], grille_compression["ratio"])
+    return tables_compression[gaz]
+
+
+def compression_isentropique_table(gaz: str, P1_bar, P2_bar, T0_K) -> np.ndarray:
+    """Renvoie la température après compression isentropique (K), interpolée dans la table du gaz.
+    Même résultat que compression_isentropique, à l'erreur d'interpolation près ("erreur_max_T1_K" de la table).
+    Les arguments peuvent être des tableaux NumPy.
+    
+    Arguments
+    ----------
+        gaz :       Gaz comprimé(ex: "CO2", "H2", "O2", etc.)
+        P1_bar :    Pression initiale (bar).
+        P2_bar :    Pression finale (bar).
+        T0_K :      Température initiale (K).
+    
+    Returns
+    -------
+        T1_K :      température après compression isentropique (K)
+    """
+    return _interpolation_table(_table(gaz), "T1_K", T0_K, np.asarray(P2_bar, dtype=float) / P1_bar)
+
+
+def conso_compression_table(masse_gaz_kg, gaz: str, rendement, P1_bar, P2_bar, T0_K) -> np.ndarray:
+    """Renvoie la consommation électrique (en kWh) pour comprimer une masse de gaz (en kg), comme 
+    conso_compression mais à partir des tables précalculées. Les arguments peuvent être des tableaux NumPy.
+    
+    Arguments
+    ----------
+        masse_gaz_kg :  Masse de gaz à comprimer (kg).
+        gaz :           Gaz comprimé (ex: "CO2", "H2", "O2", etc.)
+        rendement :     Rendement de la compression (entre 0 et 1).
+        P1_bar :        Pression initiale (bar).
+        P2_bar :        Pression finale (bar).
+        T0_K :          Température initiale (K).    
+    Returns
+    -------
+        conso_elec_kWh : Consommation électrique de la compression du gaz (kWh).
+    """
+    table = _table(gaz)
+    ratio = np.asarray(P2_bar, dtype=float) / P1_bar
+    T1_K = _interpolation_table(table, "T1_K", T0_K, ratio)
+    Cpmoy = _interpolation_table(table, "Cp_moy", T0_K, ratio) # en kJ/(kg.K)
+
+    echauffement_reel = (T1_K - T0_K) / rendement
+    return echauffement_reel * Cpmoy * masse_gaz_kg / 3600 # en kWh
+
+
+def conso_compression_syngaz_table(masse_C02_kg, masse_H2_kg, masse_C0_kg, rendement, P1_bar, P2_bar, T0_K) -> np.ndarray:
+    """Renvoie la consommation électrique (en kWh) pour comprimer le syngas (en kg), comme 
+    conso_compression_syngaz mais à partir des tables précalculées. Les arguments peuvent être des tableaux NumPy.
+    
+    Arguments
+    ----------
+        masse_C02_kg :  Masse de CO2 à comprimer (kg).
+        masse_H2_kg :   Masse de H2 à comprimer (kg).
+        masse_C0_kg :   Masse de CO à comprimer (kg).
+        rendement :     Rendement de la compression (entre 0 et 1).
+        P1_bar :        Pression initiale (bar).
+        P2_bar :        Pression finale (bar).
+        T0_K :          Température initiale (K).
+    
+    Returns
+    -------
+        conso_elec_kWh : Consommation électrique de la compression du syngas (kWh).
+    """
+    ratio = np.asarray(P2_bar, dtype=float) / P1_bar
+    masse_totale = masse_C02_kg + masse_H2_kg + masse_C0_kg
+
+    Cpmoy, echauffement = 0, 0
+    for gaz, masse in (("CO2", masse_C02_kg), ("H2", masse_H2_kg), ("CO", masse_C0_kg)):
+        table = _table(gaz)
+        Cpmoy = Cpmoy + _interpolation_table(table, "Cp_moy", T0_K, ratio) * masse
+        echauffement = echauffement + masse * (_interpolation_table(table, "T1_K", T0_K, ratio) - T0_K)
+
+    Cpmoy = Cpmoy / masse_totale
+    echauffement_reel = echauffement / (rendement * masse_totale)
+
+    return echauffement_reel * Cpmoy * masse_totale / 3600 # en kWh
@@ -14,6 +14,8 @@ Contient :
       en utilisant un mix énergétique prévisionnel pour 2050 et le mix actuel pour 2023.
     - emissions_energie_totale : agrège les émissions de CO2 (en gCO2eq) liées à une liste de consommations énergétiques (en kWh),
       en distinguant les émissions pour 2050 et pour 2023.
+    - intensite_carbone_annee : intensité carbone de l'électricité (gCO2eq/kWh) pour une année donnée, par interpolation
+      linéaire entre le mix 2023 et le mix 2050.
     - verif_hypothèse : vérifie l'hypothèse selon laquelle la consommation thermique totale des processus est inférieure ou égale à la chaleur récupérable.
 
 Hypothèses sur un mix énergétique pour 2050 :
@@ -25,6 +27,10 @@ Hypothèses sur un mix énergétique pour 2050 :
 
 """
 
+import numpy as np
+
+from etapes import instrumentation
+
 ###############################################################
 # Stockage des paramètres avec les hypothèses sourcées        #
 ###############################################################
@@ -72,14 +78,19 @@ importations rendues nécessaires du fait de la faible disponibilité du parc nu
 # Fonctions de calcul des émissions
 ##############################################################
 
-def emissions_energetique_processus(conso_energie):
+def emissions_energetique_processus(conso_energie, facteur_emission=facteur_emission, param_mix_2050=param_mix_2050,
+                                    facteur_emission_2023=facteur_emission_2023):
     """
     Calcule les émissions de CO2 (en gCO2eq) liées à une consommation énergétique donnée (en kWh),
     en utilisant un mix énergétique prévisionnel pour 2050 et le mix actuel pour 2023.
+    Les consommations et les paramètres peuvent être des tableaux NumPy (un élément par scénario).
 
     Arguments
     ----------
         conso_energie : Consommation énergétique en kWh
+        facteur_emission : facteurs d'émission de chaque filière (gCO2eq/kWh), par défaut ceux du module
+        param_mix_2050 : parts de chaque filière dans le mix 2050, par défaut celles du module
+        facteur_emission_2023 : facteurs d'émission du mix 2023 (gCO2eq/kWh), par défaut ceux du module
     
     Returns
     -------
@@ -98,7 +109,9 @@ def emissions_energetique_processus(conso_energie):
     return emissions_2050, emissions_2023
 
 
-def emissions_energie_totale(consos_energies):
+@instrumentation.etape("energie")
+def emissions_energie_totale(consos_energies, facteur_emission=facteur_emission, param_mix_2050=param_mix_2050,
+                             facteur_emission_2023=facteur_emission_2023):
     """
     Agrège les émissions de CO2 (en gCO2eq) liées à une liste de consommations énergétiques (en kWh),
     en distinguant les émissions pour 2050 et pour 2023.
@@ -106,6 +119,8 @@ def emissions_energie_totale(consos_energies):
     Arguments
     ----------
         consos_energies : Liste de consommations énergétiques en kWh
+        facteur_emission, param_mix_2050, facteur_emission_2023 : paramètres du mix énergétique 
+            (cf. emissions_energetique_processus), par défaut ceux du module
     
     Returns
     -------
@@ -120,7 +135,8 @@ def emissions_energie_totale(consos_energies):
 
     # On parcourt chaque consommation énergétique pour calculer les émissions associées
     for conso in consos_energies :
-        emissions_processus_2050, emissions_processus_2023 = emissions_energetique_processus (conso) # calcul des émissions pour cette consommation
+        emissions_processus_2050, emissions_processus_2023 = emissions_energetique_processus (conso, facteur_emission, param_mix_2050,
+                                                                                                      facteur_emission_2023) # calcul des émissions pour cette consommation
         emissions_2050.append(emissions_processus_2050) # ajout à la liste d'émissions 2050
         emissions_2023.append(emissions_processus_2023) # ajout à la liste d'émissions 2023
         emissions_totales_2050 += emissions_processus_2050 # ajout au total 2050
@@ -131,6 +147,30 @@ def emissions_energie_totale(consos_energies):
 
     return emissions_2050, emissions_2023
 
+def intensite_carbone_annee(annee, facteur_emission=facteur_emission, param_mix_2050=param_mix_2050,
+                            facteur_emission_2023=facteur_emission_2023):
+    """
+    Calcule l'intensité carbone de l'électricité (en gCO2eq/kWh) pour une année donnée, par interpolation linéaire
+    entre le mix de consommation 2023 et le mix prévisionnel 2050 (valeur 2023 avant 2023, valeur 2050 après 2050).
+    L'année et les paramètres peuvent être des tableaux NumPy (un élément par scénario).
+
+    Arguments
+    ----------
+        annee : année (ou tableau d'années)
+        facteur_emission, param_mix_2050, facteur_emission_2023 : paramètres du mix énergétique 
+            (cf. emissions_energetique_processus), par défaut ceux du module
+    
+    Returns
+    -------
+        intensite : intensité carbone de l'électricité en gCO2eq/kWh
+    """
+    intensite_2050 = emissions_energetique_processus(1, facteur_emission, param_mix_2050, facteur_emission_2023)[0]
+    intensite_2023 = facteur_emission_2023['consommation']
+
+    part_2050 = np.clip((np.asarray(annee, dtype=float) - 2023) / (2050 - 2023), 0, 1)
+    return intensite_2023 + part_2050 * (intensite_2050 - intensite_2023)
+
+
 '''
 Hypothèse : on considère que la chaleur résiduelle générée par le procédé Fischer-Tropsch est réinjectée 
 dans la phase de torréfaction et est suffisante pour l'assurer.
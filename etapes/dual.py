@@ -0,0 +1,191 @@
+"""
+PARTIE : Nombres duaux (dérivation automatique en mode direct)
+
+Un nombre dual porte une valeur et ses dérivées par rapport à k paramètres : x = valeur + somme(derivees[i] * e_i).
+Les opérations arithmétiques (+, -, *, /, **) et les fonctions NumPy élémentaires (exp, log, maximum...) propagent
+les dérivées par les règles de dérivation usuelles : un seul calcul du processus, avec des paramètres duaux, donne la
+valeur et le gradient complet, exact à la précision machine (pas de différences finies).
+
+La valeur peut être un tableau NumPy (un élément par scénario) : les dérivées sont alors rangées dans un tableau de
+forme valeur.shape + (k,). Les comparaisons portent sur les valeurs seules (les branches du calcul sont celles du
+calcul sans dérivées).
+
+Les fonctions d'étape acceptent des paramètres duaux tant qu'elles n'utilisent que ces opérations ; les résolutions
+itératives (compression_isentropique) traitent les nombres duaux à part, par le théorème des fonctions implicites.
+
+Contient :
+- Dual : nombre dual (valeur et dérivées)
+- variables : paramètres duaux indépendants (une dérivée unité chacun)
+- est_dual, valeur, derivees : tests et accès aux valeurs et dérivées d'objets duaux ou non
+"""
+
+import numpy as np
+
+
+##############################################################
+# Règles de dérivation des fonctions NumPy
+##############################################################
+
+"""
+Pour chaque fonction (ufunc), dérivées partielles par rapport à chacun de ses arguments, à partir des valeurs des
+arguments et du résultat. Les comparaisons et tests (sans dérivée) sont évalués sur les valeurs seules.
+"""
+
+_derivees_partielles = {
+    np.add: lambda a, b, r: (1.0, 1.0),
+    np.subtract: lambda a, b, r: (1.0, -1.0),
+    np.multiply: lambda a, b, r: (b, a),
+    np.true_divide: lambda a, b, r: (1 / b, -r / b),
+    np.power: lambda a, b, r: (b * a**(b - 1), r * np.log(a)),
+    np.negative: lambda a, r: (-1.0,),
+    np.positive: lambda a, r: (1.0,),
+    np.exp: lambda a, r: (r,),
+    np.log: lambda a, r: (1 / a,),
+    np.sqrt: lambda a, r: (0.5 / r,),
+    np.square: lambda a, r: (2 * a,),
+    np.absolute: lambda a, r: (np.sign(a),),
+    np.maximum: lambda a, b, r: ((a >= b) * 1.0, (a < b) * 1.0),
+    np.minimum: lambda a, b, r: ((a <= b) * 1.0, (a > b) * 1.0),
+}
+
+_sans_derivee = (np.greater, np.greater_equal, np.less, np.less_equal, np.equal, np.not_equal,
+                 np.isfinite, np.isnan, np.isinf, np.sign)
+
+
+class Dual:
+    """
+    Nombre dual : valeur (nombre ou tableau NumPy) et dérivées par rapport à k paramètres (tableau de forme
+    valeur.shape + (k,)). S'utilise comme un tableau NumPy dans les opérations arithmétiques et les fonctions
+    élémentaires de NumPy (cf. _derivees_partielles).
+    """
+    __slots__ = ("valeur", "derivees")
+
+    def __init__(self, valeur, derivees):
+        self.valeur = np.asarray(valeur, dtype=float)
+        self.derivees = np.asarray(derivees, dtype=float)
+
+    @property
+    def shape(self):
+        return self.valeur.shape
+
+    @property
+    def ndim(self):
+        return self.valeur.ndim
+
+    def __len__(self):
+        return len(self.valeur)
+
+    def __getitem__(self, indice):
+        if not isinstance(indice, tuple):
+            indice = (indice,)
+        return Dual(self.valeur[indice], self.derivees[indice + (slice(None),)])
+
+    def __repr__(self):
+        return f"Dual({self.valeur!r}, derivees de forme {self.derivees.shape})"
+
+    def __bool__(self):
+        return bool(self.valeur)
+
+    def __array__(self, dtype=None, copy=None):
+        # Une conversion en tableau NumPy perdrait les dérivées sans le signaler
+        raise ValueError("Un nombre dual ne peut pas être converti en tableau NumPy (utiliser dual.valeur)")
+
+    def __array_ufunc__(self, ufunc, methode, *arguments, **options):
+        if methode != "__call__" or options:
+            raise ValueError(f"Opération non prise en charge par les nombres duaux : {ufunc.__name__}.{methode}")
+        valeurs = [valeur(argument) for argument in arguments]
+        if ufunc in _sans_derivee:
+            return ufunc(*valeurs)
+        if ufunc not in _derivees_partielles:
+            raise ValueError(f"Fonction non prise en charge par les nombres duaux : {ufunc.__name__}")
+
+        resultat = ufunc(*valeurs)
+        with np.errstate(divide="ignore", invalid="ignore"): # ex : log(a) pour a <= 0 quand l'exposant est constant
+            partielles = _derivees_partielles[ufunc](*valeurs, resultat)
+        total = None
+        for argument, partielle in zip(arguments, partielles):
+            if not isinstance(argument, Dual):
+                continue
+            terme = argument.derivees * np.expand_dims(partielle, -1) if np.ndim(partielle) else \
+                argument.derivees * partielle
+            total = terme if total is None else total + terme
+        return Dual(resultat, np.broadcast_to(total, np.shape(resultat) + total.shape[-1:]))
+
+    def __array_function__(self, fonction, types, arguments, options):
+        if fonction is np.where:
+            condition, x, y = arguments
+            return _where(condition, x, y)
+        if fonction is np.sum and len(arguments) == 1 and set(options) <= {"axis"}:
+            axe = options.get("axis")
+            if axe is None:
+                axe = tuple(range(self.ndim))
+            axe = tuple(a % self.ndim for a in np.atleast_1d(axe))
+            return Dual(self.valeur.sum(axis=axe), self.derivees.sum(axis=axe))
+        raise ValueError(f"Fonction non prise en charge par les nombres duaux : np.{fonction.__name__}")
+
+    # Opérateurs arithmétiques et comparaisons : délégués aux ufuncs de NumPy (cf. __array_ufunc__)
+    def __add__(self, autre): return np.add(self, autre)
+    def __radd__(self, autre): return np.add(autre, self)
+    def __sub__(self, autre): return np.subtract(self, autre)
+    def __rsub__(self, autre): return np.subtract(autre, self)
+    def __mul__(self, autre): return np.multiply(self, autre)
+    def __rmul__(self, autre): return np.multiply(autre, self)
+    def __truediv__(self, autre): return np.true_divide(self, autre)
+    def __rtruediv__(self, autre): return np.true_divide(autre, self)
+    def __pow__(self, autre): return np.power(self, autre)
+    def __rpow__(self, autre): return np.power(autre, self)
+    def __neg__(self): return np.negative(self)
+    def __pos__(self): return self
+    def __abs__(self): return np.absolute(self)
+    def __lt__(self, autre): return np.less(self, autre)
+    def __le__(self, autre): return np.less_equal(self, autre)
+    def __gt__(self, autre): return np.greater(self, autre)
+    def __ge__(self, autre): return np.greater_equal(self, autre)
+
+
+def _where(condition, x, y):
+    """np.where pour des arguments duaux : dérivées de x là où la condition est vraie, de y ailleurs."""
+    condition = valeur(condition)
+    resultat = np.where(condition, valeur(x), valeur(y))
+    k = next(argument.derivees.shape[-1] for argument in (x, y) if isinstance(argument, Dual))
+    forme = np.shape(resultat) + (k,)
+    derivees_x = np.broadcast_to(derivees(x, k), forme)
+    derivees_y = np.broadcast_to(derivees(y, k), forme)
+    return Dual(resultat, np.where(np.expand_dims(condition, -1), derivees_x, derivees_y))
+
+
+##############################################################
+# Fonctions utilitaires
+##############################################################
+
+def variables(valeurs):
+    """
+    Renvoie des paramètres duaux indépendants : le i-ème a la valeur valeurs[i] et une dérivée unité par rapport
+    au i-ème paramètre (nulle par rapport aux autres).
+
+    Arguments
+    ----------
+        valeurs : liste de k valeurs (nombres ou tableaux NumPy)
+
+    Returns
+    -------
+        variables : liste de k nombres duaux
+    """
+    k = len(valeurs)
+    identite = np.eye(k)
+    return [Dual(v, np.broadcast_to(identite[i], np.shape(v) + (k,))) for i, v in enumerate(valeurs)]
+
+
+def est_dual(*objets):
+    """Renvoie True si l'un des objets est un nombre dual."""
+    return any(isinstance(objet, Dual) for objet in objets)
+
+
+def valeur(objet):
+    """Renvoie la valeur d'un nombre dual, ou l'objet lui-même s'il n'est pas dual."""
+    return objet.valeur if isinstance(objet, Dual) else objet
+
+
+def derivees(objet, k):
+    """Renvoie les dérivées d'un nombre dual, ou des dérivées nulles (k paramètres) s'il n'est pas dual."""
+    return objet.derivees if isinstance(objet, Dual) else np.zeros(np.shape(objet) + (k,))
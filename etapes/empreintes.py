@@ -0,0 +1,189 @@
+"""
+PARTIE : Empreintes canoniques
+
+Empreinte (hash blake2b) d'objets Python : dictionnaires, listes, nombres, chaînes, tableaux NumPy, nombres duaux et
+fonctions, indépendante de l'ordre des clés des dictionnaires. Sert de clé aux résultats mémorisés des étapes
+(cache_etapes) et aux noyaux compilés de la gazéification (_2_gazeification.compiler_syngas).
+
+Les fonctions sont repérées par leur nom et par la version de leur code (bytecode de la fonction et sources de son
+paquet) : un résultat mémorisé sur disque par une version précédente du code d'une étape n'est pas réutilisé.
+
+Les tableaux produits par une étape passée par le cache sont repérés par leur provenance (empreinte de l'étape et
+position dans son résultat, cf. enregistrer_provenance) : leur empreinte est calculée à partir de cette provenance,
+sans relire leur contenu.
+
+Contient :
+- empreinte : empreinte canonique d'objets Python
+- enregistrer_provenance : provenance des tableaux d'un résultat d'étape
+- identifiants_tableaux : identifiants des tableaux NumPy contenus dans un objet
+"""
+
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import struct
+import sys
+import types
+import weakref
+
+import numpy as np
+
+from etapes import dual
+
+
+##############################################################
+# Empreinte canonique
+##############################################################
+
+_provenance = {} # id d'un tableau produit par une étape -> (référence faible vers le tableau, jeton de provenance)
+
+
+def identifiants_tableaux(objet):
+    """Renvoie les identifiants des tableaux NumPy contenus dans l'objet (dictionnaires, listes et tuples parcourus)."""
+    if isinstance(objet, np.ndarray):
+        return {id(objet)}
+    if isinstance(objet, dict):
+        objet = list(objet.values())
+    if isinstance(objet, (list, tuple)):
+        return set().union(*(identifiants_tableaux(element) for element in objet))
+    return set()
+
+
+def enregistrer_provenance(objet, jeton, exclus=frozenset()):
+    """
+    Associe à chaque tableau NumPy du résultat d'une étape un jeton de provenance (empreinte de l'étape + position).
+    Les tableaux exclus (entrées de l'étape renvoyées telles quelles) gardent une empreinte calculée sur leur contenu.
+    """
+    if isinstance(objet, np.ndarray):
+        identifiant = id(objet)
+        if identifiant in exclus:
+            return
+        def oublier(reference, identifiant=identifiant):
+            if identifiant in _provenance and _provenance[identifiant][0] is reference:
+                del _provenance[identifiant]
+        _provenance[identifiant] = (weakref.ref(objet, oublier), jeton.encode())
+    elif isinstance(objet, dict):
+        for cle, valeur in objet.items():
+            enregistrer_provenance(valeur, f"{jeton}/{cle!r}", exclus)
+    elif isinstance(objet, (list, tuple)):
+        for i, valeur in enumerate(objet):
+            enregistrer_provenance(valeur, f"{jeton}/{i}", exclus)
+
+
+def _hash_code(h, code):
+    """Ajoute au hash h le bytecode d'un objet code, ses noms et ses constantes (fonctions imbriquées comprises)."""
+    h.update(code.co_code)
+    h.update(repr(code.co_names).encode())
+    for constante in code.co_consts:
+        if isinstance(constante, types.CodeType):
+            _hash_code(h, constante)
+        elif isinstance(constante, frozenset): # ordre d'itération propre à chaque session (hash des chaînes)
+            h.update(repr(sorted(map(repr, constante))).encode())
+        else:
+            h.update(repr(constante).encode())
+
+
+@functools.lru_cache(maxsize=None)
+def _version_sources(nom_module):
+    """
+    Empreinte des fichiers sources d'un module : tous les modules de son paquet (ex : etapes/*.py, les étapes
+    s'appelant les unes les autres), ou le fichier du module seul hors paquet. Calculée une fois par session.
+    """
+    module = sys.modules.get(nom_module)
+    fichier = getattr(module, "__file__", None)
+    if fichier is None:
+        return ""
+    if getattr(module, "__package__", ""):
+        dossier = os.path.dirname(fichier)
+        fichiers = sorted(os.path.join(dossier, nom) for nom in os.listdir(dossier) if nom.endswith(".py"))
+    else:
+        fichiers = [fichier]
+    h = hashlib.blake2b(digest_size=16)
+    for chemin in fichiers:
+        with open(chemin, "rb") as source:
+            h.update(os.path.basename(chemin).encode() + b":" + source.read())
+    return h.hexdigest()
+
+
+@functools.lru_cache(maxsize=256)
+def _version_code(fonction):
+    """
+    Version du code d'une fonction : hash de son code (bytecode, noms, constantes ; fonction décorée déballée, cf.
+    instrumentation.etape) et des sources de son module (cf. _version_sources), pour qu'une modification du code
+    d'une étape invalide les résultats mémorisés, en particulier sur disque. Vide pour les fonctions sans code
+    Python (fonctions NumPy, fonctions intégrées).
+    """
+    fonction = inspect.unwrap(fonction)
+    code = getattr(fonction, "__code__", None)
+    if code is None:
+        return ""
+    h = hashlib.blake2b(digest_size=16)
+    _hash_code(h, code)
+    return h.hexdigest() + _version_sources(fonction.__module__)
+
+
+def _ajouter(h, objet):
+    """Ajoute au hash h une représentation canonique (indépendante de l'ordre des clés des dictionnaires) de l'objet."""
+    if objet is None:
+        h.update(b"N")
+    elif isinstance(objet, (bool, np.bool_)):
+        h.update(b"B1" if objet else b"B0")
+    elif isinstance(objet, (int, np.integer)):
+        h.update(b"I" + str(int(objet)).encode() + b";")
+    elif isinstance(objet, (float, np.floating)):
+        h.update(b"F" + struct.pack("<d", float(objet)))
+    elif isinstance(objet, str):
+        donnees = objet.encode()
+        h.update(b"S" + str(len(donnees)).encode() + b":" + donnees)
+    elif isinstance(objet, np.ndarray):
+        provenance = _provenance.get(id(objet))
+        if provenance is not None and provenance[0]() is objet:
+            h.update(b"P" + provenance[1])
+            return
+        tableau = np.ascontiguousarray(objet)
+        h.update(b"A" + tableau.dtype.str.encode() + str(tableau.shape).encode())
+        h.update(tableau.tobytes() if tableau.dtype != object else pickle.dumps(tableau.tolist()))
+    elif isinstance(objet, dual.Dual):
+        h.update(b"X")
+        _ajouter(h, objet.valeur)
+        _ajouter(h, objet.derivees)
+    elif isinstance(objet, dict):
+        h.update(b"D" + str(len(objet)).encode() + b"{")
+        for cle in sorted(objet, key=repr):
+            _ajouter(h, cle)
+            _ajouter(h, objet[cle])
+        h.update(b"}")
+    elif isinstance(objet, (list, tuple)):
+        h.update((b"L" if isinstance(objet, list) else b"T") + str(len(objet)).encode() + b"[")
+        for element in objet:
+            _ajouter(h, element)
+        h.update(b"]")
+    elif objet is Ellipsis:
+        h.update(b"E")
+    elif callable(objet):
+        h.update(b"C" + f"{objet.__module__}.{objet.__qualname__}".encode() + _version_code(objet).encode())
+    else:
+        raise ValueError(f"Impossible de calculer l'empreinte d'un objet de type {type(objet).__name__}")
+
+
+def empreinte(*objets):
+    """
+    Renvoie l'empreinte canonique (hash blake2b, hexadécimal) des objets : deux jeux d'objets de même contenu
+    ont la même empreinte, quel que soit l'ordre des clés de leurs dictionnaires. Les tableaux produits par une
+    étape passée par le cache sont repérés par leur provenance plutôt que par leur contenu.
+
+    Arguments
+    ----------
+        objets : dictionnaires, listes, tuples, nombres, chaînes, None, tableaux NumPy, nombres duaux
+                 (cf. etapes.dual) ou fonctions (nom et code, cf. _version_code)
+
+    Returns
+    -------
+        empreinte : chaîne hexadécimale de 32 caractères
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for objet in objets:
+        _ajouter(h, objet)
+    return h.hexdigest()
@@ -0,0 +1,214 @@
+"""
+PARTIE : Instrumentation
+
+Mesure, sur demande, du temps passé dans chaque étape du processus (biomasse, gazéification, FT, électrolyseur,
+compression, énergie) : nombre d'appels, temps total et tailles de lot (nombre de scénarios) de chaque fonction
+d'étape, et compteurs internes (ex : itérations de compression_isentropique).
+
+Les fonctions de calcul des étapes sont marquées par le décorateur etape ; l'instrumentation est désactivée par
+défaut et ne coûte alors qu'un test par appel de fonction d'étape (moins d'une microseconde) : elle peut rester en
+place pour les balayages de production. Une fois activée (activer), chaque appel est chronométré ; les résultats
+sont disponibles sous forme de dictionnaire (rapport_instrumentation, cf. rapport.afficher_instrumentation) ou
+exportés au format Chrome Trace (exporter_trace, fichier JSON lisible dans chrome://tracing ou ui.perfetto.dev).
+
+Les mesures sont propres au processus : dans un balayage réparti sur plusieurs processus (balayage.py), seules les
+étapes calculées dans le processus courant sont mesurées.
+
+Contient :
+- activer, desactiver, reinitialiser : mise en route, arrêt et remise à zéro des mesures
+- etape : décorateur des fonctions de calcul d'une étape
+- compter : ajout d'une valeur à un compteur interne
+- rapport_instrumentation : mesures par étape et par fonction, et compteurs
+- exporter_trace : export des appels au format Chrome Trace (JSON)
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+_actif = False
+_trace = False
+_verrou = threading.Lock()
+_mesures = {}     # (étape, fonction) : [appels, temps total (s), scénarios, taille de lot maximale,
+                  #                      puis appels, temps et scénarios des appels non imbriqués dans la même étape]
+_compteurs = {}   # nom : valeur
+_evenements = []  # événements de la trace (cf. exporter_trace)
+_origine = time.perf_counter()
+_pile = threading.local() # étapes en cours dans chaque thread (appels imbriqués)
+
+
+##############################################################
+# Mise en route
+##############################################################
+
+def activer(trace=True):
+    """
+    Active l'instrumentation (les mesures précédentes sont conservées, cf. reinitialiser).
+
+    Arguments
+    ----------
+        trace : si True, chaque appel est aussi enregistré pour l'export Chrome Trace (mémoire proportionnelle
+                au nombre d'appels) ; sinon, seuls les totaux sont conservés
+    """
+    global _actif, _trace
+    _actif, _trace = True, trace
+
+
+def desactiver():
+    """Désactive l'instrumentation (les mesures sont conservées)."""
+    global _actif
+    _actif = False
+
+
+def reinitialiser():
+    """Remet à zéro les mesures, compteurs et événements de trace."""
+    global _origine
+    with _verrou:
+        _mesures.clear()
+        _compteurs.clear()
+        _evenements.clear()
+        _origine = time.perf_counter()
+
+
+##############################################################
+# Mesures
+##############################################################
+
+def _taille_lot(arguments):
+    """
+    Nombre de scénarios d'un appel : taille du plus grand tableau NumPy des arguments, ou des listes d'arguments
+    (ex : biomasse d'entrée, liste de dictionnaires de tableaux) ; 1 sans tableau.
+    Les dictionnaires passés directement en argument sont des paramètres : ils ne sont pas parcourus.
+    """
+    taille = 1
+    for argument in arguments:
+        if isinstance(argument, np.ndarray):
+            taille = max(taille, argument.size)
+        elif isinstance(argument, (list, tuple)):
+            for element in argument:
+                valeurs = element.values() if isinstance(element, dict) else (element,)
+                taille = max([taille] + [valeur.size for valeur in valeurs if isinstance(valeur, np.ndarray)])
+    return taille
+
+
+def _enregistrer(nom_etape, nom_fonction, debut, duree, taille, imbrique):
+    with _verrou:
+        mesure = _mesures.setdefault((nom_etape, nom_fonction), [0, 0.0, 0, 0, 0, 0.0, 0])
+        mesure[0] += 1
+        mesure[1] += duree
+        mesure[2] += taille
+        mesure[3] = max(mesure[3], taille)
+        if not imbrique: # appel qui n'est pas imbriqué dans un autre appel de la même étape
+            mesure[4] += 1
+            mesure[5] += duree
+            mesure[6] += taille
+        if _trace:
+            _evenements.append({"name": nom_fonction, "cat": nom_etape, "ph": "X", "ts": (debut - _origine) * 1e6,
+                                "dur": duree * 1e6, "pid": os.getpid(), "tid": threading.get_ident(),
+                                "args": {"taille_lot": taille}})
+
+
+def etape(nom_etape):
+    """
+    Décorateur des fonctions de calcul d'une étape : lorsque l'instrumentation est active, chaque appel est
+    chronométré et compté, avec la taille du lot (taille du plus grand tableau NumPy des arguments).
+
+    Arguments
+    ----------
+        nom_etape : nom de l'étape (ex : "gazeification")
+    """
+    def decorateur(fonction):
+        @functools.wraps(fonction)
+        def fonction_instrumentee(*arguments, **options):
+            if not _actif:
+                return fonction(*arguments, **options)
+            pile = _pile.__dict__.setdefault("etapes", [])
+            imbrique = nom_etape in pile
+            pile.append(nom_etape)
+            debut = time.perf_counter()
+            try:
+                return fonction(*arguments, **options)
+            finally:
+                duree = time.perf_counter() - debut
+                pile.pop()
+                _enregistrer(nom_etape, fonction.__name__, debut, duree, _taille_lot(arguments), imbrique)
+        return fonction_instrumentee
+    return decorateur
+
+
+def compter(nom, valeur=1):
+    """
+    Ajoute une valeur (nombre ou somme d'un tableau NumPy) au compteur nom, si l'instrumentation est active.
+
+    Arguments
+    ----------
+        nom : nom du compteur (ex : "compression_isentropique.iterations")
+        valeur : valeur à ajouter, nombre ou tableau (sa somme est ajoutée)
+    """
+    if not _actif:
+        return
+    valeur = np.sum(valeur).item()
+    with _verrou:
+        _compteurs[nom] = _compteurs.get(nom, 0) + valeur
+        if _trace:
+            _evenements.append({"name": nom, "ph": "C", "ts": (time.perf_counter() - _origine) * 1e6,
+                                "pid": os.getpid(), "args": {"valeur": _compteurs[nom]}})
+
+
+##############################################################
+# Résultats
+##############################################################
+
+def rapport_instrumentation():
+    """
+    Renvoie les mesures de l'instrumentation depuis la dernière remise à zéro.
+
+    Returns
+    -------
+        rapport : dictionnaire avec
+            - etapes : {étape : mesures de l'étape}, avec pour chaque étape et chacune de ses fonctions (clé
+              "fonctions" : {fonction : mesures}) :
+                - appels : nombre d'appels
+                - temps_s : temps total (s), appels imbriqués compris ; pour une étape, seuls les appels qui ne
+                  sont pas imbriqués dans un autre appel de la même étape sont comptés (temps non compté deux fois)
+                - scenarios : nombre total de scénarios calculés (somme des tailles de lot)
+                - taille_lot_max : plus grande taille de lot
+                - scenarios_par_s : débit moyen
+            - compteurs : {compteur : valeur}
+    """
+    def mesures(appels, temps, scenarios, taille_max):
+        return {"appels": appels, "temps_s": temps, "scenarios": scenarios, "taille_lot_max": taille_max,
+                "scenarios_par_s": scenarios / temps if temps > 0 else float("nan")}
+
+    with _verrou:
+        etapes, totaux = {}, {}
+        for (nom_etape, nom_fonction), mesure in _mesures.items():
+            etapes.setdefault(nom_etape, {})[nom_fonction] = mesures(*mesure[:4])
+            total = totaux.setdefault(nom_etape, [0, 0.0, 0, 0])
+            total[:3] = [total[0] + mesure[4], total[1] + mesure[5], total[2] + mesure[6]]
+            total[3] = max(total[3], mesure[3])
+        compteurs = dict(_compteurs)
+
+    return {"etapes": {nom_etape: {**mesures(*totaux[nom_etape]), "fonctions": fonctions}
+                       for nom_etape, fonctions in etapes.items()},
+            "compteurs": compteurs}
+
+
+def exporter_trace(chemin):
+    """
+    Exporte les appels enregistrés au format Chrome Trace (JSON), lisible dans chrome://tracing ou ui.perfetto.dev.
+    Nécessite une instrumentation activée avec trace=True.
+
+    Arguments
+    ----------
+        chemin : chemin du fichier JSON
+    """
+    with _verrou:
+        evenements = list(_evenements)
+    with open(chemin, "w", encoding="utf-8") as fichier:
+        json.dump({"traceEvents": evenements, "displayTimeUnit": "ms",
+                   "otherData": {"compteurs": rapport_instrumentation()["compteurs"]}}, fichier, ensure_ascii=False)
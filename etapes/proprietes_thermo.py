@@ -0,0 +1,266 @@
+"""
+PARTIE : Propriétés thermodynamiques des gaz
+
+Contient :
+    - carac_physico_chimiques : Paramètres physico-chimiques des gaz (repris par _5_compression)
+    - gaz_thermo, coefficients_Cp, coefficients_Cp_inv_T2 : coefficients des corrélations Cp(T) de chaque gaz,
+      rangés dans des tableaux (une ligne par gaz)
+    - Fonctions d'évaluation vectorisée des propriétés en fonction de la température :
+        - indice_gaz : Conversion d'un nom de gaz (ou d'un tableau de noms) en indice(s) dans les tableaux de coefficients
+        - Cp : Capacité calorifique massique à pression constante
+        - Rs : Constante spécifique des gaz parfaits
+        - gamma : Coefficient adiabatique
+        - proprietes : Cp, gamma et Rs en un seul appel
+        - dCp_dT, dgamma_dT : Dérivées analytiques de Cp et gamma par rapport à la température
+
+Description :
+Toutes les corrélations Cp(T) sont mises sous la même forme, en kJ/kg.K :
+    Cp(T) = a0 + a1*T + a2*T² + a3*T³ + a4*T⁴ + e/T²
+    - CH4, CO2, CO : polynômes en J/mol.K, divisés par la masse molaire
+    - H2 : équation de Shomate en t = T/1000 (J/mol.K), réécrite en T puis divisée par la masse molaire
+    - air : polynôme en kJ/kg.K
+    - O2 : interpolation linéaire entre deux points (Cp1, T1) et (Cp2, T2) du référentiel SHE/Turbomeca
+Les polynômes sont évalués par la méthode de Horner, pour des tableaux NumPy de températures et d'indices de gaz
+(diffusables entre eux) : un seul appel pour tous les scénarios et tous les gaz.
+"""
+
+import numpy as np
+
+from etapes import dual
+
+###############################################################
+# Zone de données : Paramètres physico-chimiques des gaz      #
+###############################################################
+
+carac_physico_chimiques = {
+    "CH4" : {
+        "T" : 298.15,               # Température (K)
+        "P" : 1,                    # Pression (bar) à T=298.15 K
+        "masse_molaire" : 16.0425,  # Masse molaire (g/mol)
+        "Cp" : 2.2316,              # Capacité calorifique à pression contante (kJ/kg.K) à 288.15 K
+        "Cv" : 1.7133,              # Capacité calorifique à volume constant (kJ/kg.K) à 288.15 K
+    },
+
+    "H2" : {
+        "T" : 298.15,               # Température (K)
+        "P" : 1,                    # Pression (bar) à T=298.15 K
+        "PCI" : 120.39,             # Pouvoir Calorifique Inférieur (MJ/kg) à T=298.15 K
+        "PCS" : 141.77,             # Pouvoir Calorifique Supérieur (MJ/kg) à T=298.15 K
+        "densite" : 0.0852,         # Densité (kg/m3) à 288.15 K et 1 bar
+        "masse_molaire" : 2.01588,  # Masse molaire (g/mol)
+        "Cp" : 14.2666,             # Capacité calorifique à pression contante (kJ/kg.K) à 288.15 K
+        "Cv" : 10.1415,             # Capacité calorifique à volume constant (kJ/kg.K) à 288.15 K
+    },
+
+    "CO2" : {
+        "densite" : 1.8714,         # Densité (kg/m3) à 288.15 K et 1 bar
+        "masse_molaire" : 44.0095,  # Masse molaire (g/mol)
+        "Cp" : 0.8652,              # Capacité calorifique à pression contante (kJ/kg.K) à 288.15 K
+        "Cv" : 0.6763,              # Capacité calorifique à volume constant (kJ/kg.K) à 288.15 K
+    },
+
+    "CO" : {
+    "densite" : 1.1450,             # Densité (kg/m3) à 298.15 K et 1 bar
+    "masse_molaire" : 28.01,        # Masse molaire (g/mol)
+    "Cp" : 1.0373,                  # Capacité calorifique à pression contante (kJ/kg.K) à 288.15 K
+    "Cv" : 0.7404,                  # Capacité calorifique à volume constant (kJ/kg.K) à 288.15 K
+    },
+
+    "O2" : {
+    "densite" : 1.3540,             # Densité (kg/m3) à 288.15 K et 1 bar
+    "masse_molaire" : 31.9988,      # Masse molaire (g/mol)
+    "Cp" : 0.9165,                  # Capacité calorifique à pression contante (kJ/kg.K) à 288.15 K
+    "Cv" : 0.6567,                  # Capacité calorifique à volume constant (kJ/kg.K) à 288.15 K
+    "Cp1" : 0.972,                  # Capacité calorifique à pression contante (kJ/kg.K) à 500 K
+    "Cp2" : 0.956,                  # Capacité calorifique à pression contante (kJ/kg.K) à 450 K
+    "T1" : 500,                     # Température (K)
+    "T2" : 450,                     # Température (K)
+    },
+
+    "vapeur_d_eau" : {
+    "chaleur_latente" : 2257,       # (kJ/kg) à 373.15 K
+    "masse_molaire" : 18.015,       # Masse molaire (g/mol)
+    "Cp" : 2.0100,                  # Capacité calorifique à pression contante (kJ/kg.K) à 373.15 K
+    "Cv" : 1.5777,                  # Capacité calorifique à volume constant (kJ/kg.K) à 373.15 K
+    "T" : 373.15,                   # Température (K)
+    },
+
+    "N2" : {
+    "densite" : 1.1848,             # Densité (kg/m3) à 288.15 K et 1 bar
+    "masse_molaire" : 28.013,       # Masse molaire (g/mol)
+    "Cp" : 1.0414,                  # Capacité calorifique à pression contante (kJ/kg.K) à 288.15 K
+    "Cv" : 0.7432,                  # Capacité calorifique à volume constant (kJ/kg.K) à 288.15 K
+    },
+
+    "air" : {
+    "densite" : 1.2263,             # Densité (kg/m3) à 288.15 K et 1 bar
+    "masse_molaire" : 28.976,       # Masse molaire (g/mol)
+    "Cp" : 1.0051,                  # Capacité calorifique à pression contante (kJ/kg.K) à 288.15 K
+    "Cv" : 0.7181,                  # Capacité calorifique à volume constant (kJ/kg.K) à 288.15 K
+    },
+
+    "eau_liquide" : {
+    "Cp_moy" : 4.196,               # Capacité calorifique à pression contante (kJ/kg.K)
+    },
+
+}
+
+R = 8.314 # Constante des gaz parfaits en J/mol.K
+
+###############################################################
+# Zone de données : Coefficients des corrélations Cp(T)       #
+###############################################################
+
+# Polynômes Cp(T) en J/mol.K, coefficients par puissance croissante de T
+Cp_molaire_polynome = {
+    "CH4" : [34.942, -0.039957, 0.00019184, -0.00000015303, 3.9321e-11],
+    "CO2" : [27.437, 0.042315, -0.000019555, 0.0000000039968, -2.9872e-12],
+    "CO" :  [29.556, -0.0065807, 0.00002013, -0.000000012227, 2.2617e-12],
+}
+
+# Équation de Shomate en J/mol.K : Cp = A + B*t + C*t² + D*t³ + E/t², avec t = T/1000
+Cp_molaire_shomate = {
+    "H2" : {"A" : 33.066178, "B" : -11.363417, "C" : 11.432816, "D" : -2.772874, "E" : -0.1585581},
+}
+
+# Polynômes Cp(T) en kJ/kg.K, coefficients par puissance croissante de T
+Cp_massique_polynome = {
+    "air" : [1.0575, -4.489e-4, 1.1407e-6, -7.9999e-10, 1.93271e-13],
+}
+
+gaz_thermo = ("CH4", "H2", "CO2", "CO", "air", "O2") # ordre des lignes des tableaux de coefficients
+
+
+def _construire_coefficients():
+    """Met toutes les corrélations sous la forme Cp(T) = a0 + a1*T + ... + a4*T⁴ + e/T² (kJ/kg.K)."""
+    coefficients = np.zeros((len(gaz_thermo), 5))
+    coefficients_inv_T2 = np.zeros(len(gaz_thermo))
+    masses_molaires = np.array([carac_physico_chimiques[gaz]["masse_molaire"] for gaz in gaz_thermo])
+
+    for i, gaz in enumerate(gaz_thermo):
+        M = masses_molaires[i]
+        if gaz in Cp_molaire_polynome:
+            coefficients[i] = np.array(Cp_molaire_polynome[gaz]) / M # conversion en kJ/kg.K
+        elif gaz in Cp_molaire_shomate:
+            s = Cp_molaire_shomate[gaz]
+            coefficients[i, :4] = np.array([s["A"], s["B"] / 1e3, s["C"] / 1e6, s["D"] / 1e9]) / M
+            coefficients_inv_T2[i] = s["E"] * 1e6 / M
+        elif gaz in Cp_massique_polynome:
+            coefficients[i] = Cp_massique_polynome[gaz]
+        elif gaz == "O2":
+            c = carac_physico_chimiques[gaz]
+            pente = (c["Cp2"] - c["Cp1"]) / (c["T2"] - c["T1"])
+            coefficients[i, :2] = [c["Cp1"] - pente * c["T1"], pente]
+
+    return coefficients, coefficients_inv_T2, R / masses_molaires
+
+
+coefficients_Cp, coefficients_Cp_inv_T2, Rs_gaz = _construire_coefficients()
+indices_gaz = {gaz: i for i, gaz in enumerate(gaz_thermo)}
+
+
+##############################################################
+# Fonctions d'évaluation des propriétés
+##############################################################
+
+def indice_gaz(gaz):
+    """Renvoie l'indice (ou le tableau d'indices) du gaz dans les tableaux de coefficients.
+
+    Arguments
+    ----------
+        gaz : nom de gaz (ex: "CO2"), indice entier, ou tableau de noms ou d'indices.
+
+    Returns
+    -------
+        indice : entier ou tableau NumPy d'entiers.
+    """
+    if isinstance(gaz, str):
+        if gaz not in indices_gaz:
+            raise ValueError(f"Gaz sans corrélation Cp(T) : {gaz} (gaz disponibles : {', '.join(gaz_thermo)})")
+        return indices_gaz[gaz]
+    gaz = np.asarray(gaz)
+    if gaz.dtype.kind in "US":
+        return np.vectorize(indice_gaz, otypes=[int])(gaz)
+    return gaz.astype(int)
+
+
+def Cp(T, gaz):
+    """Renvoie la capacité calorifique massique à pression constante Cp (kJ/kg.K) à la température T (K).
+    T et gaz peuvent être des tableaux NumPy, diffusables entre eux ; T peut aussi être un nombre dual (cf. etapes.dual).
+
+    Arguments
+    ----------
+        T :     Température (K).
+        gaz :   Gaz (nom, indice ou tableau, cf. indice_gaz).
+
+    Returns
+    -------
+        Cp_g :  Capacité calorifique à pression contante (kJ/kg.K).
+    """
+    if not isinstance(T, dual.Dual): # une température duale garde ses dérivées (cf. etapes.dual)
+        T = np.asarray(T, dtype=float)
+    indice = indice_gaz(gaz)
+    a = coefficients_Cp[indice]
+
+    # Méthode de Horner : a0 + T*(a1 + T*(a2 + T*(a3 + T*a4)))
+    Cp_g = a[..., 4]
+    for k in range(3, -1, -1):
+        Cp_g = Cp_g * T + a[..., k]
+    return Cp_g + coefficients_Cp_inv_T2[indice] / T**2
+
+
+def dCp_dT(T, gaz):
+    """Renvoie la dérivée de Cp par rapport à la température, dCp/dT (kJ/kg.K²), à la température T (K).
+    T et gaz peuvent être des tableaux NumPy, diffusables entre eux."""
+    T = np.asarray(T, dtype=float)
+    indice = indice_gaz(gaz)
+    a = coefficients_Cp[indice]
+
+    # Méthode de Horner sur le polynôme dérivé : a1 + T*(2*a2 + T*(3*a3 + T*4*a4))
+    dCp = 4 * a[..., 4]
+    for k in range(3, 0, -1):
+        dCp = dCp * T + k * a[..., k]
+    return dCp - 2 * coefficients_Cp_inv_T2[indice] / T**3
+
+
+def Rs(gaz):
+    """Renvoie la constante spécifique des gaz parfaits Rs (kJ/kg.K) du gaz (nom, indice ou tableau)."""
+    return Rs_gaz[indice_gaz(gaz)]
+
+
+def gamma(T, gaz):
+    """Renvoie le coefficient adiabatique gamma = Cp / (Cp - Rs) du gaz à la température T (K).
+    T et gaz peuvent être des tableaux NumPy, diffusables entre eux."""
+    Cp_g = Cp(T, gaz)
+    return Cp_g / (Cp_g - Rs(gaz))
+
+
+def proprietes(T, gaz):
+    """Renvoie les paramètres physico-chimiques Cp, gamma et Rs en fonction de la température T (K).
+    T et gaz peuvent être des tableaux NumPy, diffusables entre eux.
+
+    Arguments
+    ----------
+        T :     Température (K).
+        gaz :   Gaz (nom, indice ou tableau, cf. indice_gaz).
+
+    Returns
+    ----------
+        Cp_g :  Capacité calorifique à pression contante (kJ/kg.K).
+        gamma : Coefficient adiabatique du gaz.
+        Rs :    Constante spécifique des gaz parfaits (kJ/kg.K).
+    """
+    indice = indice_gaz(gaz)
+    Cp_g = Cp(T, indice)
+    Rs_g = Rs(indice)
+    return Cp_g, Cp_g / (Cp_g - Rs_g), Rs_g
+
+
+def dgamma_dT(T, gaz):
+    """Renvoie la dérivée du coefficient adiabatique par rapport à la température (1/K), à la température T (K) :
+    gamma = Cp / (Cp - Rs), donc dgamma/dT = -Rs * dCp/dT / (Cp - Rs)².
+    T et gaz peuvent être des tableaux NumPy, diffusables entre eux."""
+    indice = indice_gaz(gaz)
+    Cp_g = Cp(T, indice)
+    Rs_g = Rs(indice)
+    return -Rs_g * dCp_dT(T, indice) / (Cp_g - Rs_g)**2
@@ -0,0 +1,134 @@
+"""
+PARTIE : Rapport
+
+Affichage console des résultats des étapes. Les fonctions de calcul (bilan_biomasse, bilan_gazeificationV2,
+bilan_Inv_gazeificationV1, bilan_Fischer_Tropsch, ...) ne font aucun affichage et renvoient des dictionnaires
+de résultats ; les fonctions de ce fichier mettent en forme ces dictionnaires, une seule fois, en fin de calcul.
+
+Contient :
+- format_nombre : mise en forme d'un nombre avec séparateur de milliers (espace)
+- afficher_masses_humides : masses de biomasse humide équivalentes à une masse sèche
+- afficher_biomasse : résultats de l'étape biomasse
+- afficher_gazeification : résultats de la gazéification (sens physique)
+- afficher_gazeification_inverse : résultats de la gazéification (sens inverse)
+- afficher_FT : résultats de l'étape Fischer-Tropsch
+- afficher_instrumentation : temps et compteurs mesurés par l'instrumentation (cf. instrumentation.py)
+"""
+
+
+def format_nombre(valeur, decimales=2):
+    """Met en forme un nombre avec un espace comme séparateur de milliers (ex : 1 234.56)."""
+    return f"{valeur:,.{decimales}f}".replace(",", " ")
+
+
+def afficher_masses_humides(biomasse_seche, humidites, masses_humides):
+    """
+    Affiche les masses de biomasse humide nécessaires pour obtenir une masse sèche donnée.
+
+    Arguments
+    ----------
+        biomasse_seche : masse de biomasse sèche à fournir (t)
+        humidites : liste des taux d'humidité (fractions) simulés
+        masses_humides : liste des masses humides correspondantes (t)
+    """
+    print(f"Pour obtenir {format_nombre(biomasse_seche, 0)} t de biomasse sèche, il faut :")
+    for h, masse in zip(humidites, masses_humides):
+        print(f" - {format_nombre(masse, 0)} t de biomasse de type bois vert à {h*100:.0f}% d'humidité")
+
+
+def afficher_biomasse(resultats):
+    """
+    Affiche les résultats de l'étape biomasse.
+
+    Arguments
+    ----------
+        resultats : dictionnaire renvoyé par _1_biomasse.bilan_biomasse
+    """
+    if resultats["sens_physique"]:
+        print("Calcul des émissions et consommations liées à la biomasse en entrée du processus e-bio-SAF.")
+    else:
+        print("Calcul des émissions et consommations liées à la biomasse en sortie du processus e-bio-SAF.\n")
+        afficher_masses_humides(resultats["masse_seche_demandee"], resultats["humidites"], resultats["masses_humides"])
+        print("\nOn suppose une biomasse humide de type bois vert à 25% d'humidité")
+
+    print(f" - Masse de biomasse sèche : \t\t\t\t{format_nombre(resultats['masse_seche_biomasse'])} t")
+    print(f" - Émissions liées à la culture de la biomasse : \t{format_nombre(resultats['emissions_culture'])} tCO2e")
+    print(f" - Émissions liées au transport de la biomasse : \t{format_nombre(resultats['emissions_transport'])} tCO2e")
+    print(f" - Consommation thermique pour la torréfaction : \t{format_nombre(resultats['conso_chaleur'])} MJ")
+    print(f" - Émissions totales liées à la biomasse : \t\t{format_nombre(resultats['emissions_totales'])} tCO2e\n")
+
+
+def afficher_gazeification(resultats):
+    """
+    Affiche les résultats de la gazéification dans le sens physique.
+
+    Arguments
+    ----------
+        resultats : dictionnaire renvoyé par _2_gazeification.bilan_gazeificationV2
+    """
+    print("\n========== RÉSULTATS GAZÉIFICATION V2 ==========")
+    print(f"Biomasse sèche en entrée      : {format_nombre(resultats['biomasse_entree'])} t")
+    print(f"Carbone dans la biomasse      : {format_nombre(resultats['masse_C'])} t")
+    print("------------------------------------------------")
+    print(f"CO produit                    : {format_nombre(resultats['masseCO_sortie'])} t")
+    print(f"CO₂ produit                   : {format_nombre(resultats['masseCO2_sortie'])} t")
+    print(f"H₂ dans syngaz                : {format_nombre(resultats['masseH2_syngaz'])} t")
+    print(f"H₂ à ajouter                  : {format_nombre(resultats['masseH2_necessaire'])} t")
+    print(f"O₂ nécessaire                 : {format_nombre(resultats['masseO2_necessaire'])} t")
+    print(f"Masse déchets estimée         : {format_nombre(resultats['masse_dechets'])} t")
+    print("================================================\n")
+
+
+def afficher_gazeification_inverse(resultats):
+    """
+    Affiche les résultats de la gazéification dans le sens inverse.
+
+    Arguments
+    ----------
+        resultats : dictionnaire renvoyé par _2_gazeification.bilan_Inv_gazeificationV1
+    """
+    print("\n========== RÉSULTATS GAZÉIFICATION INVERSE V1 ==========")
+    print(f"CO FT                         : {format_nombre(resultats['masseCO_sortie'])} t")
+    print("------------------------------------------------")
+    print(f"CO₂ émis                      : {format_nombre(resultats['masseCO2_sortie'])} t")
+    print(f"Biomasse sèche en entrée      : {format_nombre(resultats['biomasse_entree'])} t")
+    print(f"O₂ nécessaire                 : {format_nombre(resultats['masseO2_necessaire'])} t")
+    print(f"H₂ dans syngaz                : {format_nombre(resultats['masseH2_syngaz'])} t")
+    print(f"H₂ à ajouter                  : {format_nombre(resultats['masseH2_necessaire'])} t")
+    print(f"Masse estimée déchets         : {format_nombre(resultats['masse_dechets'])} t")
+    print("------------------------------------------------")
+
+
+def afficher_FT(resultats):
+    """
+    Affiche les résultats de l'étape Fischer-Tropsch.
+
+    Arguments
+    ----------
+        resultats : dictionnaire renvoyé par _3_FT.bilan_Fischer_Tropsch
+    """
+    print("\n================ Résultats Fischer-Tropsch ================")
+    print(f"Consommation électrique totale FT : {format_nombre(resultats['consommation_totale_FT'])} kWh")
+    print(f"Masse de kérosène produite : {format_nombre(resultats['masse_kerosene_produite'])} t")
+    print("===========================================================\n")
+
+
+def afficher_instrumentation(rapport):
+    """
+    Affiche les mesures de l'instrumentation : temps, appels et tailles de lot de chaque étape et de ses fonctions,
+    puis les compteurs internes.
+
+    Arguments
+    ----------
+        rapport : dictionnaire renvoyé par instrumentation.rapport_instrumentation
+    """
+    print("\n==================== Instrumentation ====================")
+    print(f"{'Étape / fonction':<36}{'appels':>8}{'temps (ms)':>14}{'scénarios/s':>14}")
+    for nom_etape, etape in rapport["etapes"].items():
+        print(f"{nom_etape:<36}{etape['appels']:>8}{etape['temps_s'] * 1e3:>14.3f}{etape['scenarios_par_s']:>14.4g}")
+        for nom_fonction, fonction in etape["fonctions"].items():
+            print(f"  {nom_fonction:<34}{fonction['appels']:>8}{fonction['temps_s'] * 1e3:>14.3f}"
+                  f"{fonction['scenarios_par_s']:>14.4g}")
+    for nom, valeur in rapport["compteurs"].items():
+        print(f"{nom:<44}{format_nombre(valeur, 0):>20}")
+    print("=========================================================\n")
@@ -1,6 +1,19 @@
 """
-TODO
+PARTIE : Forêt
+
+Évolution de la capacité de séquestration carbone de la forêt française (changement climatique selon la trajectoire
+TRACC, bonnes pratiques sylvicoles, récolte supplémentaire liée à la généralisation du procédé BioTjet).
+
+Trajectoires : les fonctions acceptent des tableaux NumPy (années, beta, généralisation), et trajectoire_sequestration
+calcule en une fois la séquestration de chaque année de 2005 à 2100 pour des milliers de couples (beta, généralisation) ;
+cube_sequestration renvoie le cube beta x généralisation x année, éventuellement écrit dans un fichier projeté en mémoire.
+Inversion : généralisation_max donne la plus grande généralisation qui respecte une cible de séquestration.
 """
+
+import os
+
+import numpy as np
+
 ###############################################################
 # Stockage des paramètres avec les hypothèses sourcées        #
 ###############################################################
@@ -69,18 +82,74 @@ param_foret = {
 # FONCTIONS     #
 #################
 
+
+def réchauffement_TRACC(année):
+    """
+    Réchauffement moyen en France (en K) pour l'année, interpolé linéairement entre les points de la trajectoire TRACC
+    de param_foret ("T_2018", "T_2025", "T_2030", "T_2050", "T_2100"), précédés du réchauffement moyen mesuré entre 2005
+    et 2013, placé au milieu de la période (2009). Constant avant le premier point et après le dernier.
+
+    Arguments
+    ----------
+        - année : int, float ou tableau NumPy d'années (éventuellement fractionnaires, pour un pas mensuel)
+
+    Returns
+    ----------
+        - réchauffement : réchauffement moyen en France, en K (même forme que année)
+    """
+    points = {2009: param_foret["réchauffement_moyen_France_2005_2013"]}
+    points.update({int(clé[2:]): valeur for clé, valeur in param_foret.items() if clé.startswith("T_")})
+    années_TRACC = sorted(points)
+
+    return np.interp(année, années_TRACC, [points[a] for a in années_TRACC])
+
+
+def coefficients_climat(beta):
+    """
+    Coefficients directeurs de l'évolution de la productivité et de la mortalité de la forêt française avec le
+    réchauffement, calés sur les périodes 2005-2013 et 2014-2022. Ne dépendent que de beta.
+
+    Arguments
+    ----------
+        - beta : float ou tableau NumPy, impact non-linéaire du changement climatique (cf. impact_changement_climatique_foret)
+
+    Returns
+    ----------
+        - alpha_productivité : en Mm3/an/K^beta
+        - alpha_mortalité : en Mm3/an/K^beta
+    """
+    # coefficient directeur de décroissance de la productivité de la forêt française entre 2005 et 2022 
+    alpha_productivité = (param_foret["productivité_brute_2014_2022"]- param_foret["productivité_brute_2005_2013"]) \
+    /((param_foret["réchauffement_moyen_France_2014_2022"]-param_foret["réchauffement_moyen_France_2005_2013"])**(beta))
+    
+     # coefficient directeur de croissance de la mortalité de la forêt française entre 2005 et 2022 
+    alpha_mortalité = (param_foret["Mortalité_2014_2022"]- param_foret["Mortalité_2005_2013"]) \
+    /(param_foret["réchauffement_moyen_France_2014_2022"]-param_foret["réchauffement_moyen_France_2005_2013"])**(beta)
+
+    return alpha_productivité, alpha_mortalité
+
+
+def écart_réchauffement_référence(année):
+    """
+    Réchauffement (en K) de l'année par rapport à la période de référence 2005-2013, nul tant que le réchauffement
+    ne la dépasse pas. Ne dépend que de l'année (int, float ou tableau NumPy).
+    """
+    return np.maximum(réchauffement_TRACC(année)-param_foret["T_2018"] \
+     +param_foret["réchauffement_moyen_France_2014_2022"]-param_foret["réchauffement_moyen_France_2005_2013"], 0)
+
+
  
 # en compte le changement climatique. Le paramètre beta quantifie l'impact non-linéaire du changement climatique sur l'état de la forêt.
 
-#### Cette fonction marche pour 2030,2050 et 2100 (commentaire à supprimmer)
 def impact_changement_climatique_foret(année,beta):
     """
     Détermine la productivité et la mortalité de la forêt française, pour l'année spécifiée en entrée, en prenant
-    en compte le changement climatique. Fonctionne pour 2030, 2050 et 2100.
+    en compte le changement climatique. Le réchauffement de l'année est interpolé sur la trajectoire TRACC
+    (cf. réchauffement_TRACC). année et beta peuvent être des tableaux NumPy (calcul avec diffusion).
 
     Arguments
     ----------
-        - année : int, année pour laquelle on veut calculer la productivité et la mortalité de la forêt française
+        - année : année pour laquelle on veut calculer la productivité et la mortalité de la forêt française
         - beta : float, paramètre qui quantifie l'impact non-linéaire du changement climatique sur l'état de la forêt. 
             beta = 1, impact linéaire du changement climatique sur la forêt
             beta > 1, impact non-linéaire du changement climatique sur la forêt plus important que dans le cas linéaire
@@ -93,21 +162,15 @@ def impact_changement_climatique_foret(année,beta):
     
     """
 
-    # coefficient directeur de décroissance de la productivité de la forêt française entre 2005 et 2022 
-    alpha_productivité = (param_foret["productivité_brute_2014_2022"]- param_foret["productivité_brute_2005_2013"]) \
-    /((param_foret["réchauffement_moyen_France_2014_2022"]-param_foret["réchauffement_moyen_France_2005_2013"])**(beta))
-    
-     # coefficient directeur de décroissance de la productivité de la forêt française entre 2005 et 2022 
-    alpha_mortalité = (param_foret["Mortalité_2014_2022"]- param_foret["Mortalité_2005_2013"]) \
-    /(param_foret["réchauffement_moyen_France_2014_2022"]-param_foret["réchauffement_moyen_France_2005_2013"])**(beta)
-    
-    productivité = param_foret["productivité_brute_2005_2013"] + alpha_productivité* \
-    (param_foret["T_"+str(année)]-param_foret["T_2018"] \
-     +param_foret["réchauffement_moyen_France_2014_2022"]-param_foret["réchauffement_moyen_France_2005_2013"])**(beta)                     
+    alpha_productivité, alpha_mortalité = coefficients_climat(beta)
+
+    écart_réchauffement = écart_réchauffement_référence(année)
+
+    impact_climat = écart_réchauffement**(beta)
+
+    productivité = param_foret["productivité_brute_2005_2013"] + alpha_productivité*impact_climat
                                  
-    mortalité = param_foret["Mortalité_2005_2013"]+alpha_mortalité* \
-    (param_foret["T_"+str(année)]-param_foret["T_2018"] \
-     +param_foret["réchauffement_moyen_France_2014_2022"]-param_foret["réchauffement_moyen_France_2005_2013"])**(beta)
+    mortalité = param_foret["Mortalité_2005_2013"]+alpha_mortalité*impact_climat
     
 
     return  productivité, mortalité  # résultats en Mm3/an
@@ -170,11 +233,17 @@ def impact_bonne_pratique_capacité_sequestration(année, productivité):
     Calcule la productivité de la forêt française et la mortalité, pour l'année spécifiée en entrée 
     en fonction du coefficient coeff_bonne_pratique qui quantifie l'amélioration des pratiques sylvicoles.
 
-    Fonctionne pour 2030, 2050 et 2100.
+    Le coefficient croît linéairement entre année_début_bonne_pratique et année_bonne_pratique_max, et reste constant
+    en dehors. année et productivité peuvent être des tableaux NumPy.
+    Avant année_début_bonne_pratique (2025), le coefficient vaut coefficient_bonne_pratique_2025 (1, pratiques
+    actuelles) : la droite n'est plus prolongée avant le début des bonnes pratiques, ce qui donnait un coefficient
+    inférieur à 1 (0,907 en 2018, soit une productivité réduite de 9 % par des pratiques pas encore mises en place).
+    Les résultats des années antérieures à 2025 en sont modifiés : impact_total_sequestration(2018, 1, 0) passe de
+    21,05 à 36,20 MtCO2/an ; ceux de 2025 à 2100 sont inchangés.
 
     Arguments
     ----------
-        - année : int, année pour laquelle on veut effectuer le calcul
+        - année : année pour laquelle on veut effectuer le calcul
         - productivité : productivité de la forêt française pour l'année spécifiée en entrée, en Mm3/an, 
           calculée sans prendre en compte l'amélioration des pratiques sylvicoles (par exemple, calculée avec 
           la fonction impact_changement_climatique_foret)
@@ -186,7 +255,8 @@ def impact_bonne_pratique_capacité_sequestration(année, productivité):
     
     coefficient_bonne_pratique_année = param_foret["coefficient_bonne_pratique_2025"]+(param_foret["coefficient_bonne_pratique_2100"] \
     -param_foret["coefficient_bonne_pratique_2025"])/((param_foret["année_bonne_pratique_max"] \
-    -param_foret["année_début_bonne_pratique"]))*(année-param_foret["année_début_bonne_pratique"])
+    -param_foret["année_début_bonne_pratique"]))*(np.clip(année, param_foret["année_début_bonne_pratique"], \
+    param_foret["année_bonne_pratique_max"])-param_foret["année_début_bonne_pratique"])
                                                                                 
     productivité_bonne_pratique = productivité*coefficient_bonne_pratique_année
 
@@ -199,10 +269,11 @@ def impact_total_sequestration(année,beta,généralisation):
     Calcule la capacité de séquestration carbone de la forêt française en prenant en compte le changement climatique 
     (avec un impact linéaire ou non), l'amélioration des pratiques sylvicoles et la généralisation (en %) du procédé BioTjet pour 
     atteindre les objectifs de ReFuel-EU en 2050. A mettre en regard des objectifs de séquestration carbone de la SNBC 3 à horizon 2050.
+    année, beta et généralisation peuvent être des tableaux NumPy (calcul avec diffusion, cf. trajectoire_sequestration).
 
     Arguments
     ----------
-        - année : int, année pour laquelle on veut effectuer le calcul
+        - année : année pour laquelle on veut effectuer le calcul
         - beta : float, paramètre qui quantifie l'impact non-linéaire du changement climatique sur l'état de la forêt.
             beta = 1, impact linéaire du changement climatique sur la forêt
             beta > 1, impact non-linéaire du changement climatique sur la forêt plus important que dans le cas linéaire
@@ -238,6 +309,204 @@ def impact_total_sequestration(année,beta,généralisation):
 
 
 
+def trajectoire_sequestration(beta, généralisation, année_début=2005, année_fin=2100, pas=1):
+    """
+    Calcule en une fois les trajectoires de la forêt française (productivité, mortalité, coefficient de bonnes pratiques,
+    séquestration carbone) sur un axe d'années dense, pour un ou plusieurs couples (beta, généralisation).
+
+    Arguments
+    ----------
+        - beta : float ou tableau NumPy, impact non-linéaire du changement climatique (cf. impact_total_sequestration)
+        - généralisation : float ou tableau NumPy, pourcentage de généralisation du procédé BioTjet ;
+          beta et généralisation sont diffusés l'un contre l'autre (ex : n couples, ou grille (n, 1) x (1, m))
+        - année_début, année_fin : première et dernière années de la trajectoire
+        - pas : pas de temps en années (1 pour un pas annuel, 1/12 pour un pas mensuel)
+
+    Returns
+    ----------
+        - trajectoire : dictionnaire avec
+            - années : tableau des années (n_années,)
+            - réchauffement : réchauffement TRACC interpolé, en K (n_années,)
+            - coefficient_bonne_pratique : coefficient multiplicatif de la productivité (n_années,)
+            - productivité, mortalité : en Mm3/an, de forme (forme des couples) + (n_années,)
+            - productivité_bonne_pratique : en Mm3/an, même forme
+            - variation_sequestration_carbone : en MtCO2/an, même forme
+            - besoin_masse_bois_supplémentaire : en Mt, de la forme des couples
+    """
+    années = année_début + pas*np.arange(round((année_fin - année_début)/pas) + 1)
+    beta, généralisation = np.broadcast_arrays(np.asarray(beta, dtype=float), np.asarray(généralisation, dtype=float))
+
+    # mêmes étapes que impact_total_sequestration, l'axe des années étant le dernier axe
+    productivité, mortalité = impact_changement_climatique_foret(années, beta[..., np.newaxis])
+    productivité_bonne_pratique = impact_bonne_pratique_capacité_sequestration(années, productivité)
+    besoin_masse_bois_supplémentaire = besoin_biomasse_generalisation(généralisation) # en Mt
+    récolte_totale = param_foret["récolte_totale_2014_2022"]*param_foret["densité_bois_vert"] \
+        + besoin_masse_bois_supplémentaire[..., np.newaxis] # en Mt
+    productivité_nette = param_foret["densité_bois_vert"]*(productivité_bonne_pratique - mortalité) # en Mt/an
+    variation_sequestration_carbone = impact_recolte_capacité_sequestration(productivité_nette, récolte_totale)
+
+    return {
+        "années": années,
+        "réchauffement": réchauffement_TRACC(années),
+        "coefficient_bonne_pratique": impact_bonne_pratique_capacité_sequestration(années, 1.0),
+        "productivité": productivité,
+        "mortalité": mortalité,
+        "productivité_bonne_pratique": productivité_bonne_pratique,
+        "variation_sequestration_carbone": variation_sequestration_carbone,
+        "besoin_masse_bois_supplémentaire": besoin_masse_bois_supplémentaire,
+    }
+
+
+
+
+def généralisation_max(cible, année, beta, généralisation_limite=100):
+    """
+    Plus grande généralisation du procédé BioTjet (en %) qui maintient la variation de la capacité de séquestration
+    carbone de la forêt française au-dessus d'une cible (par exemple le puits forestier visé par la SNBC).
+    La séquestration étant affine et décroissante en la généralisation (récolte supplémentaire proportionnelle,
+    cf. besoin_biomasse_generalisation), l'inversion est analytique :
+        généralisation_max = (variation_sequestration(généralisation = 0) - cible) / pente
+    cible, année et beta peuvent être des tableaux NumPy (calcul avec diffusion, ex : beta[:, np.newaxis] x années).
+
+    Arguments
+    ----------
+        - cible : séquestration minimale à respecter, en MtCO2/an
+        - année : année(s) du calcul
+        - beta : impact non-linéaire du changement climatique (cf. impact_total_sequestration)
+        - généralisation_limite : généralisation maximale envisagée, en % (100 = objectifs de ReFuel-EU atteints)
+
+    Returns
+    ----------
+        - résultats : dictionnaire avec
+            - généralisation_max : généralisation maximale respectant la cible, en %, bornée à généralisation_limite ;
+              NaN si la cible n'est pas respectée même sans généralisation
+            - atteignable : booléen, True si la cible est respectée sans généralisation
+            - variation_sans_généralisation : variation de la capacité de séquestration sans BioTjet, en MtCO2/an
+            - pente : variation de la capacité de séquestration par % de généralisation, en MtCO2/an/%
+    """
+    variation_sans_généralisation = impact_total_sequestration(année, beta, 0)[0]
+
+    # séquestration perdue par % de généralisation (récolte supplémentaire d'un % de généralisation)
+    pente = impact_recolte_capacité_sequestration(0.0, besoin_biomasse_generalisation(1.0))
+
+    généralisation = (np.asarray(cible) - variation_sans_généralisation) / pente
+    atteignable = généralisation >= 0
+
+    return {
+        "généralisation_max": np.where(atteignable, np.minimum(généralisation, généralisation_limite), np.nan),
+        "atteignable": atteignable,
+        "variation_sans_généralisation": variation_sans_généralisation,
+        "pente": pente,
+    }
+
+
+def cube_sequestration(betas, généralisations, années=None, fichier=None, taille_bloc=256):
+    """
+    Évalue impact_total_sequestration sur toute la grille beta x généralisation x année et renvoie le cube dense
+    sous forme de tableau étiqueté (valeurs, noms des dimensions et coordonnées).
+    Les termes qui ne dépendent que de l'année (réchauffement, bonnes pratiques), que de beta (alpha_productivité,
+    alpha_mortalité) ou que de la généralisation (récolte) sont calculés une seule fois sur leur propre axe ; le cube
+    est rempli par blocs de taille_bloc valeurs de beta.
+
+    Arguments
+    ----------
+        - betas : tableau des valeurs de beta (cf. impact_total_sequestration)
+        - généralisations : tableau des pourcentages de généralisation du procédé BioTjet
+        - années : tableau des années, par défaut de 2005 à 2100
+        - fichier : fichier .npy optionnel ; le cube y est alors écrit directement (tableau projeté en mémoire,
+          np.memmap), ce qui permet des grilles plus grandes que la mémoire vive, et ses coordonnées sont enregistrées
+          à côté (cf. charger_cube)
+        - taille_bloc : nombre de valeurs de beta traitées à la fois
+
+    Returns
+    ----------
+        - cube : dictionnaire avec
+            - valeurs : variation de la capacité de séquestration carbone, en MtCO2/an, de forme
+              (len(betas), len(généralisations), len(années))
+            - dimensions : ("beta", "généralisation", "année")
+            - coordonnées : {dimension : tableau des valeurs}
+            - unité : "MtCO2/an"
+    """
+    if années is None:
+        années = np.arange(2005, 2101)
+    coordonnées = {
+        "beta": np.atleast_1d(np.asarray(betas, dtype=float)),
+        "généralisation": np.atleast_1d(np.asarray(généralisations, dtype=float)),
+        "année": np.atleast_1d(np.asarray(années)),
+    }
+    forme = tuple(len(valeurs) for valeurs in coordonnées.values())
+
+    if fichier is None:
+        valeurs = np.empty(forme)
+    else:
+        valeurs = np.lib.format.open_memmap(fichier, mode="w+", dtype=float, shape=forme)
+        np.savez(_chemin_coordonnées(fichier), **coordonnées)
+
+    # Termes ne dépendant que de l'année
+    écart_réchauffement = écart_réchauffement_référence(coordonnées["année"])
+    coefficient_bonne_pratique = impact_bonne_pratique_capacité_sequestration(coordonnées["année"], 1.0)
+
+    # Termes ne dépendant que de beta
+    alpha_productivité, alpha_mortalité = coefficients_climat(coordonnées["beta"])
+
+    # Termes ne dépendant que de la généralisation (la séquestration est affine en la récolte)
+    séquestration_par_Mt_bois = impact_recolte_capacité_sequestration(1.0, 0.0) # en MtCO2 par Mt de bois
+    récolte_totale = param_foret["récolte_totale_2014_2022"]*param_foret["densité_bois_vert"] \
+        + besoin_biomasse_generalisation(coordonnées["généralisation"]) # en Mt
+    séquestration_récolte = séquestration_par_Mt_bois*récolte_totale # en MtCO2/an
+
+    for début in range(0, forme[0], taille_bloc):
+        bloc = slice(début, début + taille_bloc)
+        impact_climat = écart_réchauffement**coordonnées["beta"][bloc, np.newaxis]
+        productivité = param_foret["productivité_brute_2005_2013"] + alpha_productivité[bloc, np.newaxis]*impact_climat
+        mortalité = param_foret["Mortalité_2005_2013"] + alpha_mortalité[bloc, np.newaxis]*impact_climat
+        productivité_nette = param_foret["densité_bois_vert"]*(productivité*coefficient_bonne_pratique - mortalité)
+        np.subtract((séquestration_par_Mt_bois*productivité_nette)[:, np.newaxis, :],
+                    séquestration_récolte[np.newaxis, :, np.newaxis], out=valeurs[bloc])
+
+    if fichier is not None:
+        valeurs.flush()
+
+    return {"valeurs": valeurs, "dimensions": tuple(coordonnées), "coordonnées": coordonnées, "unité": "MtCO2/an"}
+
+
+def _chemin_coordonnées(fichier):
+    return os.path.splitext(fichier)[0] + "_coordonnees.npz"
+
+
+def charger_cube(fichier, mode="r"):
+    """
+    Relit un cube enregistré par cube_sequestration(..., fichier=fichier), sans le charger en mémoire
+    (tableau projeté en mémoire, lecture seule par défaut).
+
+    Arguments
+    ----------
+        - fichier : fichier .npy du cube
+        - mode : mode d'ouverture du np.memmap ("r" lecture seule, "r+" lecture et écriture)
+
+    Returns
+    ----------
+        - cube : dictionnaire (cf. cube_sequestration)
+    """
+    with np.load(_chemin_coordonnées(fichier)) as données:
+        coordonnées = {dimension: données[dimension] for dimension in ("beta", "généralisation", "année")}
+    return {"valeurs": np.load(fichier, mmap_mode=mode), "dimensions": tuple(coordonnées),
+            "coordonnées": coordonnées, "unité": "MtCO2/an"}
+
+
+def cube_vers_xarray(cube):
+    """
+    Convertit un cube (cf. cube_sequestration) en xarray.DataArray. Nécessite le paquet xarray, qui n'est pas une
+    dépendance du projet.
+    """
+    import xarray as xr
+
+    return xr.DataArray(cube["valeurs"], dims=cube["dimensions"], coords=cube["coordonnées"],
+                        name="variation_sequestration_carbone", attrs={"unité": cube["unité"]})
+
+
+
+
 ### PARTIE TEST à SUPRRIMER 
 
 #print(impact_changement_climatique_foret(2100,1.5))
@@ -254,5 +523,4 @@ def impact_total_sequestration(année,beta,généralisation):
 ## mettre la variation sequestration carbone sans projet BioTjet
 ## aussi tracer la même chose mais juste pour la partie aérienne (si on utilise des déchets de bois)
 ## + mettre en oeuvre l'effet de de l'arbre qui "repousse" (qui n'est pas dans cette partie de code)
-## faire plus d'années que 2030,2050 et 2100 ? A priori, il suffirait de trouver Température dans TRACC des années à ajouter
 
@@ -0,0 +1,155 @@
+"""
+PARTIE : Gradient des émissions par MJ
+
+Dérivées des émissions par MJ de e-bio-SAF (2023 et 2050) par rapport à tous les paramètres numériques des jeux de
+paramètres (param_biomasse, gaz_params, caract_syngas, param_FT, param_electrolyseur, param_compression,
+facteur_emission, param_mix_2050, facteur_emission_2023), pour le calage et l'optimisation des hypothèses.
+
+Les dérivées sont calculées en mode direct par nombres duaux (cf. etapes.dual) : chaque paramètre est remplacé par un
+nombre dual de dérivée unité, et un seul calcul du processus complet par le moteur de batch.py donne la valeur et le
+gradient, exacts à la précision machine. Des différences finies demanderaient 2k calculs du processus pour k
+paramètres, avec une erreur de troncature. La résolution itérative de compression_isentropique est dérivée par le
+théorème des fonctions implicites (cf. _5_compression._compression_isentropique_dual).
+
+Les paramètres sont repérés par leur chemin dans les jeux de paramètres et nommés comme dans le code, par exemple
+gaz_params["filtres_amine"] (cf. sensibilite.nom_parametre). Les dérivées sont des dérivées partielles : les parts du
+mix 2050 ne sont pas renormalisées (contrairement à monte_carlo.appliquer_valeurs).
+
+Contient :
+- parametres_duaux : copie des jeux de paramètres dont certains paramètres sont des nombres duaux
+- gradient_emissions : valeur et gradient des émissions par MJ (ou d'autres grandeurs de batch.py)
+- afficher_gradient : affichage des élasticités, par ordre décroissant
+"""
+
+import copy
+
+import numpy as np
+
+import batch
+import sensibilite
+from etapes import dual
+
+
+def parametres_duaux(params, chemins):
+    """
+    Renvoie une copie des jeux de paramètres dans laquelle chaque paramètre repéré par son chemin est remplacé par
+    un nombre dual de même valeur, de dérivée unité par rapport à lui-même (cf. dual.variables).
+
+    Arguments
+    ----------
+        params : jeux de paramètres (cf. batch.parametres_defaut)
+        chemins : chemins des paramètres dérivés, ex : [("gaz_params", "taux_carbone"), ("caract_syngas", "CO", "fraction")]
+
+    Returns
+    -------
+        params_duaux : copie des jeux de paramètres, les paramètres dérivés étant des nombres duaux
+    """
+    params_duaux = copy.deepcopy(params)
+    dictionnaires = []
+    for chemin in chemins:
+        dictionnaire = params_duaux
+        for cle in chemin[:-1]:
+            dictionnaire = dictionnaire[cle]
+        if chemin[-1] not in dictionnaire:
+            raise ValueError(f"Paramètre inconnu : {chemin}")
+        dictionnaires.append(dictionnaire)
+
+    variables = dual.variables([dictionnaire[chemin[-1]] for dictionnaire, chemin in zip(dictionnaires, chemins)])
+    for dictionnaire, chemin, variable in zip(dictionnaires, chemins, variables):
+        dictionnaire[chemin[-1]] = variable
+    return params_duaux
+
+
+def gradient_emissions(sens_physique=False, entree=97209, humidite=0, chemins=None, params=None,
+                       grandeurs=("emissions_MJ_produit_2023", "emissions_MJ_produit_2050"), methode_compression="iterative"):
+    """
+    Calcule en un seul passage la valeur et le gradient des grandeurs de sortie par rapport aux paramètres.
+
+    Arguments
+    ----------
+        sens_physique : True pour biomasse -> carburant, False (par défaut) pour carburant -> biomasse
+        entree : masse de kérosène à produire (t) en sens inverse, masse de biomasse humide (t) en sens physique ;
+                 nombre ou tableau (n,) (un élément par scénario)
+        humidite : taux d'humidité de la biomasse d'entrée (sens physique)
+        chemins : paramètres dérivés, par défaut tous les paramètres numériques, y compris nuls, hors constantes
+                  physiques (cf. sensibilite.parametres_numeriques et sensibilite.cles_exclues)
+        params : jeux de paramètres (cf. sensibilite.parametres_nominaux), par défaut les paramètres nominaux
+        grandeurs : grandeurs de sortie dérivées (cf. batch.py)
+        methode_compression : "iterative" (par défaut) ou "newton" ; la méthode "table" (interpolation) n'est pas
+                              dérivable
+
+    Returns
+    -------
+        resultats : dictionnaire {grandeur : {"valeur", "gradient", "elasticite"}} avec
+            - valeur : valeur de la grandeur (nombre, ou tableau (n,))
+            - gradient : {nom du paramètre : dérivée de la grandeur par rapport au paramètre}
+            - elasticite : {nom du paramètre : dérivée relative (dY/Y) / (dp/p)}
+    """
+    if methode_compression not in ("iterative", "newton"):
+        raise ValueError(f"Méthode de compression non dérivable : {methode_compression} (attendu : iterative ou newton)")
+    if params is None:
+        params = sensibilite.parametres_nominaux()
+    if chemins is None:
+        chemins = sensibilite.parametres_numeriques(params, non_nuls=False)
+
+    scalaire = np.ndim(entree) == 0 and np.ndim(humidite) == 0
+    params_duaux = parametres_duaux(params, chemins)
+    entree = np.atleast_1d(np.asarray(entree, dtype=float))
+    if sens_physique:
+        sorties = batch.calcul_sens_physique_batch(entree, np.broadcast_to(humidite, entree.shape), params_duaux,
+                                                   methode_compression)
+    else:
+        sorties = batch.calcul_sens_inverse_batch(entree, params_duaux, methode_compression)
+
+    noms = [sensibilite.nom_parametre(chemin) for chemin in chemins]
+    nominaux = np.asarray(_valeurs(params, chemins), dtype=float)
+
+    resultats = {}
+    for grandeur in grandeurs:
+        sortie = sorties[grandeur]
+        valeur = np.broadcast_to(dual.valeur(sortie), entree.shape)
+        derivees = np.broadcast_to(dual.derivees(sortie, len(chemins)), entree.shape + (len(chemins),))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            elasticites = derivees * nominaux / valeur[:, None]
+        if scalaire:
+            valeur, derivees, elasticites = valeur[0], derivees[0], elasticites[0]
+        resultats[grandeur] = {
+            "valeur": valeur,
+            "gradient": {nom: derivees[..., j] for j, nom in enumerate(noms)},
+            "elasticite": {nom: elasticites[..., j] for j, nom in enumerate(noms)},
+        }
+    return resultats
+
+
+def _valeurs(params, chemins):
+    """Valeurs des paramètres repérés par leurs chemins."""
+    valeurs = []
+    for chemin in chemins:
+        valeur = params
+        for cle in chemin:
+            valeur = valeur[cle]
+        valeurs.append(valeur)
+    return valeurs
+
+
+def afficher_gradient(resultats, nombre=15):
+    """
+    Affiche la valeur des grandeurs et les paramètres de plus forte élasticité (calcul pour un seul scénario).
+
+    Arguments
+    ----------
+        resultats : dictionnaire renvoyé par gradient_emissions
+        nombre : nombre de paramètres affichés par grandeur
+    """
+    for grandeur, derivees in resultats.items():
+        print(f"\n========== GRADIENT : {grandeur} = {float(derivees['valeur']):.4f} ==========")
+        elasticites = derivees["elasticite"]
+        for nom in sorted(elasticites, key=lambda nom: -abs(elasticites[nom]))[:nombre]:
+            print(f" - {nom:<55} élasticité = {float(elasticites[nom]):+.4f} ; "
+                  f"dérivée = {float(derivees['gradient'][nom]):+.6g}")
+    print()
+
+
+if __name__ == "__main__":
+    afficher_gradient(gradient_emissions())
+    afficher_gradient(gradient_emissions(sens_physique=True))
@@ -0,0 +1,198 @@
+"""
+PARTIE : Lecture de lots de biomasse (CSV / Parquet)
+
+Dans main.py, la biomasse d'entrée est une liste de quelques dictionnaires saisie à la main (biomasse_entree).
+Les exports d'approvisionnement contiennent en revanche des millions de lots de biomasse (une ligne par lot : type,
+masse, humidité). Ce module lit ces fichiers par blocs de lignes, calcule le bilan de chaque bloc avec les fonctions
+de _1_biomasse (masse sèche, culture, transport, torréfaction) sur des lots rangés en colonnes (LotsBiomasse), et
+cumule les totaux : la mémoire utilisée ne dépend que de la taille des blocs, et pas de la taille du fichier.
+
+Format des fichiers (une ligne par lot) :
+    type,masse,humidité          type de biomasse (cf. _1_biomasse.types_biomasse), masse (t), humidité (fraction)
+La colonne type est optionnelle (bois_vert par défaut) ; la colonne humidité peut aussi s'appeler humidite.
+Les fichiers Parquet, et la lecture rapide des CSV, nécessitent le paquet pyarrow ; sans pyarrow, les CSV sont lus
+avec le module csv de Python.
+
+Contient :
+- lire_lots : lecture d'un fichier de lots par blocs (générateur de LotsBiomasse)
+- bilan_bloc : bilan biomasse d'un bloc de lots (émissions, consommations, masses)
+- bilan_lots : bilan biomasse cumulé de tous les lots d'un fichier
+"""
+
+import csv
+import itertools
+import os
+
+import numpy as np
+
+from etapes import _1_biomasse as biomasse
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    # Types des colonnes d'un CSV lu avec pyarrow : sans type imposé, pyarrow devine le type sur le premier bloc, et
+    # des masses entières au début du fichier puis décimales plus loin provoqueraient une erreur de conversion
+    _types_colonnes_csv = {"type": pa.string(), "masse": pa.float64(), "humidité": pa.float64(),
+                           "humidite": pa.float64()}
+except ImportError: # pyarrow n'est pas une dépendance du projet : lecture des CSV avec le module csv, pas de Parquet
+    pa = None
+
+
+# Grandeurs cumulées par bilan_bloc et bilan_lots
+grandeurs_bilan = ("nombre_lots", "masse_biomasse", "masse_seche_biomasse", "emissions_culture", "emissions_transport",
+                   "conso_chaleur", "emissions_totales")
+
+
+##############################################################
+# Lecture par blocs
+##############################################################
+
+def _bloc(colonnes, n, codage_types=None):
+    """
+    Met un bloc de colonnes lues au format de lire_lots (LotsBiomasse).
+    codage_types : (noms distincts, indice de chaque lot) de la colonne type, si elle est déjà codée.
+    """
+    humidite = colonnes.get("humidité", colonnes.get("humidite"))
+    if "masse" not in colonnes or humidite is None:
+        raise ValueError("Le fichier de lots doit contenir les colonnes masse et humidité")
+    if codage_types is None:
+        if "type" in colonnes:
+            codage_types = np.unique(np.asarray(colonnes["type"], dtype=str), return_inverse=True)
+        else:
+            codage_types = (["bois_vert"], np.zeros(n, dtype=np.intp))
+    types, indice_type = codage_types
+    return biomasse.LotsBiomasse(biomasse.codes_types_biomasse(types)[np.asarray(indice_type).reshape(-1)],
+                                 np.asarray(colonnes["masse"], dtype=np.float64),
+                                 np.asarray(humidite, dtype=np.float64))
+
+
+def _blocs_arrow(lecteur):
+    """Blocs de lire_lots à partir des lots (RecordBatch) d'un lecteur pyarrow."""
+    for lot in lecteur:
+        if not lot.num_rows:
+            continue
+        colonnes = {nom: colonne for nom, colonne in zip(lot.schema.names, lot.columns)}
+        codage_types = None
+        if "type" in colonnes:
+            # Codage par hachage de la colonne des types, bien plus rapide qu'un tri de chaînes
+            encodage = colonnes.pop("type").dictionary_encode()
+            codage_types = (encodage.dictionary.to_numpy(zero_copy_only=False), encodage.indices.to_numpy())
+        yield _bloc({nom: colonne.to_numpy(zero_copy_only=False) for nom, colonne in colonnes.items()},
+                    lot.num_rows, codage_types)
+
+
+def _blocs_csv(chemin, taille_bloc, separateur):
+    """Blocs de lire_lots à partir d'un fichier CSV lu avec le module csv (sans pyarrow)."""
+    with open(chemin, newline="", encoding="utf-8") as fichier:
+        lecteur = csv.reader(fichier, delimiter=separateur)
+        entetes = next(lecteur, None)
+        if entetes is None:
+            return
+        while True:
+            lignes = list(itertools.islice(lecteur, taille_bloc))
+            if not lignes:
+                return
+            yield _bloc(dict(zip(entetes, zip(*lignes))), len(lignes))
+
+
+def lire_lots(chemin, taille_bloc=100000, separateur=","):
+    """
+    Lit un fichier de lots de biomasse (CSV ou Parquet, selon l'extension) par blocs de lignes.
+
+    Arguments
+    ----------
+        chemin : chemin du fichier (extension .csv ou .parquet)
+        taille_bloc : nombre de lignes par bloc (approximatif pour un CSV lu avec pyarrow, qui découpe le fichier
+                      en blocs d'octets)
+        separateur : séparateur des colonnes d'un fichier CSV
+
+    Returns
+    -------
+        blocs : générateur de lots de biomasse en colonnes (cf. _1_biomasse.LotsBiomasse : code du type, masse (t)
+                et humidité (fraction) de chaque lot)
+    """
+    if taille_bloc <= 0:
+        raise ValueError("La taille des blocs doit être strictement positive")
+    extension = os.path.splitext(chemin)[1].lower()
+
+    if extension == ".parquet":
+        if pa is None:
+            raise ValueError("La lecture des fichiers Parquet nécessite le paquet pyarrow")
+        return _blocs_arrow(pq.ParquetFile(chemin).iter_batches(batch_size=taille_bloc))
+    if extension != ".csv":
+        raise ValueError(f"Format de fichier de lots inconnu : {chemin} (attendu : .csv ou .parquet)")
+    if pa is None:
+        return _blocs_csv(chemin, taille_bloc, separateur)
+    # Environ 32 octets par ligne (type, masse, humidité)
+    return _blocs_arrow(pa_csv.open_csv(chemin, read_options=pa_csv.ReadOptions(block_size=max(taille_bloc * 32, 1 << 16)),
+                                        parse_options=pa_csv.ParseOptions(delimiter=separateur),
+                                        convert_options=pa_csv.ConvertOptions(column_types=_types_colonnes_csv)))
+
+
+##############################################################
+# Bilans
+##############################################################
+
+def bilan_bloc(param_biomasse, lots):
+    """
+    Calcule le bilan biomasse d'un bloc de lots (cf. lire_lots) avec les fonctions de _1_biomasse.
+
+    Arguments
+    ----------
+        param_biomasse : dictionnaire des paramètres liés à la biomasse
+        lots : lots de biomasse du bloc (LotsBiomasse)
+
+    Returns
+    -------
+        bilan : dictionnaire avec
+            - nombre_lots : nombre de lots du bloc
+            - masse_biomasse : masse totale de biomasse entrante (t)
+            - masse_seche_biomasse : masse totale de biomasse sèche après torréfaction (t)
+            - emissions_culture, emissions_transport, emissions_totales : émissions liées à la biomasse (tCO2e)
+            - conso_chaleur : consommation thermique liée à la torréfaction (MJ)
+            - masses_par_type : {type : masse entrante (t)}, pour les types présents dans le bloc
+    """
+    if np.any(lots.masse < 0) or np.any((lots.humidite < 0) | (lots.humidite >= 1)):
+        raise ValueError("Les masses des lots doivent être positives et les humidités comprises entre 0 et 1")
+
+    resultats = biomasse.bilan_biomasse(param_biomasse, lots)
+    masses_types = np.bincount(lots.code_type, lots.masse, minlength=len(biomasse.types_biomasse))
+    return {
+        "nombre_lots": len(lots.masse),
+        "masse_biomasse": lots.masse.sum(),
+        "masse_seche_biomasse": resultats["masse_seche_biomasse"],
+        "emissions_culture": resultats["emissions_culture"],
+        "emissions_transport": resultats["emissions_transport"],
+        "conso_chaleur": resultats["conso_chaleur"],
+        "emissions_totales": resultats["emissions_totales"],
+        "masses_par_type": {nom: masse for nom, masse in zip(biomasse.types_biomasse, masses_types) if masse > 0},
+    }
+
+
+def bilan_lots(chemin, param_biomasse=biomasse.param_biomasse, taille_bloc=100000, separateur=","):
+    """
+    Calcule le bilan biomasse cumulé de tous les lots d'un fichier, bloc par bloc (mémoire constante).
+    La masse sèche obtenue peut ensuite être donnée au reste du processus (cf. batch.calcul_sens_physique_batch).
+
+    Arguments
+    ----------
+        chemin : chemin du fichier de lots (cf. lire_lots)
+        param_biomasse : dictionnaire des paramètres liés à la biomasse
+        taille_bloc : nombre de lignes par bloc
+        separateur : séparateur des colonnes d'un fichier CSV
+
+    Returns
+    -------
+        bilan : dictionnaire des totaux sur tous les lots (cf. bilan_bloc)
+    """
+    bilan = dict.fromkeys(grandeurs_bilan, 0)
+    bilan["masses_par_type"] = {}
+    for bloc in lire_lots(chemin, taille_bloc, separateur):
+        bilan_du_bloc = bilan_bloc(param_biomasse, bloc)
+        for grandeur in grandeurs_bilan:
+            bilan[grandeur] += bilan_du_bloc[grandeur]
+        for nom, masse in bilan_du_bloc["masses_par_type"].items():
+            bilan["masses_par_type"][nom] = bilan["masses_par_type"].get(nom, 0) + masse
+    return bilan
@@ -14,6 +14,7 @@ from etapes import _4_electrolyseur as elec
 from etapes import _2_gazeification as gaz
 from etapes import _6_energie as energie
 from etapes import _5_compression as comp
+from etapes import rapport
 
 
 ######################
@@ -40,169 +41,247 @@ elec_conso = True
 ######################
 
 
-def __main__():
+def calcul_sens_physique(biomasse_entree):
+    """
+    Calcule les émissions et consommations du processus complet dans le sens physique (biomasse -> carburant).
+    Ne fait aucun affichage : les résultats sont mis en forme par afficher_resultats.
+
+    Arguments
+    ----------
+        biomasse_entree : liste de dictionnaires avec 'type', 'masse' (t) et 'humidité' (fraction)
+
+    Returns
+    -------
+        resultats : dictionnaire des résultats de chaque étape et des totaux
+    """
+    # Initialisation des listes pour stocker les consommations et émissions de chaque étape du processus
+    consos_energies, consos_thermiques, emissions_co2 = [], [], []
+
+    # Étape 1 : Biomasse
+    res_biomasse = biomasse.bilan_biomasse(biomasse.param_biomasse, biomasse_entree, sens_physique=True)
+    masse_seche_biomasse = res_biomasse["masse_seche_biomasse"]
+    consos_thermiques.append(res_biomasse["conso_chaleur"])
+    emissions_co2.append(res_biomasse["emissions_totales"])
+
+    # Étape 2 : Gazeification
+    res_gaz = gaz.bilan_gazeificationV2(masse_seche_biomasse, gaz.gaz_params, gaz.caract_syngas)
+    CO_gazif, besoin_H2_gazif = res_gaz["masseCO_sortie"], res_gaz["masseH2_necessaire"]
+    emissions_gazif, besoin_O2_gazif = res_gaz["masseCO2_sortie"], res_gaz["masseO2_necessaire"]
+    conso_elec_gaz = gaz.conso_elec_gazeification(emissions_gazif, besoin_H2_gazif, masse_seche_biomasse, gaz.gaz_params)
+    consos_energies.append(conso_elec_gaz)
+    emissions_co2.append(emissions_gazif)
+
+    # Étape 3 : Fischer-Tropsch
+    res_FT = ft.bilan_Fischer_Tropsch(ft.param_FT, CO_gazif)
+    consos_energies.append(res_FT["consommation_totale_FT"])
+
+    # Étape 4 : Électrolyseur
+    conso_elec_elec = elec.consommation_electrolyseur(elec.param_electrolyseur_PEM, besoin_O2_gazif, besoin_H2_gazif)
+    consos_energies.append(conso_elec_elec)
+
+    # Étape 5 : Compression (O2 entre l'électrolyseur et FT, CO2 capté amené à EM-Lacq, syngas entre la gazéification et FT)
+    conso_elec_compression = comp.conso_compression_procede(CO_gazif, besoin_H2_gazif, emissions_gazif, besoin_O2_gazif,
+                                                            comp.param_compression)
+    consos_energies.append(conso_elec_compression)
+
+    # consos_energies contient les consos élec pour [gazeification, FT, électrolyseur, compression]
+    # consos_thermiques contient les consos thermiques pour [biomasse]
+    # emissions_co2 contient les émissions de CO2 pour [biomasse, gazeification]
+    resultats = {
+        "sens_physique": True,
+        "biomasse_entree": biomasse_entree,
+        "biomasse": res_biomasse,
+        "gazeification": res_gaz,
+        "conso_elec_gazeification": conso_elec_gaz,
+        "FT": res_FT,
+        "conso_elec_electrolyseur": conso_elec_elec,
+        "conso_elec_compression": conso_elec_compression,
+    }
+    # Étape 6 : Calcul des émissions totales et consommations énergétiques
+    return _totaux(resultats, consos_energies, consos_thermiques, emissions_co2)
+
+
+def calcul_sens_inverse(kerosene_produit):
+    """
+    Calcule les émissions et consommations du processus complet dans le sens inverse (carburant -> biomasse).
+    Ne fait aucun affichage : les résultats sont mis en forme par afficher_resultats.
+
+    Arguments
+    ----------
+        kerosene_produit : masse de e-bio-SAF produite (t)
+
+    Returns
+    -------
+        resultats : dictionnaire des résultats de chaque étape et des totaux
+    """
+    # Initialisation des listes pour stocker les consommations et émissions de chaque étape du processus
+    consos_energies, consos_thermiques, emissions_co2 = [], [], []
+
+    # Étape 1 : Fischer-Tropsch
+    res_FT = ft.bilan_Inv_Fischer_Tropsch(ft.param_FT, kerosene_produit)
+    masseCO_sortie = res_FT["CO_necessaire"]
+    consos_energies.append(res_FT["consommation_totale_FT"])
+
+    # Étape 2 : Gazeification
+    res_gaz = gaz.bilan_Inv_gazeificationV1(masseCO_sortie, gaz.gaz_params, gaz.caract_syngas)
+    masse_seche_biomasse, besoin_H2_gazif = res_gaz["biomasse_entree"], res_gaz["masseH2_necessaire"]
+    besoin_O2_gazif, emissions_gazif = res_gaz["masseO2_necessaire"], res_gaz["masseCO2_sortie"]
+    conso_elec_gaz = gaz.conso_elec_gazeification(emissions_gazif, besoin_H2_gazif, masse_seche_biomasse, gaz.gaz_params)
+    consos_energies.append(conso_elec_gaz)
+    emissions_co2.append(emissions_gazif)
+
+    # Étape 3 : Électrolyseur
+    conso_elec_elec = elec.consommation_electrolyseur(elec.param_electrolyseur_PEM, besoin_O2_gazif, besoin_H2_gazif)
+    consos_energies.append(conso_elec_elec)
+
+    # Étape 4 : Biomasse
+    res_biomasse = biomasse.bilan_biomasse(biomasse.param_biomasse, masse_seche_biomasse, sens_physique=False)
+    consos_thermiques.append(res_biomasse["conso_chaleur"])
+    emissions_co2.append(res_biomasse["emissions_totales"])
+
+    # Étape 5 : Compression (O2 entre l'électrolyseur et FT, CO2 capté amené à EM-Lacq, syngas entre la gazéification et FT)
+    conso_elec_compression = comp.conso_compression_procede(masseCO_sortie, besoin_H2_gazif, emissions_gazif, besoin_O2_gazif,
+                                                            comp.param_compression)
+    consos_energies.append(conso_elec_compression)
+
+    # consos_energies contient les consos élec pour [FT, gazeification, électrolyseur, compression]
+    # consos_thermiques contient les consos thermiques pour [biomasse]
+    # emissions_co2 contient les émissions de CO2 pour [gazeification, biomasse]
+    resultats = {
+        "sens_physique": False,
+        "kerosene_produit": kerosene_produit,
+        "FT": res_FT,
+        "gazeification": res_gaz,
+        "conso_elec_gazeification": conso_elec_gaz,
+        "conso_elec_electrolyseur": conso_elec_elec,
+        "biomasse": res_biomasse,
+        "conso_elec_compression": conso_elec_compression,
+    }
+    # Étape 6 : Calcul des émissions totales et consommations énergétiques
+    return _totaux(resultats, consos_energies, consos_thermiques, emissions_co2)
+
+
+def _totaux(resultats, consos_energies, consos_thermiques, emissions_co2):
+    """Complète les résultats avec les émissions liées à l'énergie et les totaux du processus."""
+    emissions_2050, emissions_2023 = energie.emissions_energie_totale(consos_energies) # en gCO2e
+
+    total_conso_energie = sum(consos_energies)
+    # Prise en compte des pertes en ligne sur le réseau de distribution haute tension (valeur de RTE)
+    if not elec_conso : total_conso_energie *= (1/0.979)
+
+    # Émissions rapportées à l'énergie du e-bio-SAF produit par le projet BioTJet
+    energie_kerosene = ft.param_FT['production_BioTJet'] * ft.param_FT['PCI_kerosene'] * 1000
+
+    resultats.update({
+        "consos_energies": consos_energies,
+        "consos_thermiques": consos_thermiques,
+        "emissions_co2": emissions_co2,
+        "total_conso_energie": total_conso_energie,
+        "total_conso_thermique": sum(consos_thermiques),
+        "total_emissions_2050": emissions_2050[-1], # le total est le dernier élément de la liste retournée par la fonction
+        "total_emissions_2023": emissions_2023[-1],
+        "emissions_MJ_2050": emissions_2050[-1] / energie_kerosene,
+        "emissions_MJ_2023": emissions_2023[-1] / energie_kerosene,
+    })
+    return resultats
+
+
+def afficher_resultats(resultats):
+    """
+    Affiche le rapport complet d'un calcul (sens physique ou inverse), une fois tous les calculs terminés.
+
+    Arguments
+    ----------
+        resultats : dictionnaire renvoyé par calcul_sens_physique ou calcul_sens_inverse
+    """
+    f = rapport.format_nombre
 
     # Cas calcul sens physique : biomasse -> carburant
-    if sens_physique == True:
+    if resultats["sens_physique"]:
 
         print("Calcul des émissions et consommations du processus e-bio-SAF complet, en partant de la biomasse jusqu'au carburant e-bio-SAF.")
         print("-"*60)
         print("Le calcul se base sur les hypothèses sourcées dans chaque étape du processus.\n On prend en entrée les biomasses suivantes :")
         
         # Rappel des biomasses d'entrée renseignées dans la variable "biomasse_entree"
-        for b in biomasse_entree:
+        for b in resultats["biomasse_entree"]:
             print(f" - {b['masse']} t de biomasse de type {b['type']} à {b['humidité']*100}% d'humidité")
         
-        # Initialisation des listes pour stocker les consommations et émissions de chaque étape du processus
-        consos_energies, consos_thermiques, emissions_co2 = [], [], []
-        
         print("-"*60,"\n")
         print("Étape 1 : Biomasse")
-        conso_chaleur, total_emissions, masse_seche_biomasse = biomasse.Biomasse(biomasse.param_biomasse, biomasse_entree, sens_physique)
-        consos_thermiques.append(conso_chaleur)
-        emissions_co2.append(total_emissions)
+        rapport.afficher_biomasse(resultats["biomasse"])
         
         print("-"*60)
         print("Étape 2 : Gazeification")
-        CO_gazif, besoin_H2_gazif, emissions_gazif, besoin_O2_gazif,dechets_gazif = gaz.gazeificationV2(masse_seche_biomasse, gaz.gaz_params, gaz.caract_syngas)
-        conso_elec_gaz = gaz.conso_elec_gazeification(emissions_gazif, besoin_H2_gazif, masse_seche_biomasse, gaz.gaz_params)
-        print("Consommation électrique : ", f"{conso_elec_gaz:,.2f}".replace(",", " "), " en kWh")
-        print("Émissions de CO2 liées à la gazéification : ", f"{emissions_gazif:,.2f}".replace(",", " "), " en tCO2e")
-        consos_energies.append(conso_elec_gaz)
-        emissions_co2.append(emissions_gazif)
+        rapport.afficher_gazeification(resultats["gazeification"])
+        print("Consommation électrique : ", f(resultats["conso_elec_gazeification"]), " en kWh")
+        print("Émissions de CO2 liées à la gazéification : ", f(resultats["gazeification"]["masseCO2_sortie"]), " en tCO2e")
         
         print("-"*60)
         print("Étape 3 : Fischer-Tropsch")
-        consommation_totale_FT, _ = ft.Fischer_Tropsch(ft.param_FT, CO_gazif)
-        consos_energies.append(consommation_totale_FT )
+        rapport.afficher_FT(resultats["FT"])
         
         print("-"*60)
         print("Étape 4 : Électrolyseur")
-        conso_elec_elec = elec.consommation_electrolyseur(elec.param_electrolyseur_PEM, besoin_O2_gazif, besoin_H2_gazif)
-        print("Consommation électrique électrolyseur : ", f"{conso_elec_elec:,.2f}".replace(",", " "), " en kWh")
-        consos_energies.append(conso_elec_elec)
+        print("Consommation électrique électrolyseur : ", f(resultats["conso_elec_electrolyseur"]), " en kWh")
         
         print("-"*60)
         print("Étape 5 : Compression")
-        masse_CO_kg = CO_gazif * 1000         # Conversion en kg
-        masse_H2_kg = besoin_H2_gazif * 1000  # Conversion en kg
-        masse_CO2_kg = emissions_gazif * 1000 # Conversion en kg
-        masse_O2_kg = besoin_O2_gazif * 1000  # Conversion en kg
-        # Calcul de la consommation électrique de compression de l'O2 entre l'électrolyseur et FT
-        conso_compression_O2 = comp.conso_compression(masse_O2_kg, "O2", 0.8, 1, 20, 288.15)
-        # Calcul de la consommation électrique de compression du CO2 capté sortie du réactuer BioTJet et amené à EM-Lacq
-        conso_compression_CO2 = comp.conso_compression(masse_CO2_kg, "CO2", 0.8, 1, 20, 288.15)
-        # Calcul de la consommation électrique de compression du syngas entre la gazéification et FT
-        conso_compression_syngas = comp.conso_compression_syngaz(masse_CO2_kg, masse_H2_kg, masse_CO_kg, 0.85, 1, 1.12, 323.15) #hypothèse flux total de gaz à ventiler
-        conso_elec_compression = conso_compression_O2 + conso_compression_syngas + conso_compression_CO2
-        print("Consommation électrique compression : ", f"{conso_elec_compression:,.2f}".replace(",", " "), " en kWh")
-        consos_energies.append(conso_elec_compression)
-        
-        print("-"*60)
-        print("Étape 6 : Calcul des émissions totales et consommations énergétiques")
-        emissions_2050, emissions_2023 = energie.emissions_energie_totale(consos_energies) # en gCO2e
-        
-        print("-"*60)
-        print("Résultats finaux :")
-        # Prise en compte des pertes en ligne sur le réseau de distribution haute tension (valeur de RTE)
-        if not elec_conso : total_conso_energie *= (1/0.979)
-        total_emissions_2050 = emissions_2050[-1] # le total est le dernier élément de la liste retournée par la fonction
-        total_emissions_2023 = emissions_2023[-1] # le total est le dernier élément de la liste retournée par la fonction
-        total_conso_energie = sum(consos_energies)
-        total_conso_thermique = sum(consos_thermiques)
-        print(f" - Consommation électrique totale : \t\t\t{total_conso_energie:,.2f} kWh".replace(",", " "))
-        print(f" - Consommation thermique totale : \t\t\t{total_conso_thermique:,.2f} MJ".replace(",", " "))
-        print(f" - Émissions totales en 2050 : \t\t\t\t{total_emissions_2050/1000000:,.2f} tCO2e".replace(",", " "))
-        print(f" - Émissions totales en 2023 : \t\t\t\t{total_emissions_2023/1000000:,.2f} tCO2e".replace(",", " "))
-        print(f" - Émissions totales par MJ de e-bio-SAF en 2023 : \t{total_emissions_2023 / (ft.param_FT['production_BioTJet'] * ft.param_FT['PCI_kerosene'] * 1000):,.2f} gCO2e/MJ".replace(",", " "))
-        print(f" - Émissions totales par MJ de e-bio-SAF en 2050 : \t{total_emissions_2050 / (ft.param_FT['production_BioTJet'] * ft.param_FT['PCI_kerosene'] * 1000):,.2f} gCO2e/MJ".replace(",", " "))
-        print("------------------------------FIN---------------------------------")
-
-        # consos_energies contient les consos élec pour [gazeification, FT, électrolyseur, compression]
-        # consos_thermiques contient les consos thermiques pour [biomasse]
-        # emissions_co2 contient les émissions de CO2 pour [biomasse, gazeification]
-
+        print("Consommation électrique compression : ", f(resultats["conso_elec_compression"]), " en kWh")
+        decimales_MJ = 2
 
     # Cas calcul sens inverse : carburant -> biomasse
     else: 
         print("Calcul des émissions et consommations du processus e-bio-SAF complet, en partant du carburant e-bio-SAF produit jusqu'à la biomasse.")
         print("-"*60)
         print("Le calcul se base sur les hypothèses sourcées dans chaque étape du processus.")
-        print(f"\nOn a en entrée {kerosene_produit:,.2f} t e-bio-SAF produites.\n".replace(",", " "))
-        
-        # Initialisation des listes pour stocker les consommations et émissions de chaque étape du processus
-        consos_energies, consos_thermiques, emissions_co2 = [], [], []
+        print(f"\nOn a en entrée {f(resultats['kerosene_produit'])} t e-bio-SAF produites.\n")
 
         print("-"*60)
         print("Étape 1 : Fischer-Tropsch")
-        consommation_totale_FT, masseCO_sortie = ft.Inv_Fischer_Tropsch(ft.param_FT, kerosene_produit)
-        consos_energies.append(consommation_totale_FT)
+        rapport.afficher_FT(resultats["FT"])
 
         print("-"*60)
         print("Étape 2 : Gazeification")
-        masse_seche_biomasse, besoin_H2_gazif, besoin_O2_gazif, emissions_gazif = gaz.Inv_gazeificationV1(masseCO_sortie, gaz.gaz_params, gaz.caract_syngas)
-        conso_elec_gaz = gaz.conso_elec_gazeification(emissions_gazif, besoin_H2_gazif, masse_seche_biomasse, gaz.gaz_params)
-        print(f"Consommation électrique : {conso_elec_gaz:,.2f} kWh".replace(",", " "))
-        consos_energies.append(conso_elec_gaz)
-        emissions_co2.append(emissions_gazif)
+        rapport.afficher_gazeification_inverse(resultats["gazeification"])
+        print(f"Consommation électrique : {f(resultats['conso_elec_gazeification'])} kWh")
 
         print("-"*60)
         print("Étape 3 : Électrolyseur")
-        conso_elec_elec = elec.consommation_electrolyseur(elec.param_electrolyseur_PEM, besoin_O2_gazif, besoin_H2_gazif)
-        print(f"Consommation électrique électrolyseur : {conso_elec_elec:,.2f} kWh".replace(",", " "))
-        consos_energies.append(conso_elec_elec)
+        print(f"Consommation électrique électrolyseur : {f(resultats['conso_elec_electrolyseur'])} kWh")
 
         print("-"*60)
         print("Étape 4 : Biomasse")
-        conso_chaleur, total_emissions, _ = biomasse.Biomasse(biomasse.param_biomasse, masse_seche_biomasse, sens_physique)
-        consos_thermiques.append(conso_chaleur)
-        emissions_co2.append(total_emissions)
+        rapport.afficher_biomasse(resultats["biomasse"])
 
         print("-"*60)
         print("Étape 5 : Compression")
-        masse_CO_kg = masseCO_sortie * 1000  # Conversion en kg
-        masse_H2_kg = besoin_H2_gazif * 1000  # Conversion en kg
-        masse_CO2_kg = emissions_gazif * 1000 # Conversion en kg
-        masse_O2_kg = besoin_O2_gazif * 1000  # Conversion en kg
-        # Calcul de la consommation électrique de compression de l'O2 entre l'électrolyseur et FT
-        conso_compression_O2 = comp.conso_compression(masse_O2_kg, "O2", 0.8, 1, 20, 288.15)
-        # Calcul de la consommation électrique de compression du CO2 capté sortie du réactuer BioTJet et amené à EM-Lacq
-        conso_compression_CO2 = comp.conso_compression(masse_CO2_kg, "CO2", 0.8, 1, 20, 288.15)
-        # Calcul de la consommation électrique de compression du syngas entre la gazéification et FT
-        conso_compression_syngas = comp.conso_compression_syngaz(masse_CO2_kg, masse_H2_kg, masse_CO_kg, 0.85, 1, 1.12, 323.15) #hypothèse flux total de gaz à ventiler
-        conso_elec_compression = conso_compression_O2 + conso_compression_syngas + conso_compression_CO2
-        print(f"Consommation électrique compression : {conso_elec_compression:,.2f} kWh".replace(",", " "))
-        consos_energies.append(conso_elec_compression)
-        
+        print(f"Consommation électrique compression : {f(resultats['conso_elec_compression'])} kWh")
+        decimales_MJ = 4
 
-        print("-"*60)
-        print("Étape 6 : Calcul des émissions totales et consommations énergétiques")
-        emissions_2050, emissions_2023 = energie.emissions_energie_totale(consos_energies)
+    print("-"*60)
+    print("Étape 6 : Calcul des émissions totales et consommations énergétiques")
 
-        print("-"*60)
-        print("Résultats finaux :")
-        total_emissions_2050 = emissions_2050[-1] # le total est le dernier élément de la liste retournée par la fonction
-        total_emissions_2023 = emissions_2023[-1] # le total est le dernier élément de la liste retournée par la fonction
-        total_conso_energie = sum(consos_energies)
-        total_conso_thermique = sum(consos_thermiques)
-        # Prise en compte des pertes en ligne sur le réseau de distribution haute tension (valeur de RTE)
-        if not elec_conso : total_conso_energie *= (1/0.979)
-
-        print(f" - Consommation électrique totale : \t\t\t{total_conso_energie:,.2f} kWh".replace(",", " "))
-        print(f" - Consommation thermique totale : \t\t\t{total_conso_thermique:,.2f} MJ".replace(",", " "))
-        print(f" - Émissions totales en 2050 : \t\t\t\t{total_emissions_2050/1000000:,.2f} tCO2e".replace(",", " "))
-        print(f" - Émissions totales en 2023 : \t\t\t\t{total_emissions_2023/1000000:,.2f} tCO2e".replace(",", " "))        
-        print(f" - Émissions totales par MJ de e-bio-SAF en 2023 : \t{total_emissions_2023 / (ft.param_FT['production_BioTJet'] * ft.param_FT['PCI_kerosene'] * 1000):,.4f} gCO2e/MJ".replace(",", " "))
-        print(f" - Émissions totales par MJ de e-bio-SAF en 2050 : \t{total_emissions_2050 / (ft.param_FT['production_BioTJet'] * ft.param_FT['PCI_kerosene'] * 1000):,.4f} gCO2e/MJ".replace(",", " "))
-        print("------------------------------FIN---------------------------------")
-
-        # consos_energies contient les consos élec pour [FT, gazeification, électrolyseur, compression]
-        # consos_thermiques contient les consos thermiques pour [biomasse]
-        # emissions_co2 contient les émissions de CO2 pour [gazeification, biomasse]
-    
-    
-    
-    
+    print("-"*60)
+    print("Résultats finaux :")
+    print(f" - Consommation électrique totale : \t\t\t{f(resultats['total_conso_energie'])} kWh")
+    print(f" - Consommation thermique totale : \t\t\t{f(resultats['total_conso_thermique'])} MJ")
+    print(f" - Émissions totales en 2050 : \t\t\t\t{f(resultats['total_emissions_2050']/1000000)} tCO2e")
+    print(f" - Émissions totales en 2023 : \t\t\t\t{f(resultats['total_emissions_2023']/1000000)} tCO2e")
+    print(f" - Émissions totales par MJ de e-bio-SAF en 2023 : \t{f(resultats['emissions_MJ_2023'], decimales_MJ)} gCO2e/MJ")
+    print(f" - Émissions totales par MJ de e-bio-SAF en 2050 : \t{f(resultats['emissions_MJ_2050'], decimales_MJ)} gCO2e/MJ")
+    print("------------------------------FIN---------------------------------")
+
+
+def __main__():
+
+    # Tous les calculs sont faits sans affichage, le rapport est affiché une seule fois à la fin
+    if sens_physique == True:
+        resultats = calcul_sens_physique(biomasse_entree)
+    else:
+        resultats = calcul_sens_inverse(kerosene_produit)
+
+    afficher_resultats(resultats)
 
 
 if __name__ == "__main__":
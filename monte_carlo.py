@@ -0,0 +1,381 @@
+"""
+PARTIE : Incertitudes (Monte Carlo)
+
+Propagation des incertitudes sur les paramètres sourcés (param_biomasse, gaz_params, caract_syngas, param_FT,
+param_electrolyseur, param_compression, facteur_emission, param_mix_2050, facteur_emission_2023) jusqu'aux
+émissions par MJ de e-bio-SAF en 2023 et en 2050.
+
+Chaque paramètre incertain est repéré par son chemin dans les jeux de paramètres de batch.parametres_defaut,
+par exemple ("gaz_params", "taux_carbone") ou ("caract_syngas", "CO", "fraction"), et reçoit une loi de probabilité :
+    - ("uniforme", bas, haut)
+    - ("triangulaire", bas, mode, haut)
+    - ("normale", moyenne, ecart_type)
+    - ("lognormale", mediane, sigma) avec sigma l'écart-type du logarithme
+
+Les tirages sont faits par blocs (taille_bloc tirages à la fois) : pour chaque bloc, tous les paramètres sont
+tirés d'un coup (tableaux NumPy) et le processus complet est évalué une seule fois par le moteur vectorisé de
+batch.py. Les grandeurs suivies (par défaut les émissions par MJ) ne sont pas conservées tirage par tirage : chaque
+bloc met à jour leurs moments (moyenne, écart-type) et un histogramme à nombre de classes fixe, dont on déduit les
+centiles (à la largeur d'une classe près). La mémoire utilisée ne dépend donc que de la taille des blocs et du nombre
+de classes, et pas du nombre de tirages ; les échantillons peuvent être conservés sur demande (centiles exacts).
+
+Chaque lot de tirages_par_generateur tirages consécutifs a son propre générateur aléatoire, dérivé de (graine, numéro
+du lot) comme les shards de balayage.py : pour une même graine, les tirages et les résultats ne dépendent pas de la
+taille des blocs.
+
+Contient :
+- distributions_defaut : lois de probabilité par défaut des paramètres incertains
+- tirer : tirage vectorisé d'une loi de probabilité
+- appliquer_valeurs : copie des jeux de paramètres avec des valeurs (tableaux) à la place de certains paramètres
+- parametres_tires : jeux de paramètres dont les valeurs incertaines sont remplacées par des tableaux de tirages
+- monte_carlo : tirages par blocs, évaluation du processus et statistiques (centiles, moyenne, écart-type)
+- afficher_monte_carlo : affichage console des résultats
+"""
+
+import copy
+
+import numpy as np
+
+import batch
+from etapes import rapport
+
+
+###############################################################
+# Stockage des lois de probabilité des paramètres incertains  #
+###############################################################
+
+"""
+Les bornes sont des hypothèses de travail, à affiner avec les sources de chaque paramètre :
+la valeur sourcée est prise comme mode (ou centre) de la loi, et l'amplitude traduit la confiance dans la source.
+"""
+
+distributions_defaut = {
+
+    ## BIOMASSE ##
+    ("param_biomasse", "PCI_biomasse") : ("triangulaire", 4600, 5050, 5500),                       # kWh/t
+    ("param_biomasse", "capacite_calorifique_biomasse") : ("triangulaire", 2.0, 2.301, 2.6),       # kJ/kg.K, essences variées
+    ("param_biomasse", "emissions_transport_biomasse") : ("triangulaire", 0.08, 0.096, 0.12),      # kgCO2e/t.km
+    ("param_biomasse", "distance_biomasse-torrefaction") : ("triangulaire", 250, 500, 750),        # km, choix arbitraire
+    ("param_biomasse", "distance_torrefaction-gazeification") : ("triangulaire", 25, 50, 75),      # km, choix arbitraire
+
+    ## GAZÉIFICATION ##
+    ("gaz_params", "taux_carbone") : ("triangulaire", 0.47, 0.50, 0.53),   # assez indépendant de l'essence
+    ("gaz_params", "fractionO") : ("triangulaire", 0.40, 0.43, 0.45),
+    ("gaz_params", "filtres_amine") : ("triangulaire", 3, 4, 5),           # GJ/t
+    ("gaz_params", "fonctionnement_interne") : ("triangulaire", 1, 2, 3),  # %
+    ("caract_syngas", "CO", "fraction") : ("triangulaire", 0.74, 0.78, 0.82),
+    ("caract_syngas", "CO2", "fraction") : ("triangulaire", 0.08, 0.1, 0.12),
+    ("caract_syngas", "H2", "fraction") : ("triangulaire", 0.08, 0.1, 0.12),
+
+    ## FISCHER-TROPSCH ##
+    ("param_FT", "PCI_kerosene") : ("triangulaire", 11.8, 11.974, 12.1),   # kWh/kg
+    ("param_FT", "besoin_total_CO2") : ("triangulaire", 438777, 461871, 484965), # tCO2/an, +/- 5 %
+
+    ## ÉLECTROLYSEUR ##
+    # la consommation stackée est recalculée à partir de l'efficacité pour chaque tirage (cf. appliquer_valeurs)
+    ("param_electrolyseur", "efficacite_electrolyseur") : ("triangulaire", 0.70, 0.75, 0.80),
+
+    ## COMPRESSION ##
+    ("param_compression", "O2", "rendement") : ("triangulaire", 0.75, 0.8, 0.85),
+    ("param_compression", "CO2", "rendement") : ("triangulaire", 0.75, 0.8, 0.85),
+    ("param_compression", "syngaz", "rendement") : ("triangulaire", 0.8, 0.85, 0.9),
+
+    ## ÉNERGIE ##
+    ("facteur_emission", "nucleaire") : ("triangulaire", 3.7, 5, 12),      # gCO2eq/kWh
+    ("facteur_emission", "eolien") : ("triangulaire", 12, 15, 20),
+    ("facteur_emission", "solaire") : ("triangulaire", 25, 32, 45),
+    ("facteur_emission", "hydraulique") : ("triangulaire", 4, 6, 10),
+    ("facteur_emission", "biomasse") : ("triangulaire", 150, 230, 300),
+    # parts du mix 2050 : renormalisées pour que leur somme reste égale à 1 (cf. appliquer_valeurs)
+    ("param_mix_2050", "nucleaire") : ("triangulaire", 0.33, 0.38, 0.43),
+    ("param_mix_2050", "eolien") : ("triangulaire", 0.25, 0.304, 0.35),
+    ("param_mix_2050", "solaire") : ("triangulaire", 0.15, 0.198, 0.25),
+    ("facteur_emission_2023", "consommation") : ("triangulaire", 32.4, 34.3, 36.2), # entre mix de production et de consommation
+}
+
+
+##############################################################
+# Fonctions de tirage
+##############################################################
+
+def tirer(rng, loi, n):
+    """
+    Tire n valeurs d'une loi de probabilité.
+
+    Arguments
+    ----------
+        rng : générateur aléatoire NumPy (np.random.Generator)
+        loi : tuple (nom de la loi, paramètres...) : "uniforme", "triangulaire", "normale" ou "lognormale"
+        n : nombre de tirages
+
+    Returns
+    -------
+        tirages : tableau NumPy (n,)
+    """
+    nom, *arguments = loi
+    if nom == "uniforme":
+        return rng.uniform(*arguments, size=n)
+    elif nom == "triangulaire":
+        return rng.triangular(*arguments, size=n)
+    elif nom == "normale":
+        return rng.normal(*arguments, size=n)
+    elif nom == "lognormale":
+        mediane, sigma = arguments
+        return mediane * np.exp(sigma * rng.standard_normal(n))
+    else:
+        raise ValueError(f"Loi de probabilité inconnue : {nom}")
+
+
+def appliquer_valeurs(params, valeurs):
+    """
+    Renvoie une copie des jeux de paramètres dans laquelle chaque paramètre repéré par son chemin est remplacé
+    par la valeur donnée (en général un tableau, un élément par scénario).
+    - si des parts du mix 2050 sont modifiées, elles sont renormalisées pour que leur somme reste égale à 1 ;
+    - si l'efficacité de l'électrolyseur est modifiée, sa consommation stackée est recalculée pour chaque scénario
+      à partir de l'électrolyseur de référence (cf. _4_electrolyseur.consom_elec_stack).
+
+    Arguments
+    ----------
+        params : jeux de paramètres (cf. batch.parametres_defaut)
+        valeurs : dictionnaire {chemin du paramètre : valeur}
+
+    Returns
+    -------
+        params_modifies : copie des jeux de paramètres avec les valeurs remplacées
+    """
+    params_modifies = copy.deepcopy(params)
+    for chemin, valeur in valeurs.items():
+        dictionnaire = params_modifies
+        for cle in chemin[:-1]:
+            dictionnaire = dictionnaire[cle]
+        if chemin[-1] not in dictionnaire:
+            raise ValueError(f"Paramètre inconnu : {chemin}")
+        dictionnaire[chemin[-1]] = valeur
+
+    if any(chemin[0] == "param_mix_2050" for chemin in valeurs):
+        mix = params_modifies["param_mix_2050"]
+        total = sum(mix.values())
+        for energie in mix:
+            mix[energie] = mix[energie] / total
+
+    if ("param_electrolyseur", "efficacite_electrolyseur") in valeurs:
+        params_modifies["param_electrolyseur"]["consommation_electricite_stack"] = None # recalculée par consom_elec_stack
+
+    return params_modifies
+
+
+def parametres_tires(rng, n, distributions=None, params=None):
+    """
+    Renvoie une copie des jeux de paramètres dans laquelle chaque paramètre incertain est remplacé
+    par un tableau de n tirages de sa loi (cf. appliquer_valeurs).
+
+    Arguments
+    ----------
+        rng : générateur aléatoire NumPy (np.random.Generator)
+        n : nombre de tirages
+        distributions : dictionnaire {chemin du paramètre : loi}, par défaut distributions_defaut
+        params : jeux de paramètres nominaux (cf. batch.parametres_defaut), par défaut ceux des modules étapes
+
+    Returns
+    -------
+        params_tires : jeux de paramètres, les valeurs incertaines étant des tableaux (n,)
+    """
+    if distributions is None:
+        distributions = distributions_defaut
+    if params is None:
+        params = batch.parametres_defaut()
+
+    return appliquer_valeurs(params, {chemin: tirer(rng, loi, n) for chemin, loi in distributions.items()})
+
+
+##############################################################
+# Statistiques en flux
+##############################################################
+
+tirages_par_generateur = 10000 # tirages consécutifs tirés par un même générateur aléatoire
+
+
+def _tirages_bloc(sequence, debut, n, distributions):
+    """
+    Tirages des paramètres incertains des tirages debut à debut + n - 1 : les lots de tirages_par_generateur tirages
+    qui recouvrent le bloc sont tirés chacun avec leur propre générateur, puis découpés.
+    """
+    morceaux = {chemin: [] for chemin in distributions}
+    for lot in range(debut // tirages_par_generateur, (debut + n - 1) // tirages_par_generateur + 1):
+        rng = np.random.default_rng(np.random.SeedSequence(sequence.entropy, spawn_key=(lot,)))
+        premier = lot * tirages_par_generateur
+        lignes = slice(max(debut, premier) - premier, min(debut + n, premier + tirages_par_generateur) - premier)
+        for chemin, loi in distributions.items():
+            morceaux[chemin].append(tirer(rng, loi, tirages_par_generateur)[lignes])
+    return {chemin: np.concatenate(valeurs) for chemin, valeurs in morceaux.items()}
+
+
+def _ajouter_moments(moments, valeurs):
+    """Met à jour le nombre, la moyenne et la somme des carrés des écarts (algorithme de Chan) avec un bloc."""
+    n, moyenne = len(valeurs), np.mean(valeurs)
+    m2 = np.sum((valeurs - moyenne) ** 2)
+    total = moments["n"] + n
+    ecart = moyenne - moments["moyenne"]
+    moments["m2"] += m2 + ecart ** 2 * moments["n"] * n / total
+    moments["moyenne"] += ecart * n / total
+    moments["n"] = total
+
+
+def _ajouter_histogramme(histogramme, valeurs):
+    """
+    Ajoute un bloc de valeurs à un histogramme à nombre de classes fixe. Les classes ont pour largeur une puissance de 2
+    et sont alignées sur ses multiples : la largeur est la plus petite pour laquelle les classes couvrent toutes les
+    valeurs vues, les classes étant regroupées deux à deux lorsqu'un bloc sort de l'intervalle couvert. L'histogramme
+    ne dépend donc que des valeurs, et pas de leur découpage en blocs.
+    """
+    n_classes = len(histogramme["comptes"])
+    bas = histogramme["min"] = min(histogramme["min"], float(np.min(valeurs)))
+    haut = histogramme["max"] = max(histogramme["max"], float(np.max(valeurs)))
+
+    exposant = histogramme["exposant"]
+    if exposant is None: # premier bloc ; sans étendue, des classes plus fines que la précision des valeurs
+        etendue = haut - bas
+        exposant = int(np.floor(np.log2(etendue / n_classes))) if etendue > 0 else \
+            int(np.floor(np.log2(max(abs(bas), abs(haut), 1e-300)))) - 52 - n_classes.bit_length()
+    while np.floor(np.ldexp(haut, -exposant)) - np.floor(np.ldexp(bas, -exposant)) >= n_classes:
+        exposant += 1
+    origine = np.floor(np.ldexp(bas, -exposant)) # indice de la première classe
+
+    if exposant != histogramme["exposant"] or origine != histogramme["origine"]: # classes regroupées ou décalées
+        occupees = np.flatnonzero(histogramme["comptes"])
+        comptes = np.zeros(n_classes, dtype=np.int64)
+        if len(occupees):
+            indices = np.floor(np.ldexp(histogramme["origine"] + occupees, histogramme["exposant"] - exposant))
+            np.add.at(comptes, (indices - origine).astype(np.int64), histogramme["comptes"][occupees])
+        histogramme.update(exposant=exposant, origine=origine, comptes=comptes)
+
+    classes = (np.floor(np.ldexp(valeurs, -exposant)) - origine).astype(np.int64)
+    histogramme["comptes"] += np.bincount(np.clip(classes, 0, n_classes - 1), minlength=n_classes)
+
+
+def _centiles_histogramme(histogramme, centiles):
+    """
+    Centiles (%) d'un histogramme, par interpolation linéaire dans la classe qui contient chaque centile, bornés par
+    les valeurs extrêmes.
+    """
+    comptes = histogramme["comptes"]
+    cumul = np.concatenate([[0], np.cumsum(comptes)])
+    rangs = np.asarray(centiles, dtype=float) / 100 * cumul[-1]
+    classes = np.clip(np.searchsorted(cumul, rangs, side="right") - 1, 0, len(comptes) - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        position = np.clip(np.nan_to_num((rangs - cumul[classes]) / comptes[classes]), 0, 1)
+    valeurs = np.ldexp(histogramme["origine"] + classes + position, histogramme["exposant"])
+    return np.clip(valeurs, histogramme["min"], histogramme["max"])
+
+
+##############################################################
+# Propagation des incertitudes
+##############################################################
+
+def monte_carlo(n_tirages, sens_physique=False, entree=97209, humidite=0, distributions=None, params=None,
+                taille_bloc=100000, graine=None, centiles=(2.5, 5, 25, 50, 75, 95, 97.5),
+                grandeurs=("emissions_MJ_produit_2023", "emissions_MJ_produit_2050"), methode_compression="table",
+                classes_histogramme=10000, conserver_echantillons=False):
+    """
+    Propagation des incertitudes par la méthode de Monte Carlo, avec tirages et évaluation par blocs.
+
+    Arguments
+    ----------
+        n_tirages : nombre total de tirages (jusqu'à plusieurs millions)
+        sens_physique : True pour biomasse -> carburant, False (par défaut) pour carburant -> biomasse
+        entree : masse de kérosène à produire (t) en sens inverse, masse de biomasse humide de type
+                 bois vert (t) en sens physique
+        humidite : taux d'humidité (fraction) de la biomasse d'entrée, en sens physique seulement
+        distributions : lois des paramètres incertains (cf. distributions_defaut)
+        params : jeux de paramètres nominaux (cf. batch.parametres_defaut)
+        taille_bloc : nombre de tirages évalués à la fois (borne la mémoire utilisée par les calculs)
+        graine : graine des générateurs aléatoires, pour des résultats reproductibles (indépendants de taille_bloc)
+        centiles : centiles à calculer (%)
+        grandeurs : grandeurs de sortie suivies (noms des colonnes de résultats de batch.py)
+        methode_compression : "table" (par défaut, interpolation), "iterative" ou "newton"
+                              (cf. _5_compression.conso_compression_procede)
+        classes_histogramme : nombre de classes de l'histogramme des centiles (cf. _ajouter_histogramme)
+        conserver_echantillons : si True, conserve la valeur de chaque tirage (mémoire proportionnelle à n_tirages)
+                                 et calcule les centiles exacts
+
+    Returns
+    -------
+        resultats : dictionnaire avec
+            - n_tirages, centiles
+            - moyenne, ecart_type : {grandeur : valeur}
+            - valeurs_centiles : {grandeur : tableau des centiles}
+            - resolution_centiles : {grandeur : largeur d'une classe de l'histogramme}, 0 pour des centiles exacts
+            - echantillons : {grandeur : tableau (n_tirages,) des valeurs tirées}, si conserver_echantillons
+    """
+    if n_tirages <= 0 or taille_bloc <= 0:
+        raise ValueError("Le nombre de tirages et la taille des blocs doivent être strictement positifs")
+    if classes_histogramme < 2:
+        raise ValueError("L'histogramme des centiles doit avoir au moins 2 classes")
+    if distributions is None:
+        distributions = distributions_defaut
+    if params is None:
+        params = batch.parametres_defaut()
+
+    sequence = np.random.SeedSequence(graine)
+    moments = {grandeur: {"n": 0, "moyenne": 0.0, "m2": 0.0} for grandeur in grandeurs}
+    histogrammes = {grandeur: {"min": np.inf, "max": -np.inf, "exposant": None, "origine": None,
+                               "comptes": np.zeros(classes_histogramme, dtype=np.int64)} for grandeur in grandeurs}
+    echantillons = {grandeur: np.empty(n_tirages) for grandeur in grandeurs} if conserver_echantillons else None
+
+    for debut in range(0, n_tirages, taille_bloc):
+        n = min(taille_bloc, n_tirages - debut)
+        params_bloc = appliquer_valeurs(params, _tirages_bloc(sequence, debut, n, distributions))
+
+        if sens_physique:
+            resultats_bloc = batch.calcul_sens_physique_batch(np.full(n, float(entree)), np.full(n, float(humidite)),
+                                                              params_bloc, methode_compression)
+        else:
+            resultats_bloc = batch.calcul_sens_inverse_batch(np.full(n, float(entree)), params_bloc, methode_compression)
+
+        for grandeur in grandeurs:
+            valeurs = np.broadcast_to(resultats_bloc[grandeur], n)
+            _ajouter_moments(moments[grandeur], valeurs)
+            _ajouter_histogramme(histogrammes[grandeur], valeurs)
+            if conserver_echantillons:
+                echantillons[grandeur][debut:debut + n] = valeurs
+
+    resultats = {
+        "n_tirages": n_tirages,
+        "centiles": np.asarray(centiles),
+        "moyenne": {grandeur: float(moments[grandeur]["moyenne"]) for grandeur in grandeurs},
+        "ecart_type": {grandeur: float(np.sqrt(moments[grandeur]["m2"] / n_tirages)) for grandeur in grandeurs},
+    }
+    if conserver_echantillons:
+        resultats["echantillons"] = echantillons
+        resultats["valeurs_centiles"] = {grandeur: np.percentile(valeurs, centiles)
+                                         for grandeur, valeurs in echantillons.items()}
+        resultats["resolution_centiles"] = {grandeur: 0.0 for grandeur in grandeurs}
+    else:
+        resultats["valeurs_centiles"] = {grandeur: _centiles_histogramme(histogramme, centiles)
+                                         for grandeur, histogramme in histogrammes.items()}
+        resultats["resolution_centiles"] = {grandeur: float(np.ldexp(1.0, histogramme["exposant"]))
+                                            for grandeur, histogramme in histogrammes.items()}
+    return resultats
+
+
+def afficher_monte_carlo(resultats, decimales=4):
+    """
+    Affiche les statistiques des grandeurs suivies par monte_carlo.
+
+    Arguments
+    ----------
+        resultats : dictionnaire renvoyé par monte_carlo
+        decimales : nombre de décimales affichées
+    """
+    f = rapport.format_nombre
+    print(f"\n========== MONTE CARLO : {f(resultats['n_tirages'], 0)} tirages ==========")
+    for grandeur in resultats["moyenne"]:
+        print(f"{grandeur} :")
+        print(f" - moyenne : {f(resultats['moyenne'][grandeur], decimales)} ; écart-type : {f(resultats['ecart_type'][grandeur], decimales)}")
+        for centile, valeur in zip(resultats["centiles"], resultats["valeurs_centiles"][grandeur]):
+            print(f" - centile {centile:g} % : {f(valeur, decimales)}")
+    print("==================================================\n")
+
+
+if __name__ == "__main__":
+    afficher_monte_carlo(monte_carlo(1000000, graine=0))
@@ -0,0 +1,278 @@
+"""
+PARTIE : Optimisation de la conception de l'usine
+
+Recherche des choix de conception (pressions de compression, technologie d'électrolyseur, distance d'approvisionnement
+en biomasse, humidité de la biomasse, composition du syngas dans des bornes) qui minimisent les émissions par MJ de
+e-bio-SAF, sous contraintes :
+    - syngas conforme : fraction volumique CO + H2 >= 80 % après normalisation (même condition que gazeificationV2) ;
+    - contraintes de production optionnelles sur les grandeurs de batch.py, ex : {"masse_kerosene": (50000, None)}.
+
+L'optimisation est faite par évolution différentielle (stratégie best/1/bin avec facteur de mutation tiré à chaque
+génération) : toute la population d'une génération est évaluée en un seul appel du moteur vectorisé de batch.py
+(un scénario par individu). Les contraintes sont traitées par les règles de faisabilité de Deb : un individu
+conforme l'emporte sur un individu non conforme, deux individus non conformes sont départagés par l'importance de
+leur non-conformité, et deux individus conformes par leur objectif. Les individus dont le syngas n'est pas conforme
+sont évalués avec la composition nominale (gazeificationV2 refuserait tout le lot), leur objectif n'étant pas utilisé.
+
+Les variables sont repérées par leur chemin dans les jeux de paramètres (cf. monte_carlo) et reçoivent des bornes
+(bas, haut), ou une liste de choix (technologies d'électrolyseur, cf. _4_electrolyseur.technologies). Deux variables
+ne sont pas des paramètres : ("humidite",), l'humidité de la biomasse d'entrée (sens physique), et ("electrolyseur",),
+la technologie d'électrolyseur.
+
+Contient :
+- variables_defaut : variables de conception et leurs bornes par défaut
+- objectifs : grandeurs minimisables (émissions par MJ de l'électricité seule, ou avec celles de la biomasse)
+- evaluer_population : évaluation d'une population (objectif et non-conformité de chaque individu)
+- optimiser : évolution différentielle
+- afficher_optimisation : affichage console de la meilleure conception
+"""
+
+import numpy as np
+
+import batch
+import monte_carlo
+import sensibilite
+from etapes import _4_electrolyseur as elec
+
+
+###############################################################
+# Variables de conception                                     #
+###############################################################
+
+"""
+Bornes indicatives, à adapter au site : les pressions de sortie des compressions d'O2 et de CO2 encadrent celles de
+balayage.py, la distance d'approvisionnement celle de la loi de monte_carlo, et les fractions du syngas celles
+annoncées pour le procédé (la contrainte CO + H2 >= 80 % s'applique en plus).
+"""
+
+variables_defaut = {
+    ("param_compression", "O2", "P2_bar") : (10, 50),                       # bar
+    ("param_compression", "CO2", "P2_bar") : (10, 50),                      # bar
+    ("param_biomasse", "distance_biomasse-torrefaction") : (100, 750),      # km
+    ("caract_syngas", "CO", "fraction") : (0.70, 0.85),
+    ("caract_syngas", "H2", "fraction") : (0.05, 0.20),
+    ("caract_syngas", "CO2", "fraction") : (0.05, 0.15),
+    ("humidite",) : (0, 0.5),                                               # humidité de la biomasse d'entrée
+    ("electrolyseur",) : ("alcalin", "PEM"),                                # technologies du registre
+}
+
+objectifs = ("emissions_MJ_produit_2050", "emissions_MJ_produit_2023", "emissions_totales_MJ_produit_2050", "emissions_totales_MJ_produit_2023")
+
+
+##############################################################
+# Évaluation d'une population
+##############################################################
+
+def _est_choix(bornes):
+    return any(isinstance(valeur, (str, elec.TechnologieElectrolyseur)) for valeur in bornes)
+
+
+def _decoder(U, variables):
+    """Valeurs des variables (tableaux (n,)) pour une population U de l'hypercube unité (n, d)."""
+    valeurs = {}
+    for j, (chemin, bornes) in enumerate(variables.items()):
+        if _est_choix(bornes):
+            valeurs[chemin] = np.minimum((U[:, j] * len(bornes)).astype(int), len(bornes) - 1) # indice du choix
+        else:
+            bas, haut = bornes
+            valeurs[chemin] = bas + U[:, j] * (haut - bas)
+    return valeurs
+
+
+def _non_conformite_syngas(caract_syngas, n):
+    """Non-conformité du syngas de chaque individu : 0.80 - (CO + H2) après normalisation, si positive."""
+    total = sum(gaz["fraction"] for gaz in caract_syngas.values())
+    part_CO_H2 = (caract_syngas["CO"]["fraction"] + caract_syngas["H2"]["fraction"]) / total
+    return np.broadcast_to(np.maximum(0, 0.80 - part_CO_H2), n)
+
+
+def evaluer_population(U, variables=None, sens_physique=True, entree=300000, humidite=0, params=None,
+                       objectif="emissions_totales_MJ_produit_2050", contraintes=None, methode_compression="table"):
+    """
+    Évalue une population de conceptions en un seul appel du moteur vectorisé de batch.py.
+
+    Arguments
+    ----------
+        U : population, tableau (n, d) de l'hypercube unité (colonne j : variable j de variables, de bas à haut)
+        variables : dictionnaire {chemin : (bas, haut) ou liste de choix} (cf. variables_defaut)
+        sens_physique : True (par défaut) pour biomasse -> carburant, False pour carburant -> biomasse
+        entree : masse de biomasse humide (t) en sens physique, par défaut les 300 000 t de main.py, ou masse de
+                 kérosène à produire (t) en sens inverse (à donner, ex : 97209 comme dans main.py)
+        humidite : humidité de la biomasse d'entrée, si elle n'est pas une variable (sens physique)
+        params : jeux de paramètres (cf. batch.parametres_defaut), par défaut ceux des modules étapes
+        objectif : grandeur minimisée (cf. objectifs) ; les émissions "totales" ajoutent celles de la biomasse
+                   (culture, transport) à celles de l'électricité
+        contraintes : dictionnaire {grandeur de batch.py : (minimum ou None, maximum ou None)}, optionnel
+        methode_compression : "table" (par défaut), "iterative" ou "newton"
+
+    Returns
+    -------
+        objectif : valeur de l'objectif de chaque individu (gCO2e/MJ), tableau (n,)
+        non_conformite : somme des dépassements relatifs des contraintes de chaque individu (0 si conforme)
+        resultats : colonnes de résultats de batch.py, complétées par l'objectif
+    """
+    if variables is None:
+        variables = variables_defaut
+    if params is None:
+        params = batch.parametres_defaut()
+    if objectif not in objectifs:
+        raise ValueError(f"Objectif inconnu : {objectif} (disponibles : {', '.join(objectifs)})")
+    if ("humidite",) in variables and not sens_physique:
+        raise ValueError("L'humidité de la biomasse n'est une variable qu'en sens physique")
+
+    U = np.atleast_2d(U)
+    n = len(U)
+    valeurs = _decoder(U, variables)
+    humidites = valeurs.pop(("humidite",), np.full(n, float(humidite)))
+    choix_electrolyseur = valeurs.pop(("electrolyseur",), None)
+
+    params_population = monte_carlo.appliquer_valeurs(params, valeurs)
+    if choix_electrolyseur is not None:
+        technologies = [valeur if isinstance(valeur, elec.TechnologieElectrolyseur) else elec.technologie(valeur)
+                        for valeur in variables[("electrolyseur",)]]
+        params_population["param_electrolyseur"] = {
+            cle: np.array([technologie.parametres()[cle] for technologie in technologies])[choix_electrolyseur]
+            for cle in technologies[0].parametres()
+        }
+
+    # Syngas non conforme : évalué avec la composition nominale (l'individu est écarté par sa non-conformité)
+    non_conformite = _non_conformite_syngas(params_population["caract_syngas"], n).copy()
+    if np.any(non_conformite > 0):
+        for nom, caracteristiques in params_population["caract_syngas"].items():
+            caracteristiques["fraction"] = np.where(non_conformite > 0, params["caract_syngas"][nom]["fraction"],
+                                                    caracteristiques["fraction"])
+
+    if sens_physique:
+        resultats = batch.calcul_sens_physique_batch(np.full(n, float(entree)), humidites, params_population,
+                                                     methode_compression)
+    else:
+        resultats = batch.calcul_sens_inverse_batch(np.full(n, float(entree)), params_population, methode_compression)
+
+    # Émissions totales : électricité (gCO2e) et biomasse (tCO2e), par MJ de e-bio-SAF
+    energie_kerosene = resultats["masse_kerosene"] * params_population["param_FT"]["PCI_kerosene"] * 1000
+    for annee in ("2050", "2023"):
+        resultats[f"emissions_totales_MJ_produit_{annee}"] = (resultats[f"emissions_{annee}"]
+                                                      + resultats["emissions_biomasse"] * 1e6) / energie_kerosene
+
+    for grandeur, (minimum, maximum) in (contraintes or {}).items():
+        if minimum is not None:
+            non_conformite += np.maximum(0, minimum - resultats[grandeur]) / max(abs(minimum), 1e-12)
+        if maximum is not None:
+            non_conformite += np.maximum(0, resultats[grandeur] - maximum) / max(abs(maximum), 1e-12)
+
+    return np.broadcast_to(resultats[objectif], n), non_conformite, resultats
+
+
+##############################################################
+# Évolution différentielle
+##############################################################
+
+def _meilleurs(objectif_a, non_conformite_a, objectif_b, non_conformite_b):
+    """Règles de Deb : True là où la solution a est au moins aussi bonne que la solution b."""
+    return (non_conformite_a < non_conformite_b) | ((non_conformite_a == non_conformite_b) & (objectif_a <= objectif_b))
+
+
+def optimiser(variables=None, sens_physique=True, entree=300000, humidite=0, params=None,
+              objectif="emissions_totales_MJ_produit_2050", contraintes=None, taille_population=40, generations=200,
+              mutation=(0.5, 1.0), croisement=0.7, tol=1e-8, graine=None, methode_compression="table"):
+    """
+    Minimise l'objectif sur les variables de conception par évolution différentielle (best/1/bin).
+    Chaque génération est évaluée en un seul appel de batch.py (cf. evaluer_population).
+
+    Arguments
+    ----------
+        variables, sens_physique, entree, humidite, params, objectif, contraintes, methode_compression :
+            cf. evaluer_population
+        taille_population : nombre d'individus par génération (au moins 4)
+        generations : nombre maximal de générations
+        mutation : intervalle du facteur de mutation, tiré à chaque génération
+        croisement : probabilité de croisement de chaque variable
+        tol : arrêt lorsque l'écart-type des objectifs de la population (tous conformes) devient inférieur à
+              tol fois la valeur absolue de leur moyenne
+        graine : graine du générateur aléatoire, pour des résultats reproductibles
+
+    Returns
+    -------
+        resultats : dictionnaire avec
+            - conception : {chemin de la variable : meilleure valeur (nombre, ou choix)}
+            - objectif, non_conformite : objectif et non-conformité de la meilleure conception
+            - resultats : colonnes de résultats de batch.py pour la meilleure conception (nombres)
+            - historique : meilleur objectif de chaque génération (tableau)
+            - generations, evaluations : nombres de générations et d'évaluations effectuées
+    """
+    if variables is None:
+        variables = variables_defaut
+    if taille_population < 4:
+        raise ValueError("L'évolution différentielle nécessite au moins 4 individus")
+    options = dict(variables=variables, sens_physique=sens_physique, entree=entree, humidite=humidite, params=params,
+                   objectif=objectif, contraintes=contraintes, methode_compression=methode_compression)
+    rng = np.random.default_rng(graine)
+    d = len(variables)
+
+    # Population initiale : hypercube latin (une valeur par tranche de chaque variable)
+    U = (np.argsort(rng.random((d, taille_population)), axis=1).T + rng.random((taille_population, d))) / taille_population
+    f, v, _ = evaluer_population(U, **options)
+    f = f.copy()
+    historique, evaluations = [], taille_population
+
+    for _ in range(generations):
+        meilleur = np.lexsort((f, v))[0]
+        historique.append(f[meilleur])
+        if np.all(v == 0) and np.std(f) <= tol * abs(np.mean(f)):
+            break
+
+        # Mutation : meilleur + F * (r1 - r2), r1 et r2 distincts et différents de l'individu
+        cles = rng.random((taille_population, taille_population))
+        np.fill_diagonal(cles, np.inf)
+        r1, r2 = np.argsort(cles, axis=1)[:, :2].T
+        mutants = U[meilleur] + rng.uniform(*mutation) * (U[r1] - U[r2])
+
+        # Croisement binomial (au moins une variable du mutant), dans les bornes
+        croises = rng.random((taille_population, d)) < croisement
+        croises[np.arange(taille_population), rng.integers(0, d, taille_population)] = True
+        essais = np.clip(np.where(croises, mutants, U), 0, 1)
+
+        f_essais, v_essais, _ = evaluer_population(essais, **options)
+        evaluations += taille_population
+        remplaces = _meilleurs(f_essais, v_essais, f, v)
+        U[remplaces], f[remplaces], v[remplaces] = essais[remplaces], f_essais[remplaces], v_essais[remplaces]
+
+    meilleur = np.lexsort((f, v))[0]
+    _, _, resultats = evaluer_population(U[meilleur], **options)
+    valeurs = _decoder(U[meilleur:meilleur + 1], variables)
+    conception = {chemin: variables[chemin][valeur[0]] if _est_choix(variables[chemin]) else float(valeur[0])
+                  for chemin, valeur in valeurs.items()}
+    return {
+        "conception": conception,
+        "objectif": float(f[meilleur]),
+        "non_conformite": float(v[meilleur]),
+        "resultats": {grandeur: float(np.ravel(valeur)[0]) for grandeur, valeur in resultats.items()},
+        "historique": np.array(historique),
+        "generations": len(historique),
+        "evaluations": evaluations,
+    }
+
+
+def afficher_optimisation(resultats, objectif="emissions_totales_MJ_produit_2050"):
+    """
+    Affiche la meilleure conception trouvée par optimiser.
+
+    Arguments
+    ----------
+        resultats : dictionnaire renvoyé par optimiser
+        objectif : nom de l'objectif minimisé (pour l'affichage)
+    """
+    print(f"\n========== OPTIMISATION : {objectif} ==========")
+    print(f" - Objectif : {resultats['objectif']:.4f} gCO2e/MJ "
+          f"({resultats['generations']} générations, {resultats['evaluations']} évaluations)")
+    if resultats["non_conformite"] > 0:
+        print(f" - Aucune conception conforme trouvée (non-conformité : {resultats['non_conformite']:.4g})")
+    for chemin, valeur in resultats["conception"].items():
+        nom = sensibilite.nom_parametre(chemin)
+        valeur = getattr(valeur, "nom", valeur)
+        print(f" - {nom:<55} {valeur if isinstance(valeur, str) else format(valeur, '.4g')}")
+    print()
+
+
+if __name__ == "__main__":
+    afficher_optimisation(optimiser(graine=0, contraintes={"masse_kerosene": (50000, None)}))
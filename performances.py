@@ -0,0 +1,281 @@
+"""
+PARTIE : Mesure des performances
+
+Banc de mesure du débit de calcul (scénarios par seconde) et de la mémoire (pic de RSS) des fonctions de chaque
+étape et des calculs complets (batch.py), pour des lots de 1, 1 000, 100 000 et 1 000 000 scénarios.
+Les mesures peuvent être enregistrées comme références (fichier JSON) puis comparées aux mesures suivantes, pour
+repérer les baisses de débit après une modification du code.
+
+Chaque mesure (fonction x taille de lot) est faite dans un processus neuf, pour que le pic de RSS soit celui de la
+mesure : il comprend l'interpréteur, NumPy et les données d'entrée du lot. Les entrées sont tirées aléatoirement
+(graine fixe) dans des plages réalistes ; un premier appel, non chronométré, remplit les caches (tables de
+compression, coefficients du syngas), puis la fonction est appelée jusqu'à dépasser la durée minimale de mesure
+et le meilleur temps est retenu.
+
+Usage :
+    python performances.py                          mesures, et comparaison aux références si le fichier existe
+    python performances.py --enregistrer            mesures enregistrées comme nouvelles références
+    python performances.py --tailles 1 1000 --cas FT sens_physique --seuil 0.3
+
+Contient :
+- cas_mesures : fonctions mesurées et préparation de leurs entrées
+- mesurer : mesure d'une fonction pour une taille de lot (dans un processus séparé)
+- mesurer_tout : mesure de toutes les fonctions pour toutes les tailles de lot
+- comparer : comparaison des mesures aux références (baisses de débit au-delà d'un seuil)
+- enregistrer_references, charger_references : lecture et écriture des références (JSON)
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+import batch
+import foret
+from etapes import _2_gazeification as gaz
+from etapes import _3_FT as ft
+from etapes import _5_compression as comp
+from etapes import _6_energie as energie
+
+try:
+    import resource
+except ImportError: # module absent sous Windows : le pic de RSS n'est alors pas mesuré
+    resource = None
+
+
+tailles_defaut = (1, 1000, 100000, 1000000)
+fichier_references = os.path.join(os.path.dirname(os.path.abspath(__file__)), "references_performances.json")
+
+
+##############################################################
+# Fonctions mesurées
+##############################################################
+
+def _cas_gazeification(n, rng):
+    biomasse_seche = rng.uniform(1e5, 5e5, n)
+    return lambda: gaz.gazeificationV2(biomasse_seche, gaz.gaz_params, gaz.caract_syngas, verbose=False)
+
+
+def _cas_inv_gazeification(n, rng):
+    masse_CO = rng.uniform(1e5, 5e5, n)
+    return lambda: gaz.Inv_gazeificationV1(masse_CO, gaz.gaz_params, gaz.caract_syngas, verbose=False)
+
+
+def _cas_compression_isentropique(n, rng):
+    P2_bar, T0_K = rng.uniform(2, 30, n), rng.uniform(280, 330, n)
+    return lambda: comp.compression_isentropique("CO2", 1, P2_bar, T0_K)
+
+
+def _cas_compression_syngaz(n, rng):
+    masse_CO2, masse_H2, masse_CO = rng.uniform(1e7, 5e7, (3, n))
+    return lambda: comp.conso_compression_syngaz(masse_CO2, masse_H2, masse_CO, 0.85, 1, 1.12, 323.15)
+
+
+def _cas_FT(n, rng):
+    masse_CO = rng.uniform(1e5, 5e5, n)
+    return lambda: ft.Fischer_Tropsch(ft.param_FT, masse_CO, verbose=False)
+
+
+def _cas_emissions_energie(n, rng):
+    consos = list(rng.uniform(1e6, 1e9, (4, n)))
+    return lambda: energie.emissions_energie_totale(consos)
+
+
+def _cas_foret(n, rng):
+    beta, generalisation = rng.uniform(0, 2, n), rng.uniform(0, 100, n)
+    return lambda: foret.impact_total_sequestration(2050, beta, generalisation)
+
+
+def _cas_trajectoire_foret(n, rng):
+    beta, generalisation = rng.uniform(0, 2, n), rng.uniform(0, 100, n)
+    return lambda: foret.trajectoire_sequestration(beta, generalisation, 2025, 2100)
+
+
+def _cas_sens_physique(n, rng):
+    masses, humidites = rng.uniform(1e5, 5e5, n), rng.uniform(0, 0.5, n)
+    return lambda: batch.calcul_sens_physique_batch(masses, humidites)
+
+
+def _cas_sens_inverse(n, rng):
+    kerosene = rng.uniform(1e4, 1e5, n)
+    return lambda: batch.calcul_sens_inverse_batch(kerosene)
+
+
+# nom : (préparation des entrées, taille de lot maximale ou None)
+# La trajectoire de la forêt a 76 années par scénario : elle est limitée à 100 000 scénarios (environ 0,5 Go de tableaux)
+cas_mesures = {
+    "gazeificationV2": (_cas_gazeification, None),
+    "Inv_gazeificationV1": (_cas_inv_gazeification, None),
+    "compression_isentropique": (_cas_compression_isentropique, None),
+    "conso_compression_syngaz": (_cas_compression_syngaz, None),
+    "FT": (_cas_FT, None),
+    "emissions_energie_totale": (_cas_emissions_energie, None),
+    "foret_impact_total": (_cas_foret, None),
+    "foret_trajectoire": (_cas_trajectoire_foret, 100000),
+    "sens_physique": (_cas_sens_physique, None),
+    "sens_inverse": (_cas_sens_inverse, None),
+}
+
+
+##############################################################
+# Mesures
+##############################################################
+
+def _rss_pic():
+    """Pic de RSS du processus courant (Mo), ou None si le module resource est absent."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024**2 if sys.platform == "darwin" else rss / 1024 # octets sous macOS, Ko sous Linux
+
+
+def _mesurer_processus(nom, taille, duree_min, repetitions_max, graine):
+    """Mesure exécutée dans le processus séparé (cf. mesurer)."""
+    fonction = cas_mesures[nom][0](taille, np.random.default_rng(graine))
+    debut = time.perf_counter()
+    fonction() # premier appel : remplissage des caches
+    premier_appel = time.perf_counter() - debut
+
+    temps = []
+    while not temps or (sum(temps) < duree_min and len(temps) < repetitions_max):
+        debut = time.perf_counter()
+        fonction()
+        temps.append(time.perf_counter() - debut)
+    meilleur = min(temps)
+    return {
+        "temps_s": meilleur,
+        "premier_appel_s": premier_appel,
+        "repetitions": len(temps),
+        "scenarios_par_s": taille / meilleur,
+        "rss_pic_Mo": _rss_pic(),
+    }
+
+
+def mesurer(nom, taille, duree_min=0.5, repetitions_max=1000, graine=0):
+    """
+    Mesure le débit et le pic de mémoire d'une fonction pour une taille de lot, dans un processus neuf.
+
+    Arguments
+    ----------
+        nom : nom de la fonction mesurée (cf. cas_mesures)
+        taille : nombre de scénarios du lot
+        duree_min : durée minimale de mesure (s) ; la fonction est appelée jusqu'à la dépasser
+        repetitions_max : nombre maximal d'appels chronométrés
+        graine : graine du tirage des entrées
+
+    Returns
+    -------
+        mesure : dictionnaire avec
+            - temps_s : meilleur temps d'un appel (s)
+            - premier_appel_s : temps du premier appel, avec remplissage des caches (s)
+            - repetitions : nombre d'appels chronométrés
+            - scenarios_par_s : débit (scénarios par seconde)
+            - rss_pic_Mo : pic de RSS du processus de mesure (Mo), None si indisponible
+    """
+    if nom not in cas_mesures:
+        raise ValueError(f"Fonction mesurée inconnue : {nom} (disponibles : {', '.join(cas_mesures)})")
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executeur:
+        return executeur.submit(_mesurer_processus, nom, taille, duree_min, repetitions_max, graine).result()
+
+
+def mesurer_tout(tailles=tailles_defaut, noms=None, duree_min=0.5, verbose=True):
+    """
+    Mesure toutes les fonctions (ou celles données) pour toutes les tailles de lot.
+
+    Arguments
+    ----------
+        tailles : tailles de lot
+        noms : noms des fonctions mesurées, par défaut toutes (cf. cas_mesures)
+        duree_min : durée minimale de chaque mesure (s)
+        verbose : affichage de chaque mesure
+
+    Returns
+    -------
+        resultats : dictionnaire {"nom/taille" : mesure (cf. mesurer)}
+    """
+    resultats = {}
+    for nom in (cas_mesures if noms is None else noms):
+        taille_max = cas_mesures.get(nom, (None, None))[1]
+        for taille in tailles:
+            if taille_max is not None and taille > taille_max:
+                continue
+            resultats[f"{nom}/{taille}"] = mesure = mesurer(nom, taille, duree_min)
+            if verbose:
+                rss = "-" if mesure["rss_pic_Mo"] is None else f"{mesure['rss_pic_Mo']:.0f} Mo"
+                print(f"{nom:<26}{taille:>9}  {mesure['temps_s'] * 1e3:>10.3f} ms  "
+                      f"{mesure['scenarios_par_s']:>12.4g} scénarios/s  pic RSS {rss}")
+    return resultats
+
+
+##############################################################
+# Références
+##############################################################
+
+def enregistrer_references(resultats, chemin=fichier_references):
+    """Enregistre les mesures comme références (JSON), avec la description de la machine."""
+    with open(chemin, "w", encoding="utf-8") as fichier:
+        json.dump({
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "machine": {"plateforme": platform.platform(), "processeur": platform.processor(),
+                        "python": platform.python_version(), "numpy": np.__version__},
+            "mesures": resultats,
+        }, fichier, indent=2, ensure_ascii=False)
+
+
+def charger_references(chemin=fichier_references):
+    """Renvoie les mesures de référence enregistrées (cf. enregistrer_references)."""
+    with open(chemin, encoding="utf-8") as fichier:
+        return json.load(fichier)["mesures"]
+
+
+def comparer(resultats, references, seuil=0.2):
+    """
+    Compare des mesures à des références et renvoie les baisses de débit au-delà du seuil.
+
+    Arguments
+    ----------
+        resultats : mesures (cf. mesurer_tout)
+        references : mesures de référence (cf. charger_references)
+        seuil : baisse relative de débit tolérée (0.2 : le débit peut baisser de 20 %)
+
+    Returns
+    -------
+        regressions : dictionnaire {"nom/taille" : rapport débit mesuré / débit de référence}, pour les mesures
+                      dont le débit a baissé de plus du seuil
+    """
+    regressions = {}
+    for cle, mesure in resultats.items():
+        if cle in references:
+            rapport = mesure["scenarios_par_s"] / references[cle]["scenarios_par_s"]
+            if rapport < 1 - seuil:
+                regressions[cle] = rapport
+    return regressions
+
+
+if __name__ == "__main__":
+    parseur = argparse.ArgumentParser(description="Mesure des performances du calcul par étapes et par lots")
+    parseur.add_argument("--tailles", type=int, nargs="+", default=tailles_defaut, help="tailles de lot")
+    parseur.add_argument("--cas", nargs="+", choices=list(cas_mesures), help="fonctions mesurées (par défaut toutes)")
+    parseur.add_argument("--duree", type=float, default=0.5, help="durée minimale de chaque mesure (s)")
+    parseur.add_argument("--references", default=fichier_references, help="fichier JSON des références")
+    parseur.add_argument("--seuil", type=float, default=0.2, help="baisse de débit tolérée (fraction)")
+    parseur.add_argument("--enregistrer", action="store_true", help="enregistre les mesures comme références")
+    arguments = parseur.parse_args()
+
+    resultats = mesurer_tout(arguments.tailles, arguments.cas, arguments.duree)
+    if arguments.enregistrer:
+        enregistrer_references(resultats, arguments.references)
+        print(f"Références enregistrées dans {arguments.references}")
+    elif os.path.exists(arguments.references):
+        regressions = comparer(resultats, charger_references(arguments.references), arguments.seuil)
+        for cle, rapport in regressions.items():
+            print(f"Baisse de débit : {cle} à {rapport:.0%} de la référence")
+        print(f"{len(regressions)} baisse(s) de débit au-delà de {arguments.seuil:.0%}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,296 @@
+"""
+PARTIE : Analyse de sensibilité globale
+
+Identifie les paramètres codés en dur (param_biomasse, gaz_params, caract_syngas, param_FT, param_electrolyseur,
+param_compression, facteur_emission, param_mix_2050, facteur_emission_2023) qui font réellement varier les émissions
+par MJ de e-bio-SAF, dans le sens physique comme dans le sens inverse.
+
+Chaque paramètre numérique non nul varie uniformément de +/- amplitude (10 % par défaut) autour de sa valeur nominale.
+Deux méthodes :
+    - criblage de Morris : r trajectoires "un facteur à la fois" dans l'hypercube des paramètres ; pour chaque paramètre,
+      moyenne des valeurs absolues des effets élémentaires (mu_star) et leur écart-type (sigma)
+    - indices de Sobol (schéma de Saltelli) : deux matrices A et B de N tirages et les k matrices AB_i (A dont la
+      colonne i vient de B), soit N*(k+2) évaluations ; indices du premier ordre (estimateur de Saltelli 2010) et
+      totaux (estimateur de Jansen)
+Toutes les évaluations du modèle sont faites par blocs par le moteur vectorisé de batch.py.
+
+Les paramètres sont repérés par leur chemin dans les jeux de paramètres, et nommés comme dans le code,
+par exemple gaz_params["filtres_amine"] ou caract_syngas["CO"]["fraction"].
+
+Contient :
+- parametres_numeriques : liste des chemins des paramètres numériques étudiés
+- nom_parametre : nom d'un paramètre à partir de son chemin
+- morris : criblage de Morris
+- sobol : indices de Sobol du premier ordre et totaux
+- afficher_sensibilite : affichage des indices, par ordre décroissant
+"""
+
+import numpy as np
+
+import batch
+import monte_carlo
+from etapes import _5_compression as comp
+
+
+###############################################################
+# Paramètres étudiés                                          #
+###############################################################
+
+# Clés exclues de l'analyse, qui ne sont pas des hypothèses de modélisation :
+# - nombres d'atomes (nC, nH, nO) et masses molaires (M, masseMolaireC/O/H) des composés : stœchiométrie ;
+# - constante des gaz parfaits R et conditions standards P, T du syngas (gaz_params) : constantes physiques ;
+# - pressions d'entrée des compressions (pression atmosphérique) : faire varier P1_bar du syngas (1 bar, pour une
+#   sortie à 1.12 bar) ferait passer son rapport de pression sous 1 (détente)
+cles_exclues = ("nC", "nH", "nO", "M", "masseMolaireC", "masseMolaireO", "masseMolaireH", "R", "P", "T", "P1_bar")
+
+
+def parametres_nominaux():
+    """
+    Renvoie les jeux de paramètres nominaux de l'analyse (cf. batch.parametres_defaut). La consommation stackée
+    de l'électrolyseur est recalculée à partir de son efficacité, qui est le paramètre étudié.
+    """
+    params = batch.parametres_defaut()
+    params["param_electrolyseur"] = {**params["param_electrolyseur"], "consommation_electricite_stack": None}
+    return params
+
+
+def parametres_numeriques(params=None, non_nuls=True):
+    """
+    Renvoie les chemins de tous les paramètres numériques (non nuls, par défaut) des jeux de paramètres.
+
+    Arguments
+    ----------
+        params : jeux de paramètres (cf. parametres_nominaux), par défaut les paramètres nominaux
+        non_nuls : si True, les paramètres nuls sont exclus (leur variation relative n'aurait pas d'effet)
+
+    Returns
+    -------
+        chemins : liste de tuples (jeu de paramètres, clé, sous-clé...)
+    """
+    if params is None:
+        params = parametres_nominaux()
+
+    chemins = []
+    def parcourir(dictionnaire, chemin):
+        for cle, valeur in dictionnaire.items():
+            if isinstance(valeur, dict):
+                parcourir(valeur, chemin + (cle,))
+            elif isinstance(valeur, (int, float)) and not isinstance(valeur, bool) \
+                    and (valeur != 0 or not non_nuls) and cle not in cles_exclues:
+                chemins.append(chemin + (cle,))
+    parcourir(params, ())
+    return chemins
+
+
+def nom_parametre(chemin):
+    """Renvoie le nom d'un paramètre à partir de son chemin, ex : caract_syngas["CO"]["fraction"]."""
+    return chemin[0] + "".join(f'["{cle}"]' for cle in chemin[1:])
+
+
+##############################################################
+# Évaluation du modèle
+##############################################################
+
+# Gaz de chaque flux comprimé (cf. _5_compression.conso_compression_procede)
+_gaz_compression = {"O2": ("O2",), "CO2": ("CO2",), "syngaz": ("CO2", "H2", "CO")}
+
+
+def _verifier_methode_compression(chemins, params, amplitude, methode_compression):
+    """
+    Vérifie que la méthode de compression couvre les pressions et températures initiales tirées : la méthode "table"
+    ne couvre que la grille des tables (T0, rapport de pression P2/P1 >= 1, cf. _5_compression.grille_compression).
+    """
+    if methode_compression != "table":
+        return
+    etudies = set(chemins)
+
+    def bornes(flux, cle):
+        valeur = params["param_compression"][flux][cle]
+        if ("param_compression", flux, cle) in etudies:
+            return valeur * (1 - amplitude), valeur * (1 + amplitude)
+        return valeur, valeur
+
+    for flux, gaz_flux in _gaz_compression.items():
+        (P1_min, P1_max), (P2_min, P2_max), (T0_min, T0_max) = (bornes(flux, cle) for cle in ("P1_bar", "P2_bar", "T0_K"))
+        for gaz in gaz_flux:
+            table = comp.tables_compression.get(gaz, comp.grille_compression)
+            if P2_min / P1_max < table["ratio"][0] or P2_max / P1_min > table["ratio"][-1] \
+                    or T0_min < table["T0_K"][0] or T0_max > table["T0_K"][-1]:
+                raise ValueError(f"Compression {flux} : rapports de pression ({P2_min / P1_max:.4g} - "
+                                 f"{P2_max / P1_min:.4g}) ou températures initiales ({T0_min:.4g} - {T0_max:.4g} K) "
+                                 f"tirés hors des tables de compression : utiliser methode_compression=\"iterative\" "
+                                 f"ou \"newton\", ou réduire l'amplitude")
+
+
+def _evaluer(U, chemins, params, amplitude, sens_physique, entree, humidite, grandeurs, methode_compression, taille_bloc):
+    """
+    Évalue le processus pour des points U de l'hypercube unité (n, k) : la colonne j fait varier le paramètre
+    chemins[j] entre (1 - amplitude) et (1 + amplitude) fois sa valeur nominale.
+    Renvoie {grandeur : tableau (n,)}.
+    """
+    _verifier_methode_compression(chemins, params, amplitude, methode_compression)
+    nominaux = []
+    for chemin in chemins:
+        valeur = params
+        for cle in chemin:
+            valeur = valeur[cle]
+        nominaux.append(valeur)
+    nominaux = np.asarray(nominaux, dtype=float)
+
+    sorties = {grandeur: np.empty(len(U)) for grandeur in grandeurs}
+    for debut in range(0, len(U), taille_bloc):
+        X = nominaux * (1 + amplitude * (2 * U[debut:debut + taille_bloc] - 1))
+        n = len(X)
+        params_bloc = monte_carlo.appliquer_valeurs(params, {chemin: X[:, j] for j, chemin in enumerate(chemins)})
+        if sens_physique:
+            resultats = batch.calcul_sens_physique_batch(np.full(n, float(entree)), np.full(n, float(humidite)),
+                                                         params_bloc, methode_compression)
+        else:
+            resultats = batch.calcul_sens_inverse_batch(np.full(n, float(entree)), params_bloc, methode_compression)
+        for grandeur in grandeurs:
+            sorties[grandeur][debut:debut + n] = resultats[grandeur]
+    return sorties
+
+
+##############################################################
+# Criblage de Morris
+##############################################################
+
+def morris(r=20, niveaux=4, sens_physique=False, entree=97209, humidite=0, chemins=None, params=None, amplitude=0.1,
+           graine=None, grandeurs=("emissions_MJ_produit_2023", "emissions_MJ_produit_2050"), methode_compression="iterative",
+           taille_bloc=100000):
+    """
+    Criblage de Morris : r trajectoires de k+1 points sur une grille de "niveaux" niveaux, soit r*(k+1) évaluations.
+
+    Arguments
+    ----------
+        r : nombre de trajectoires
+        niveaux : nombre de niveaux de la grille (pair)
+        sens_physique : True pour biomasse -> carburant, False (par défaut) pour carburant -> biomasse
+        entree : masse de kérosène à produire (t) en sens inverse, masse de biomasse humide (t) en sens physique
+        humidite : taux d'humidité de la biomasse d'entrée (sens physique)
+        chemins : paramètres étudiés (cf. parametres_numeriques), par défaut tous
+        params : jeux de paramètres nominaux (cf. parametres_nominaux)
+        amplitude : variation relative de chaque paramètre autour de sa valeur nominale
+        graine : graine du générateur aléatoire
+        grandeurs : grandeurs de sortie étudiées
+        methode_compression : "iterative" (par défaut), "newton" ou "table" (ValueError si les pressions et
+                              températures tirées sortent des tables de compression)
+        taille_bloc : nombre d'évaluations faites à la fois
+
+    Returns
+    -------
+        resultats : dictionnaire {grandeur : {"mu", "mu_star", "sigma" : {nom du paramètre : valeur}}},
+                    les effets élémentaires étant exprimés pour une variation de tout l'intervalle du paramètre
+    """
+    if params is None:
+        params = parametres_nominaux()
+    if chemins is None:
+        chemins = parametres_numeriques(params)
+    k = len(chemins)
+    rng = np.random.default_rng(graine)
+    delta = niveaux / (2 * (niveaux - 1))
+
+    # Construction des trajectoires : départ sur la grille, puis un facteur modifié de +/- delta à chaque pas
+    B = np.tril(np.ones((k + 1, k)), -1)
+    trajectoires, permutations, signes = [], [], []
+    for _ in range(r):
+        depart = rng.integers(0, niveaux // 2, size=k) / (niveaux - 1)
+        signe = rng.choice([-1, 1], size=k)
+        permutation = rng.permutation(k)
+        points = depart + (delta / 2) * ((2 * B - 1) * signe + 1) # chaque point vaut depart ou depart + delta
+        trajectoires.append(points[:, np.argsort(permutation)])   # le pas i modifie le facteur permutation[i]
+        permutations.append(permutation)
+        signes.append(signe)
+    U = np.concatenate(trajectoires)
+
+    sorties = _evaluer(U, chemins, params, amplitude, sens_physique, entree, humidite, grandeurs, methode_compression,
+                       taille_bloc)
+
+    resultats = {}
+    for grandeur, y in sorties.items():
+        y = y.reshape(r, k + 1)
+        effets = np.empty((r, k))
+        for t in range(r):
+            effets[t, permutations[t]] = (y[t, 1:] - y[t, :-1]) / (delta * signes[t])
+        noms = [nom_parametre(chemin) for chemin in chemins]
+        resultats[grandeur] = {
+            "mu": dict(zip(noms, effets.mean(axis=0))),
+            "mu_star": dict(zip(noms, np.abs(effets).mean(axis=0))),
+            "sigma": dict(zip(noms, effets.std(axis=0, ddof=1) if r > 1 else np.zeros(k))),
+        }
+    return resultats
+
+
+##############################################################
+# Indices de Sobol
+##############################################################
+
+def sobol(N=1024, sens_physique=False, entree=97209, humidite=0, chemins=None, params=None, amplitude=0.1,
+          graine=None, grandeurs=("emissions_MJ_produit_2023", "emissions_MJ_produit_2050"), methode_compression="iterative",
+          taille_bloc=100000):
+    """
+    Indices de Sobol du premier ordre et totaux par le schéma de Saltelli, soit N*(k+2) évaluations.
+
+    Arguments
+    ----------
+        N : nombre de tirages des matrices A et B
+        (autres arguments : cf. morris)
+
+    Returns
+    -------
+        resultats : dictionnaire {grandeur : {"S1", "ST" : {nom du paramètre : indice}, "variance" : variance}}
+    """
+    if params is None:
+        params = parametres_nominaux()
+    if chemins is None:
+        chemins = parametres_numeriques(params)
+    k = len(chemins)
+    rng = np.random.default_rng(graine)
+
+    A = rng.random((N, k))
+    B = rng.random((N, k))
+    AB = np.repeat(A[None, :, :], k, axis=0)  # AB[i] = A avec la colonne i de B
+    AB[np.arange(k), :, np.arange(k)] = B.T
+    U = np.concatenate([A, B, AB.reshape(k * N, k)])
+
+    sorties = _evaluer(U, chemins, params, amplitude, sens_physique, entree, humidite, grandeurs, methode_compression,
+                       taille_bloc)
+
+    resultats = {}
+    noms = [nom_parametre(chemin) for chemin in chemins]
+    for grandeur, y in sorties.items():
+        y_A, y_B, y_AB = y[:N], y[N:2 * N], y[2 * N:].reshape(k, N)
+        variance = np.var(np.concatenate([y_A, y_B]))
+        if variance == 0:
+            S1 = ST = np.zeros(k)
+        else:
+            S1 = np.mean(y_B * (y_AB - y_A), axis=1) / variance        # Saltelli 2010
+            ST = 0.5 * np.mean((y_A - y_AB)**2, axis=1) / variance     # Jansen 1999
+        resultats[grandeur] = {"S1": dict(zip(noms, S1)), "ST": dict(zip(noms, ST)), "variance": variance}
+    return resultats
+
+
+def afficher_sensibilite(resultats, indice="ST", nombre=15):
+    """
+    Affiche les indices de sensibilité par ordre décroissant.
+
+    Arguments
+    ----------
+        resultats : dictionnaire renvoyé par sobol ou morris
+        indice : indice servant au classement ("ST" ou "S1" pour Sobol, "mu_star" pour Morris)
+        nombre : nombre de paramètres affichés par grandeur
+    """
+    for grandeur, indices in resultats.items():
+        print(f"\n========== SENSIBILITÉ : {grandeur} (classement par {indice}) ==========")
+        classement = sorted(indices[indice], key=lambda nom: -abs(indices[indice][nom]))
+        autres = [cle for cle in indices if cle != indice and isinstance(indices[cle], dict)]
+        for nom in classement[:nombre]:
+            valeurs = " ; ".join(f"{cle} = {indices[cle][nom]:.4f}" for cle in autres)
+            print(f" - {nom:<55} {indice} = {indices[indice][nom]:.4f} ; {valeurs}")
+    print()
+
+
+if __name__ == "__main__":
+    afficher_sensibilite(morris(graine=0), "mu_star")
+    afficher_sensibilite(sobol(graine=0), "ST")
@@ -0,0 +1,165 @@
+"""
+PARTIE : Simulation pluriannuelle de l'exploitation
+
+Émissions liées à l'électricité consommée par chaque étape du processus (gazéification, Fischer-Tropsch, électrolyseur,
+compression) sur toute la durée d'exploitation de l'usine (25 ans ou plus), avec un mix électrique qui évolue dans le temps :
+- pas annuel : l'intensité carbone de chaque année est interpolée entre le mix 2023 et le mix 2050
+  (cf. _6_energie.intensite_carbone_annee) ;
+- pas horaire : un profil horaire lu dans un fichier CSV local donne, pour chaque heure de l'année, la charge de l'usine
+  (part de la consommation annuelle) et l'intensité carbone de l'électricité (directement, ou à partir des parts de
+  chaque filière du mix). L'intensité du profil, donnée pour son année de référence, suit ensuite l'évolution
+  annuelle du mix : les heures de forte consommation pèsent davantage dans les émissions de l'année.
+
+Le calcul est vectorisé sur l'axe du temps : toutes les années (et toutes les heures) sont calculées en une fois,
+pour un ou plusieurs scénarios (consommations sous forme de tableaux, par exemple issues de batch.py).
+
+Format du profil horaire (une ligne par heure, séparateur "," par défaut) :
+    heure,charge,intensite               intensité carbone en gCO2eq/kWh
+ou  heure,charge,nucleaire,eolien,...    parts de chaque filière de _6_energie.facteur_emission
+La colonne charge est optionnelle (charge constante si absente).
+
+Contient :
+- consos_par_etape : consommations électriques annuelles de chaque étape, à partir des résultats de batch.py
+- lire_profil_horaire : lecture d'un profil horaire de charge et de mix depuis un fichier CSV
+- simuler_exploitation : émissions annuelles et cumulées de chaque étape sur la durée d'exploitation
+"""
+
+import csv
+
+import numpy as np
+
+from etapes import _6_energie as energie
+
+
+# Étapes consommatrices d'électricité (colonne "conso_elec_<étape>" des résultats de batch.py)
+etapes_electriques = ("gazeification", "FT", "electrolyseur", "compression")
+
+
+def consos_par_etape(resultats):
+    """
+    Renvoie les consommations électriques annuelles (kWh/an) de chaque étape à partir des résultats d'un calcul
+    (cf. batch.calcul_sens_physique_batch et batch.calcul_sens_inverse_batch).
+
+    Arguments
+    ----------
+        resultats : dictionnaire de résultats de batch.py (un élément par scénario)
+
+    Returns
+    -------
+        consos : dictionnaire {étape : consommation électrique annuelle (kWh/an)}
+    """
+    return {etape: resultats[f"conso_elec_{etape}"] for etape in etapes_electriques}
+
+
+##############################################################
+# Profil horaire
+##############################################################
+
+def lire_profil_horaire(chemin, facteur_emission=energie.facteur_emission, separateur=","):
+    """
+    Lit un profil horaire de charge de l'usine et de mix électrique dans un fichier CSV (cf. format en tête du module).
+
+    Arguments
+    ----------
+        chemin : chemin du fichier CSV
+        facteur_emission : facteurs d'émission de chaque filière (gCO2eq/kWh), utilisés si le fichier donne les parts
+                           de chaque filière plutôt que l'intensité carbone
+        separateur : séparateur des colonnes
+
+    Returns
+    -------
+        profil : dictionnaire avec
+            - charge : part de la consommation annuelle de chaque heure (somme égale à 1)
+            - intensite : intensité carbone de l'électricité de chaque heure (gCO2eq/kWh)
+    """
+    with open(chemin, newline="", encoding="utf-8") as fichier:
+        lignes = list(csv.DictReader(fichier, delimiter=separateur))
+    if not lignes:
+        raise ValueError(f"Profil horaire vide : {chemin}")
+    colonnes = {nom: np.array([float(ligne[nom]) for ligne in lignes]) for nom in lignes[0] if nom != "heure"}
+
+    if "intensite" in colonnes:
+        intensite = colonnes["intensite"]
+    elif all(filiere in colonnes for filiere in facteur_emission):
+        intensite = sum(colonnes[filiere] * facteur_emission[filiere] for filiere in facteur_emission)
+    else:
+        raise ValueError("Le profil horaire doit contenir une colonne intensite ou une colonne par filière : "
+                         + ", ".join(facteur_emission))
+
+    charge = colonnes.get("charge", np.ones(len(lignes)))
+    if np.any(charge < 0) or charge.sum() <= 0:
+        raise ValueError("La charge du profil horaire doit être positive")
+
+    return {"charge": charge / charge.sum(), "intensite": intensite}
+
+
+##############################################################
+# Simulation
+##############################################################
+
+def simuler_exploitation(consos, annee_debut=2025, duree=30, profil=None, annee_profil=2023, detail_horaire=False,
+                         facteur_emission=energie.facteur_emission, param_mix_2050=energie.param_mix_2050,
+                         facteur_emission_2023=energie.facteur_emission_2023):
+    """
+    Simule l'exploitation de l'usine année par année (et heure par heure si un profil horaire est donné) et calcule
+    les émissions liées à l'électricité consommée par chaque étape.
+
+    Arguments
+    ----------
+        consos : dictionnaire {étape : consommation électrique annuelle (kWh/an)} (cf. consos_par_etape) ;
+                 les consommations peuvent être des tableaux (un élément par scénario)
+        annee_debut : première année d'exploitation
+        duree : durée d'exploitation (années)
+        profil : profil horaire (cf. lire_profil_horaire), optionnel ; sans profil, la consommation et l'intensité
+                 carbone sont supposées constantes sur l'année
+        annee_profil : année de référence de l'intensité carbone du profil horaire
+        detail_horaire : si True (avec un profil), renvoie aussi les émissions de chaque heure
+        facteur_emission, param_mix_2050, facteur_emission_2023 : paramètres du mix énergétique
+            (cf. _6_energie.emissions_energetique_processus), par défaut ceux du module énergie
+
+    Returns
+    -------
+        resultats : dictionnaire avec
+            - annees : tableau des années d'exploitation (duree,)
+            - intensite_annuelle : intensité carbone moyenne de l'électricité consommée chaque année (gCO2eq/kWh)
+            - emissions_annuelles : {étape : émissions de chaque année (gCO2eq)}, plus "total"
+            - emissions_cumulees : {étape : émissions cumulées depuis la mise en service (gCO2eq)}, plus "total"
+            - emissions_horaires (si detail_horaire) : {étape : émissions de chaque heure (gCO2eq)}, plus "total"
+          les tableaux d'émissions ont la forme (scénarios) + (duree,), et (scénarios) + (duree, heures) pour le détail horaire
+    """
+    if duree <= 0:
+        raise ValueError("La durée d'exploitation doit être strictement positive")
+
+    annees = np.arange(annee_debut, annee_debut + duree)
+    intensite_mix = energie.intensite_carbone_annee(annees, facteur_emission, param_mix_2050, facteur_emission_2023)
+
+    if profil is None:
+        intensite_annuelle = intensite_mix
+    else:
+        # Le profil suit l'évolution du mix : intensité(année, heure) = intensité_profil(heure) * evolution(année)
+        evolution = intensite_mix / energie.intensite_carbone_annee(annee_profil, facteur_emission, param_mix_2050,
+                                                                   facteur_emission_2023)
+        intensite_horaire_ponderee = profil["charge"] * profil["intensite"] # gCO2eq/kWh de consommation annuelle
+        intensite_annuelle = evolution * intensite_horaire_ponderee.sum()
+
+    consos = {etape: np.asarray(conso, dtype=float) for etape, conso in consos.items()}
+    consos["total"] = sum(consos.values())
+
+    # Axe du temps en dernier : (scénarios) + (duree,)
+    emissions_annuelles = {etape: conso[..., np.newaxis] * intensite_annuelle for etape, conso in consos.items()}
+
+    resultats = {
+        "annees": annees,
+        "intensite_annuelle": intensite_annuelle,
+        "emissions_annuelles": emissions_annuelles,
+        "emissions_cumulees": {etape: np.cumsum(emissions, axis=-1) for etape, emissions in emissions_annuelles.items()},
+    }
+
+    if detail_horaire:
+        if profil is None:
+            raise ValueError("Le détail horaire nécessite un profil horaire (cf. lire_profil_horaire)")
+        intensite_horaire = evolution[:, np.newaxis] * intensite_horaire_ponderee # (duree, heures)
+        resultats["emissions_horaires"] = {etape: conso[..., np.newaxis, np.newaxis] * intensite_horaire
+                                           for etape, conso in consos.items()}
+
+    return resultats
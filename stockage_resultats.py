@@ -0,0 +1,166 @@
+"""
+PARTIE : Stockage des résultats (Parquet)
+
+Enregistrement des résultats des scénarios dans une table en colonnes (une ligne par scénario : masses de CO, CO2, H2,
+O2, consommations électriques de chaque étape, émissions 2023/2050...) au format Apache Parquet, pour les relire et
+les filtrer plus tard sans relancer le modèle.
+
+Le stockage est un dossier Parquet partitionné (arborescence "colonne=valeur/", dite "hive") : chaque appel à
+ecrire_resultats ajoute de nouveaux fichiers sans réécrire les précédents, ce qui permet d'enregistrer un balayage de
+plusieurs millions de scénarios lot par lot (par exemple un shard de balayage.py ou un bloc de monte_carlo.py à la fois).
+Lors de la lecture, seules les colonnes et les partitions demandées sont lues. Les types des colonnes de
+partitionnement sont enregistrés dans le dossier (fichier _partitions.json) : sans eux, ils seraient devinés à partir
+des noms des sous-dossiers (une humidité 0.1 serait relue comme la chaîne '0.1', une année comme un entier 32 bits).
+
+Nécessite le paquet pyarrow, qui n'est pas une dépendance du projet.
+
+Contient :
+- ecrire_resultats : ajout d'un lot de résultats (dictionnaire de colonnes, cf. batch.py) au stockage
+- lire_resultats : lecture de tout ou partie du stockage (colonnes, filtres)
+"""
+
+import json
+import os
+import uuid
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError: # pyarrow n'est pas une dépendance du projet : le stockage Parquet est alors indisponible
+    pa = None
+
+
+def _verifier_pyarrow():
+    if pa is None:
+        raise ValueError("Le stockage des résultats au format Parquet nécessite le paquet pyarrow")
+
+
+def _schema_partitions(dossier, partitions=None):
+    """
+    Lit, et enregistre au premier appel, les types des colonnes de partitionnement du stockage (fichier
+    _partitions.json, ignoré par pyarrow comme tous les fichiers commençant par "_").
+
+    Arguments
+    ----------
+        dossier : dossier du stockage
+        partitions : {colonne : type pyarrow} du lot à ajouter, ou None pour une simple lecture
+
+    Returns
+    -------
+        schema : schéma pyarrow des colonnes de partitionnement, ou None pour un stockage sans ce fichier
+    """
+    chemin = os.path.join(dossier, "_partitions.json")
+    if os.path.exists(chemin):
+        with open(chemin, encoding="utf-8") as fichier:
+            types = json.load(fichier)
+    elif partitions is not None:
+        types = {nom: str(type_) for nom, type_ in partitions.items()}
+        with open(chemin + ".tmp", "w", encoding="utf-8") as fichier:
+            json.dump(types, fichier)
+        os.replace(chemin + ".tmp", chemin)
+    else:
+        return None
+
+    if partitions is not None and types != {nom: str(type_) for nom, type_ in partitions.items()}:
+        raise ValueError(f"Colonnes de partitionnement différentes de celles du stockage {dossier} : "
+                         f"{', '.join(f'{nom} ({type_})' for nom, type_ in types.items()) or 'aucune'}")
+    return pa.schema([(nom, pa.type_for_alias(type_)) for nom, type_ in types.items()])
+
+
+##############################################################
+# Écriture
+##############################################################
+
+def ecrire_resultats(resultats, dossier, partitions=(), lignes_par_fichier=1000000):
+    """
+    Ajoute un lot de résultats au stockage Parquet du dossier (créé si besoin), sans modifier les lots déjà enregistrés.
+
+    Arguments
+    ----------
+        resultats : dictionnaire {colonne : tableau (n,)} (cf. batch.py, balayage.py) ; les valeurs scalaires (nombres,
+                    chaînes, booléens) sont répétées sur les n lignes, par exemple pour repérer le lot ou le scénario
+                    ("annee_mix": 2030), et les valeurs qui ne sont pas des colonnes (dictionnaires) sont ignorées
+        dossier : dossier du stockage
+        partitions : colonnes de partitionnement (un sous-dossier "colonne=valeur" par valeur), ex : ("annee_mix",)
+        lignes_par_fichier : nombre maximal de lignes par fichier Parquet
+
+    Returns
+    -------
+        n : nombre de lignes ajoutées
+    """
+    _verifier_pyarrow()
+
+    colonnes = {nom: np.asarray(valeur) for nom, valeur in resultats.items() if not isinstance(valeur, dict)}
+    longueurs = {len(valeur) for valeur in colonnes.values() if valeur.ndim == 1}
+    if len(longueurs) > 1 or any(valeur.ndim > 1 for valeur in colonnes.values()):
+        raise ValueError("Les colonnes de résultats doivent être des tableaux à une dimension de même longueur")
+    n = longueurs.pop() if longueurs else 1
+    colonnes = {nom: np.broadcast_to(valeur, n) if valeur.ndim == 0 else valeur for nom, valeur in colonnes.items()}
+    for nom in partitions:
+        if nom not in colonnes:
+            raise ValueError(f"Colonne de partitionnement absente des résultats : {nom}")
+    os.makedirs(dossier, exist_ok=True)
+    _schema_partitions(dossier, {nom: pa.array(colonnes[nom][:1]).type for nom in partitions})
+
+    # Un groupe de lignes par combinaison de valeurs des colonnes de partitionnement (codage par hachage, plus rapide
+    # qu'un tri des valeurs ; le tri stable de codes entiers courts est un tri par base)
+    if partitions:
+        codes = np.zeros(n, dtype=np.int64)
+        for nom in partitions:
+            encodage = pa.array(colonnes[nom]).dictionary_encode()
+            codes = codes * len(encodage.dictionary) + encodage.indices.to_numpy()
+        codes = np.unique(codes, return_inverse=True)[1].reshape(-1) if codes.max() >= 2**15 else codes.astype(np.int16)
+        ordre = np.argsort(codes, kind="stable")
+        debuts = np.flatnonzero(np.diff(codes[ordre], prepend=-1))
+        lignes_groupes = [slice(None)] if len(debuts) == 1 else np.split(ordre, debuts[1:])
+    else:
+        lignes_groupes = [slice(None)]
+
+    identifiant = uuid.uuid4().hex # nom de fichier unique : le lot est ajouté sans écraser les précédents
+    for lignes in lignes_groupes:
+        sous_dossier = dossier
+        for nom in partitions:
+            sous_dossier = os.path.join(sous_dossier, f"{nom}={colonnes[nom][lignes][0].item()}")
+        os.makedirs(sous_dossier, exist_ok=True)
+        table = pa.table({nom: valeur[lignes] for nom, valeur in colonnes.items() if nom not in partitions})
+        # Pas d'encodage par dictionnaire des colonnes de réels : presque toutes leurs valeurs sont distinctes, et
+        # l'encodage multiplie par deux le temps d'écriture
+        dictionnaire = [champ.name for champ in table.schema if not pa.types.is_floating(champ.type)]
+        for i, debut in enumerate(range(0, table.num_rows, lignes_par_fichier)):
+            chemin = os.path.join(sous_dossier, f"lot-{identifiant}-{i}.parquet")
+            pq.write_table(table.slice(debut, lignes_par_fichier), chemin + ".tmp", use_dictionary=dictionnaire)
+            os.replace(chemin + ".tmp", chemin) # écriture atomique : un fichier présent est un fichier complet
+    return n
+
+
+##############################################################
+# Lecture
+##############################################################
+
+def lire_resultats(dossier, colonnes=None, filtres=None):
+    """
+    Lit les résultats enregistrés dans le stockage Parquet du dossier.
+
+    Arguments
+    ----------
+        dossier : dossier du stockage
+        colonnes : liste des colonnes à lire, par défaut toutes
+        filtres : liste de conditions (colonne, opérateur, valeur), toutes vérifiées, avec les opérateurs
+                  "==", "!=", "<", "<=", ">", ">=", "in", "not in" ; ex : [("annee_mix", "==", 2050), ("humidite", "<", 0.3)]
+                  Les conditions sur les colonnes de partitionnement ne lisent que les sous-dossiers concernés.
+
+    Returns
+    -------
+        resultats : dictionnaire {colonne : tableau NumPy}, une ligne par scénario
+    """
+    _verifier_pyarrow()
+
+    schema = _schema_partitions(dossier)
+    partitionnement = "hive" if schema is None else ds.partitioning(schema, flavor="hive")
+    jeu = ds.dataset(dossier, format="parquet", partitioning=partitionnement)
+    filtre = pq.filters_to_expression(filtres) if filtres else None
+    table = jeu.to_table(columns=colonnes, filter=filtre)
+    return {nom: table.column(nom).to_numpy() for nom in table.column_names}
@@ -0,0 +1,9 @@
+"""
+Configuration des tests : les modules du projet (batch.py, main.py, etapes/...) sont importés depuis la racine du
+dépôt, quel que soit le dossier d'où pytest est lancé.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,56 @@
+"""
+Tests du balayage parallèle : résultats identiques quels que soient le nombre de processus et les reprises.
+"""
+
+import numpy as np
+import pytest
+
+import balayage
+import monte_carlo
+
+grille = {
+    "masse": np.array([100000, 400000, 900000]),
+    "humidite": np.array([0, 0.4]),
+    "electrolyseur": ["alcalin", "PEM"],
+    "P2_bar": np.array([10, 30]),
+    "annee_mix": np.array([2023, 2050]),
+}
+arguments = {"taille_shard": 7, "graine": 1, "distributions": monte_carlo.distributions_defaut}
+
+
+def _egaux(a, b):
+    assert a.keys() == b.keys()
+    for cle in a:
+        if cle != "valeurs_grille":
+            np.testing.assert_array_equal(a[cle], b[cle], err_msg=cle)
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return balayage.balayage(grille, n_processus=1, **arguments)
+
+
+def test_tous_les_scenarios(reference):
+    n = balayage.taille_grille(grille)
+    assert n == 48
+    np.testing.assert_array_equal(reference["indice"], np.arange(n))
+
+
+def test_independant_du_nombre_de_processus(reference):
+    _egaux(balayage.balayage(grille, n_processus=2, **arguments), reference)
+
+
+def test_reprise(reference, tmp_path):
+    dossier = str(tmp_path)
+    balayage.balayage(grille, n_processus=1, dossier=dossier, **arguments)
+    # balayage interrompu : une partie des shards manque
+    for numero_shard in (1, 4, 6):
+        (tmp_path / f"shard_{numero_shard:06d}.npz").unlink()
+    _egaux(balayage.balayage(grille, n_processus=2, dossier=dossier, **arguments), reference)
+
+
+def test_dossier_d_un_autre_balayage(tmp_path):
+    dossier = str(tmp_path)
+    balayage.balayage(grille, n_processus=1, dossier=dossier, **arguments)
+    with pytest.raises(ValueError):
+        balayage.balayage(grille, n_processus=1, dossier=dossier, **{**arguments, "graine": 2})
@@ -0,0 +1,93 @@
+"""
+Tests du moteur vectorisé (batch.py) : mêmes résultats que le calcul scalaire de main.py, scénario par scénario.
+"""
+
+import numpy as np
+import pytest
+
+import batch
+import main
+from etapes import _3_FT as ft
+
+
+def _comparer(resultats_batch, attendus, indice=0):
+    for grandeur, attendu in attendus.items():
+        assert np.ravel(resultats_batch[grandeur])[indice] == pytest.approx(attendu, rel=1e-9), grandeur
+
+
+def _attendus_physique(resultats):
+    gazeification = resultats["gazeification"]
+    return {
+        "masse_seche_biomasse": resultats["biomasse"]["masse_seche_biomasse"],
+        "conso_chaleur_biomasse": resultats["biomasse"]["conso_chaleur"],
+        "emissions_biomasse": resultats["biomasse"]["emissions_totales"],
+        "masse_CO": gazeification["masseCO_sortie"],
+        "masse_CO2": gazeification["masseCO2_sortie"],
+        "besoin_H2": gazeification["masseH2_necessaire"],
+        "besoin_O2": gazeification["masseO2_necessaire"],
+        "masse_dechets": gazeification["masse_dechets"],
+        "masse_kerosene": resultats["FT"]["masse_kerosene_produite"],
+        "conso_elec_gazeification": resultats["conso_elec_gazeification"],
+        "conso_elec_FT": resultats["FT"]["consommation_totale_FT"],
+        "conso_elec_electrolyseur": resultats["conso_elec_electrolyseur"],
+        "conso_elec_compression": resultats["conso_elec_compression"],
+        "conso_elec_totale": resultats["total_conso_energie"],
+        "emissions_2050": resultats["total_emissions_2050"],
+        "emissions_2023": resultats["total_emissions_2023"],
+    }
+
+
+def _attendus_inverse(resultats):
+    gazeification = resultats["gazeification"]
+    return {
+        "masse_seche_biomasse": gazeification["biomasse_entree"],
+        "conso_chaleur_biomasse": resultats["biomasse"]["conso_chaleur"],
+        "emissions_biomasse": resultats["biomasse"]["emissions_totales"],
+        "masse_CO": resultats["FT"]["CO_necessaire"],
+        "masse_CO2": gazeification["masseCO2_sortie"],
+        "besoin_H2": gazeification["masseH2_necessaire"],
+        "besoin_O2": gazeification["masseO2_necessaire"],
+        "masse_dechets": gazeification["masse_dechets"],
+        "conso_elec_gazeification": resultats["conso_elec_gazeification"],
+        "conso_elec_FT": resultats["FT"]["consommation_totale_FT"],
+        "conso_elec_electrolyseur": resultats["conso_elec_electrolyseur"],
+        "conso_elec_compression": resultats["conso_elec_compression"],
+        "conso_elec_totale": resultats["total_conso_energie"],
+        "emissions_2050": resultats["total_emissions_2050"],
+        "emissions_2023": resultats["total_emissions_2023"],
+    }
+
+
+def test_sens_physique_entree_de_main():
+    """Les deux biomasses d'entrée de main.py, en un scénario à deux colonnes."""
+    masses = np.array([[b["masse"] for b in main.biomasse_entree]], dtype=float)
+    humidites = np.array([[b["humidité"] for b in main.biomasse_entree]])
+    resultats = batch.calcul_sens_physique_batch(masses, humidites)
+    _comparer(resultats, _attendus_physique(main.calcul_sens_physique(main.biomasse_entree)))
+
+
+def test_sens_physique_scenario_par_scenario():
+    masses = np.array([50000, 300000, 1200000], dtype=float)
+    humidites = np.array([0, 0.25, 0.5])
+    resultats = batch.calcul_sens_physique_batch(masses, humidites)
+    for i, (masse, humidite) in enumerate(zip(masses, humidites)):
+        attendus = main.calcul_sens_physique([{"type": "bois_vert", "masse": masse, "humidité": humidite}])
+        _comparer(resultats, _attendus_physique(attendus), i)
+
+
+def test_sens_inverse_scenario_par_scenario():
+    kerosene = np.array([1000, main.kerosene_produit, 500000], dtype=float)
+    resultats = batch.calcul_sens_inverse_batch(kerosene)
+    for i, masse in enumerate(kerosene):
+        _comparer(resultats, _attendus_inverse(main.calcul_sens_inverse(masse)), i)
+        assert resultats["masse_kerosene"][i] == masse
+
+
+def test_emissions_par_MJ_rapportees_au_kerosene_du_scenario():
+    """main.py rapporte les émissions à la production nominale, batch.py au kérosène de chaque scénario."""
+    resultats = batch.calcul_sens_inverse_batch(np.array([main.kerosene_produit], dtype=float))
+    attendus = main.calcul_sens_inverse(main.kerosene_produit)
+    rapport = ft.param_FT["production_BioTJet"] / main.kerosene_produit
+    for annee in ("2050", "2023"):
+        assert resultats[f"emissions_MJ_produit_{annee}"][0] == pytest.approx(attendus[f"emissions_MJ_{annee}"] * rapport,
+                                                                             rel=1e-9)
@@ -0,0 +1,64 @@
+"""
+Tests du cache des étapes : un résultat relu dans le cache est identique à un calcul complet, et ne peut pas être
+modifié par l'appelant.
+"""
+
+import numpy as np
+import pytest
+
+import batch
+import cache_etapes
+
+masses = np.array([100000, 300000, 900000], dtype=float)
+humidites = np.array([0, 0.3, 0.5])
+
+
+def _egaux(a, b):
+    assert a.keys() == b.keys()
+    for cle in a:
+        np.testing.assert_array_equal(a[cle], b[cle], err_msg=cle)
+
+
+def test_succes_egal_calcul_complet():
+    cache = cache_etapes.creer_cache()
+    attendus = batch.calcul_sens_physique_batch(masses, humidites)
+    premier = batch.calcul_sens_physique_batch(masses, humidites, cache=cache)
+    calculs = cache["calculs"]
+    second = batch.calcul_sens_physique_batch(masses, humidites, cache=cache)
+    assert cache["calculs"] == calculs and cache["succes_memoire"] >= calculs
+    _egaux(premier, attendus)
+    _egaux(second, attendus)
+
+
+def test_succes_disque(tmp_path):
+    attendus = batch.calcul_sens_inverse_batch(masses / 3)
+    batch.calcul_sens_inverse_batch(masses / 3, cache=cache_etapes.creer_cache(dossier=tmp_path))
+    cache = cache_etapes.creer_cache(dossier=tmp_path) # nouveau cache, même dossier : tout est relu sur le disque
+    relus = batch.calcul_sens_inverse_batch(masses / 3, cache=cache)
+    assert cache["calculs"] == 0 and cache["succes_disque"] > 0
+    _egaux(relus, attendus)
+
+
+def test_resultats_en_lecture_seule():
+    cache = cache_etapes.creer_cache()
+    premier = batch.calcul_sens_physique_batch(masses, humidites, cache=cache)
+    with pytest.raises(ValueError):
+        premier["masse_CO"][0] = 0
+    second = batch.calcul_sens_physique_batch(masses, humidites, cache=cache)
+    _egaux(second, batch.calcul_sens_physique_batch(masses, humidites))
+    # les entrées de l'appelant restent modifiables
+    masses_appelant = masses.copy()
+    batch.calcul_sens_physique_batch(masses_appelant, humidites, cache=cache)
+    masses_appelant[0] = 1
+
+
+def test_parametre_aval_seul_modifie():
+    """Seuls les facteurs d'émission changent : les étapes du procédé sont toutes relues dans le cache."""
+    cache = cache_etapes.creer_cache()
+    batch.calcul_sens_physique_batch(masses, humidites, cache=cache)
+    calculs = cache["calculs"]
+    params = batch.parametres_defaut()
+    params["facteur_emission"] = {cle: 2 * valeur for cle, valeur in params["facteur_emission"].items()}
+    resultats = batch.calcul_sens_physique_batch(masses, humidites, params=params, cache=cache)
+    assert cache["calculs"] == calculs
+    _egaux(resultats, batch.calcul_sens_physique_batch(masses, humidites, params=params))
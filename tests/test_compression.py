@@ -0,0 +1,56 @@
+"""
+Tests des méthodes de compression isentropique : la méthode de Newton et les tables précalculées donnent les mêmes
+températures que l'itération de point fixe historique.
+"""
+
+import numpy as np
+import pytest
+
+from etapes import _5_compression as comp
+
+gaz_testes = ("O2", "CO2", "H2", "CO")
+
+
+@pytest.mark.parametrize("gaz", gaz_testes)
+def test_newton_egal_point_fixe_en_compression(gaz):
+    T0_K = np.linspace(250, 400, 7)[:, None]
+    P2_bar = np.geomspace(1.01, 100, 9)[None, :]
+    point_fixe = comp.compression_isentropique(gaz, 1, P2_bar, T0_K, methode="iterative", tol=1e-10)
+    newton = comp.compression_isentropique(gaz, 1, P2_bar, T0_K, methode="newton", tol=1e-10)
+    np.testing.assert_allclose(newton, point_fixe, rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize("gaz", gaz_testes)
+def test_newton_egal_point_fixe_en_detente(gaz):
+    T0_K = np.linspace(250, 400, 7)[:, None]
+    P2_bar = np.geomspace(0.05, 0.99, 9)[None, :]
+    point_fixe = comp.compression_isentropique(gaz, 1, P2_bar, T0_K, methode="iterative", tol=1e-10)
+    newton = comp.compression_isentropique(gaz, 1, P2_bar, T0_K, methode="newton", tol=1e-10)
+    np.testing.assert_allclose(newton, point_fixe, rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize("gaz", gaz_testes)
+def test_table_dans_l_erreur_annoncee(gaz):
+    """Requêtes aléatoires sur toute la grille : erreur inférieure à erreur_max_T1_K de la table."""
+    rng = np.random.default_rng(0)
+    grille = comp.grille_compression
+    T0_K = rng.uniform(grille["T0_K"][0], grille["T0_K"][-1], 20000)
+    ratio = np.exp(rng.uniform(0, np.log(grille["ratio"][-1]), 20000))
+    table = comp.compression_isentropique_table(gaz, 1, ratio, T0_K)
+    point_fixe = comp.compression_isentropique(gaz, 1, ratio, T0_K)
+    assert np.max(np.abs(table - point_fixe)) <= comp._table(gaz)["erreur_max_T1_K"]
+
+
+def test_conso_procede_identique_selon_la_methode():
+    masses = (np.array([283741.6, 1000.0]), np.array([39982.4, 50.0]), np.array([89829.3, 300.0]),
+              np.array([196936.9, 700.0]))
+    point_fixe = comp.conso_compression_procede(*masses, comp.param_compression, methode="iterative")
+    # Écart du point fixe (tol = 0.01 K) pour Newton, erreur bornée des tables (< 0.1 K sur T1) pour les tables
+    for methode, tolerance in (("newton", 1e-4), ("table", 1e-3)):
+        np.testing.assert_allclose(comp.conso_compression_procede(*masses, comp.param_compression, methode=methode),
+                                   point_fixe, rtol=tolerance)
+
+
+def test_methode_inconnue():
+    with pytest.raises(ValueError):
+        comp.conso_compression_procede(1.0, 1.0, 1.0, 1.0, comp.param_compression, methode="secante")
@@ -0,0 +1,59 @@
+"""
+Tests des calculs vectorisés de la forêt (cube, trajectoire, inversion) : mêmes valeurs que impact_total_sequestration
+évalué point par point.
+"""
+
+import numpy as np
+import pytest
+
+import foret
+
+betas = np.array([0.5, 1, 1.7, 3])
+généralisations = np.array([0, 10, 55, 100])
+années = np.array([2005, 2020, 2037, 2050, 2100])
+
+
+def _attendus():
+    return np.array([[[foret.impact_total_sequestration(année, beta, généralisation)[0] for année in années]
+                      for généralisation in généralisations] for beta in betas])
+
+
+def test_cube_egal_calcul_point_par_point():
+    cube = foret.cube_sequestration(betas, généralisations, années, taille_bloc=3) # dernier bloc incomplet
+    assert cube["dimensions"] == ("beta", "généralisation", "année")
+    np.testing.assert_allclose(cube["valeurs"], _attendus(), rtol=1e-12, atol=1e-12)
+
+
+def test_cube_sur_disque(tmp_path):
+    fichier = str(tmp_path / "cube.npy")
+    foret.cube_sequestration(betas, généralisations, années, fichier=fichier)
+    cube = foret.charger_cube(fichier)
+    np.testing.assert_allclose(cube["valeurs"], _attendus(), rtol=1e-12, atol=1e-12)
+    np.testing.assert_array_equal(cube["coordonnées"]["année"], années)
+
+
+def test_trajectoire_egale_calcul_point_par_point():
+    trajectoire = foret.trajectoire_sequestration(betas[:, np.newaxis], généralisations[np.newaxis, :], 2005, 2100, 5)
+    for i, beta in enumerate(betas):
+        for j, généralisation in enumerate(généralisations):
+            for k, année in enumerate(trajectoire["années"]):
+                variation, besoin = foret.impact_total_sequestration(année, beta, généralisation)
+                assert trajectoire["variation_sequestration_carbone"][i, j, k] == pytest.approx(variation, rel=1e-12)
+                assert trajectoire["besoin_masse_bois_supplémentaire"][i, j] == pytest.approx(besoin, rel=1e-12)
+
+
+def test_generalisation_max_atteint_la_cible():
+    sans_généralisation = foret.impact_total_sequestration(2050, 1.5, 0)[0]
+    avec_généralisation = foret.impact_total_sequestration(2050, 1.5, 100)[0]
+    cible = (sans_généralisation + avec_généralisation) / 2
+    résultats = foret.généralisation_max(cible, 2050, 1.5)
+    assert résultats["atteignable"]
+    assert foret.impact_total_sequestration(2050, 1.5, résultats["généralisation_max"])[0] == pytest.approx(cible)
+
+
+def test_generalisation_max_cible_hors_d_atteinte():
+    sans_généralisation = foret.impact_total_sequestration(2050, 1.5, 0)[0]
+    résultats = foret.généralisation_max(sans_généralisation + 1, 2050, 1.5)
+    assert not résultats["atteignable"] and np.isnan(résultats["généralisation_max"])
+    # cible très basse : bornée à la généralisation limite
+    assert foret.généralisation_max(sans_généralisation - 1e6, 2050, 1.5)["généralisation_max"] == 100
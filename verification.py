@@ -0,0 +1,302 @@
+"""
+PARTIE : Vérification de cohérence entre le sens inverse et le sens physique
+
+Le sens inverse (Inv_Fischer_Tropsch, Inv_gazeificationV1, bilan_biomasse en sens inverse) et le sens physique
+(bilan_biomasse, gazeificationV2, Fischer_Tropsch) sont des chemins de calcul indépendants, et le sens inverse suppose
+une biomasse de type bois vert à 25 % d'humidité. Avant d'utiliser le sens inverse pour de grands calculs de
+planification, on vérifie l'aller-retour : la biomasse humide trouvée par le sens inverse pour une masse de kérosène
+visée est redonnée au sens physique, qui devrait retrouver le kérosène visé, ainsi que le CO, l'H2 et l'O2 du sens
+inverse. L'écart relatif (physique - inverse) / inverse de chaque grandeur est la dérive de l'aller-retour.
+
+La vérification est faite sur de grands lots de scénarios (moteur vectorisé de batch.py, par blocs) : masses de
+kérosène tirées sur plusieurs ordres de grandeur, paramètres tirés selon les lois d'incertitude de monte_carlo, et
+humidité réelle de la biomasse optionnellement tirée (pour mesurer l'effet de l'hypothèse de 25 %). Les régions de
+l'espace des paramètres où les deux sens divergent sont repérées par classes de valeurs de chaque paramètre ; un
+paramètre n'est retenu comme influent que si l'écart entre ses classes dépasse celui obtenu par hasard (dérives
+permutées), une fois retiré l'effet des paramètres plus influents.
+
+Contient :
+- grandeurs_verifiees : grandeurs comparées entre les deux sens
+- aller_retour : dérives de l'aller-retour inverse -> physique pour un lot de masses de kérosène visées
+- verifier : vérification par blocs sur des scénarios tirés (masses visées, paramètres, humidité)
+- regions_divergence : dérives par classes de valeurs de chaque paramètre, paramètres classés par influence
+- afficher_verification : affichage console des dérives et des régions de divergence
+"""
+
+import numpy as np
+
+import batch
+import monte_carlo
+import sensibilite
+
+
+grandeurs_verifiees = ("masse_kerosene", "masse_seche_biomasse", "masse_CO", "besoin_H2", "besoin_O2")
+
+
+##############################################################
+# Aller-retour
+##############################################################
+
+def aller_retour(kerosene_produit, params=None, humidite=0.25, methode_compression="table"):
+    """
+    Calcule l'aller-retour inverse -> physique pour un lot de masses de kérosène visées.
+
+    Arguments
+    ----------
+        kerosene_produit : masses de e-bio-SAF visées (t), tableau de forme quelconque
+        params : jeux de paramètres (cf. batch.parametres_defaut), éventuellement des tableaux (un élément par scénario)
+        humidite : humidité réelle de la biomasse donnée au sens physique (nombre ou tableau) ; la masse humide est
+                   celle du sens inverse (25 % d'humidité), une autre valeur mesure donc l'effet de cette hypothèse
+        methode_compression : "table" (par défaut), "iterative" ou "newton"
+
+    Returns
+    -------
+        resultats : dictionnaire avec
+            - inverse, physique : colonnes de résultats de batch.py de chaque sens
+            - derives : {grandeur : dérive relative (physique - inverse) / inverse}, pour grandeurs_verifiees
+    """
+    kerosene_produit = np.asarray(kerosene_produit, dtype=float)
+    inverse = batch.calcul_sens_inverse_batch(kerosene_produit, params, methode_compression)
+    forme = np.shape(inverse["masse_humide_biomasse"])
+    physique = batch.calcul_sens_physique_batch(np.ravel(inverse["masse_humide_biomasse"]),
+                                                np.ravel(np.broadcast_to(humidite, forme)), params, methode_compression)
+    physique = {grandeur: np.reshape(valeur, forme) for grandeur, valeur in physique.items()}
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        derives = {grandeur: (physique[grandeur] - inverse[grandeur]) / inverse[grandeur]
+                   for grandeur in grandeurs_verifiees}
+    return {"inverse": inverse, "physique": physique, "derives": derives}
+
+
+##############################################################
+# Vérification à grande échelle
+##############################################################
+
+def verifier(n_scenarios=100000, kerosene=(1e3, 1e6), distributions=None, humidite=None, params=None,
+             taille_bloc=100000, graine=None, methode_compression="table"):
+    """
+    Vérifie l'aller-retour inverse -> physique sur des scénarios tirés, par blocs (mémoire des calculs bornée par
+    taille_bloc ; les dérives et les valeurs tirées de chaque scénario sont conservées).
+
+    Arguments
+    ----------
+        n_scenarios : nombre de scénarios
+        kerosene : (minimum, maximum) des masses de kérosène visées (t), tirées uniformément en échelle logarithmique
+        distributions : lois des paramètres tirés (cf. monte_carlo.distributions_defaut) ; {} pour les paramètres
+                        nominaux seuls ; par défaut monte_carlo.distributions_defaut
+        humidite : None (par défaut) pour une biomasse réelle à 25 % d'humidité, comme le suppose le sens inverse,
+                   ou (minimum, maximum) pour tirer l'humidité réelle de chaque scénario
+        params : jeux de paramètres nominaux (cf. batch.parametres_defaut)
+        taille_bloc : nombre de scénarios évalués à la fois
+        graine : graine du générateur aléatoire
+        methode_compression : "table" (par défaut), "iterative" ou "newton"
+
+    Returns
+    -------
+        verification : dictionnaire avec
+            - derives : {grandeur : tableau (n_scenarios,) des dérives relatives}
+            - valeurs : {nom du paramètre : tableau (n_scenarios,) des valeurs tirées}, avec "kerosene" (masse visée)
+              et "humidite" si elle est tirée
+            - statistiques : {grandeur : {"max", "moyenne", "p99"}} des dérives en valeur absolue
+    """
+    if n_scenarios <= 0 or taille_bloc <= 0:
+        raise ValueError("Le nombre de scénarios et la taille des blocs doivent être strictement positifs")
+    if distributions is None:
+        distributions = monte_carlo.distributions_defaut
+    if params is None:
+        params = batch.parametres_defaut()
+
+    rng = np.random.default_rng(graine)
+    noms = {chemin: sensibilite.nom_parametre(chemin) for chemin in distributions}
+    derives = {grandeur: np.empty(n_scenarios) for grandeur in grandeurs_verifiees}
+    valeurs = {nom: np.empty(n_scenarios) for nom in ["kerosene", *noms.values()]
+               + (["humidite"] if humidite is not None else [])}
+
+    for debut in range(0, n_scenarios, taille_bloc):
+        n = min(taille_bloc, n_scenarios - debut)
+        bloc = slice(debut, debut + n)
+        params_bloc = monte_carlo.parametres_tires(rng, n, distributions, params) if distributions else params
+        valeurs["kerosene"][bloc] = np.exp(rng.uniform(np.log(kerosene[0]), np.log(kerosene[1]), n))
+        humidites = 0.25
+        if humidite is not None:
+            humidites = valeurs["humidite"][bloc] = rng.uniform(humidite[0], humidite[1], n)
+
+        resultats = aller_retour(valeurs["kerosene"][bloc], params_bloc, humidites, methode_compression)
+        for grandeur, derive in resultats["derives"].items():
+            derives[grandeur][bloc] = derive
+        for chemin, nom in noms.items():
+            valeurs[nom][bloc] = _valeur(params_bloc, chemin) # valeur utilisée (mix 2050 renormalisé)
+
+    return {
+        "derives": derives,
+        "valeurs": valeurs,
+        "statistiques": {grandeur: {"max": float(np.max(np.abs(derive))), "moyenne": float(np.mean(np.abs(derive))),
+                                    "p99": float(np.percentile(np.abs(derive), 99))}
+                         for grandeur, derive in derives.items()},
+    }
+
+
+def _valeur(params, chemin):
+    """Valeur d'un paramètre repéré par son chemin dans les jeux de paramètres."""
+    valeur = params
+    for cle in chemin:
+        valeur = valeur[cle]
+    return valeur
+
+
+##############################################################
+# Régions de divergence
+##############################################################
+
+def _moyennes_classes(classes, ecart, effectifs):
+    """Moyenne de ecart dans chaque classe (NaN pour une classe vide)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.bincount(classes, ecart, len(effectifs)) / effectifs
+
+
+def _etendue(moyennes):
+    """Écart entre la plus forte et la plus faible moyenne des classes."""
+    return float(np.nanmax(moyennes) - np.nanmin(moyennes))
+
+
+def _effet(valeurs, classes, ecart, effectifs):
+    """
+    Effet d'un paramètre sur ecart, centré : moyennes des classes, interpolées linéairement entre les valeurs
+    moyennes du paramètre dans chaque classe (l'effet varie aussi à l'intérieur des classes).
+    """
+    occupees = effectifs > 0
+    centres = (np.bincount(classes, valeurs, len(effectifs))[occupees] / effectifs[occupees])
+    moyennes = _moyennes_classes(classes, ecart, effectifs)[occupees]
+    effet = np.interp(valeurs, centres, moyennes) if len(centres) > 1 else np.full(len(valeurs), moyennes[0])
+    return effet - np.mean(effet)
+
+
+def _bruit(rng, ecart, effectifs, n_permutations, niveau, scenarios_bruit):
+    """
+    Centile niveau de l'écart entre moyennes extrêmes des classes lorsque les scénarios sont répartis au hasard
+    dans des classes de mêmes effectifs (dérives permutées entre les scénarios). Au-delà de scenarios_bruit
+    scénarios, le bruit est estimé sur un sous-échantillon aux effectifs réduits en proportion, puis ramené aux
+    effectifs complets (écart-type des moyennes des classes en 1 / racine de l'effectif).
+    """
+    facteur = 1.0
+    if len(ecart) > scenarios_bruit:
+        effectifs_reduits = effectifs * scenarios_bruit // len(ecart)
+        facteur = np.sqrt(effectifs_reduits.sum() / effectifs.sum())
+        ecart = rng.choice(ecart, effectifs_reduits.sum(), replace=False)
+        effectifs = effectifs_reduits
+    classes = np.repeat(np.arange(len(effectifs)), effectifs)
+    etendues = [_etendue(_moyennes_classes(rng.permutation(classes), ecart, effectifs)) for _ in range(n_permutations)]
+    return facteur * float(np.quantile(etendues, niveau))
+
+
+def regions_divergence(verification, seuil=0.01, n_classes=10, n_permutations=50, niveau=0.95, graine=0,
+                       scenarios_bruit=100000):
+    """
+    Repère les régions de l'espace des paramètres où les deux sens divergent : pour chaque grandeur et chaque
+    paramètre tiré, les scénarios sont répartis en classes de valeurs du paramètre (quantiles), et on calcule dans
+    chaque classe la dérive moyenne et maximale (en valeur absolue) et la part des scénarios dont la dérive dépasse
+    le seuil.
+
+    L'écart entre la plus forte et la plus faible dérive moyenne des classes d'un paramètre n'est pas nul même pour
+    un paramètre sans effet : fluctuations d'échantillonnage, d'autant plus fortes que les classes sont petites, et
+    corrélation fortuite de ses tirages avec ceux d'un paramètre influent. Les paramètres influents sont donc retenus
+    pas à pas : à chaque pas, l'écart de chaque paramètre restant est comparé au bruit, le même écart pour des
+    dérives permutées entre les scénarios (n_permutations permutations, centile 1 - (1 - niveau) / k pour k
+    paramètres, correction de Bonferroni) ; le paramètre de plus fort dépassement est retenu, avec ce dépassement
+    pour influence, et l'effet de ses classes est retiré des dérives avant le pas suivant. La sélection s'arrête
+    lorsqu'aucun paramètre ne dépasse le bruit : les paramètres restants ont une influence nulle.
+
+    Arguments
+    ----------
+        verification : dictionnaire renvoyé par verifier
+        seuil : dérive relative tolérée (0.01 : 1 %)
+        n_classes : nombre de classes de valeurs par paramètre
+        n_permutations : nombre de permutations des dérives pour estimer le bruit
+        niveau : niveau de confiance de l'ensemble des paramètres (0.95 : 95 %), cf. correction de Bonferroni
+        graine : graine du générateur aléatoire des permutations
+        scenarios_bruit : nombre maximal de scénarios permutés pour estimer le bruit (cf. _bruit)
+
+    Returns
+    -------
+        regions : {grandeur : {"part_divergente" : part des scénarios au-delà du seuil,
+                               "parametres" : {nom : {"bornes", "derive_moyenne", "derive_max", "part_divergente",
+                                                      "ecart_classes", "bruit", "influence"}}}},
+                  les paramètres étant rangés par influence décroissante et les tableaux ayant un élément par classe
+                  ("bornes" : n_classes + 1 bornes des classes ; "ecart_classes" : écart entre les dérives moyennes
+                  extrêmes des classes ; "bruit" : bruit du dernier pas où le paramètre a été comparé)
+    """
+    rng = np.random.default_rng(graine)
+    niveau_parametre = 1 - (1 - niveau) / len(verification["valeurs"])
+    regions = {}
+    for grandeur, derive in verification["derives"].items():
+        ecart = np.abs(derive)
+        divergent = ecart > seuil
+        parametres, classes, effectifs = {}, {}, {}
+        for nom, valeurs in verification["valeurs"].items():
+            bornes = np.quantile(valeurs, np.linspace(0, 1, n_classes + 1))
+            classes[nom] = np.clip(np.searchsorted(bornes, valeurs, side="right") - 1, 0, n_classes - 1)
+            effectifs[nom] = np.bincount(classes[nom], minlength=n_classes)
+            derive_moyenne = _moyennes_classes(classes[nom], ecart, effectifs[nom])
+            part_divergente = _moyennes_classes(classes[nom], divergent, effectifs[nom])
+            derive_max = np.zeros(n_classes)
+            np.maximum.at(derive_max, classes[nom], ecart)
+            parametres[nom] = {"bornes": bornes, "derive_moyenne": derive_moyenne, "derive_max": derive_max,
+                               "part_divergente": part_divergente, "ecart_classes": _etendue(derive_moyenne),
+                               "bruit": 0.0, "influence": 0.0}
+
+        # Sélection pas à pas des paramètres influents
+        residu = ecart
+        restants = list(parametres)
+        while restants:
+            bruits = {} # le bruit ne dépend que des effectifs des classes
+            depassements = {}
+            for nom in restants:
+                cle = effectifs[nom].tobytes()
+                if cle not in bruits:
+                    bruits[cle] = _bruit(rng, residu, effectifs[nom], n_permutations, niveau_parametre, scenarios_bruit)
+                parametres[nom]["bruit"] = bruits[cle]
+                depassements[nom] = _etendue(_moyennes_classes(classes[nom], residu, effectifs[nom])) - bruits[cle]
+            retenu = max(restants, key=depassements.get)
+            if depassements[retenu] <= 0:
+                break
+            parametres[retenu]["influence"] = depassements[retenu]
+            residu = residu - _effet(verification["valeurs"][retenu], classes[retenu], residu, effectifs[retenu])
+            restants.remove(retenu)
+
+        regions[grandeur] = {
+            "part_divergente": float(np.mean(divergent)),
+            "parametres": dict(sorted(parametres.items(), key=lambda item: -item[1]["influence"])),
+        }
+    return regions
+
+
+def afficher_verification(verification, seuil=0.01, nombre=5):
+    """
+    Affiche les dérives de l'aller-retour et, pour chaque grandeur, les paramètres les plus influents (au-delà du
+    bruit, cf. regions_divergence) avec la classe de valeurs de plus forte dérive.
+
+    Arguments
+    ----------
+        verification : dictionnaire renvoyé par verifier
+        seuil : dérive relative tolérée (cf. regions_divergence)
+        nombre : nombre de paramètres affichés par grandeur
+    """
+    regions = regions_divergence(verification, seuil)
+    n = len(verification["valeurs"]["kerosene"])
+    print(f"\n========== VÉRIFICATION INVERSE -> PHYSIQUE ({n} scénarios, seuil {seuil:.2%}) ==========")
+    for grandeur, statistiques in verification["statistiques"].items():
+        print(f"\n{grandeur} : dérive moyenne {statistiques['moyenne']:.3%}, p99 {statistiques['p99']:.3%}, "
+              f"max {statistiques['max']:.3%} ; {regions[grandeur]['part_divergente']:.1%} des scénarios au-delà du seuil")
+        influents = [(nom, region) for nom, region in regions[grandeur]["parametres"].items() if region["influence"] > 0]
+        if not influents:
+            print(" - aucun paramètre influent au-delà du bruit d'échantillonnage")
+        for nom, region in influents[:nombre]:
+            pire = int(np.nanargmax(region["derive_moyenne"]))
+            print(f" - {nom:<55} influence {region['influence']:.3%} (bruit {region['bruit']:.3%}) ; dérive moyenne "
+                  f"{region['derive_moyenne'][pire]:.3%} pour [{region['bornes'][pire]:.4g}, {region['bornes'][pire + 1]:.4g}]")
+    print()
+
+
+if __name__ == "__main__":
+    afficher_verification(verifier(graine=0))
+    afficher_verification(verifier(graine=0, humidite=(0.1, 0.6)))